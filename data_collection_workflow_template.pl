@@ -44,7 +44,7 @@ my $outDir = "".$ARGV[3];  # output_directory passed in from global script
 
 # For collect_stats script
 my $profiling = $ARGV[4];        # profiling is ON by default
-my $collectstatspath = $ARGV[5]; # location of collect_stats script and kill_scripts folder. 
+my $collectstatspath = $ARGV[5]; # location of collect_stats script. 
 my $interval = $ARGV[6];         # interval passed in from the global script. Default is 30, or whatever the user specifies. 
 my $stats = $ARGV[7];            # tools passed in from the global script
 my $sampleprefix = $sample.'_'.$numThreads.'T';
@@ -58,13 +58,13 @@ my $sampleprefix = $sample.'_'.$numThreads.'T';
 sub Start_profiling {
 my ($tag) = @_;
 if ($profiling) { 
-system("$collectstatspath $stats -d $interval -td $outDir -n $sampleprefix -tag $tag -l 5 -u 1 -s 600 &"); # will create a folder for each stage in the format :  run.$sampleprefix..$stagetag.1u
+system("$collectstatspath $stats -d $interval -td $outDir -n $sampleprefix -tag $tag -l 5 -u 1 -s 600"); # will create a folder for each stage in the format :  run.$sampleprefix..$stagetag.1u. Returns once the collectors are running.
 }
 }
 
 sub Stop_Profiling {
 if ($profiling) { 
-system("$collectstatspath --kill-all"); #This will call all the scripts inside kill_stats folder and kill the tools
+system("$collectstatspath --kill-all"); #This will stop the tools this workflow started and return once they have exited
 }
 }
 
@@ -78,8 +78,7 @@ Start_profiling($stage_tag); # profiling folder will contain this stage tag to h
 print "$stage_tag\n"; 
 run_your_stage with the right parameters; # call your workflow stage
 # CHECK THE EXIT STATUS OF YOUR WORKFLOW STAGE, ON FAILURE TOO CALL Stop_Profiling() to avoid orphan profiling processes
-Stop_Profiling(); # invokes the kill scripts to stop profiling
-sleep(60); # ideal for killing scripts and not having any overhead for the next stage
+Stop_Profiling(); # stops profiling; the collectors have exited when it returns, so the next stage can start right away
 
 # Tag below 'stage2' corresponds to second stage in the sample_dict in workflow_dictionaries.py
 my $stage_tag=stage2; 
@@ -87,8 +86,7 @@ Start_profiling($stage_tag); # profiling folder will contain this stage tag to h
 print "$stage_tag\n"; 
 run_your_stage with the right parameters; # call your workflow stage
 # CHECK THE EXIT STATUS OF YOUR WORKFLOW STAGE, ON FAILURE TOO CALL Stop_Profiling() to avoid orphan profiling processes
-Stop_Profiling(); # invokes the kill scripts to stop profiling
-sleep(60); # ideal for killing scripts and not having any overhead for the next stage
+Stop_Profiling(); # stops profiling; the collectors have exited when it returns, so the next stage can start right away
 
 # Tag below 'stage3' corresponds to third stage in the sample_dict in workflow_dictionaries.py
 my $stage_tag=stage3; 
@@ -96,8 +94,7 @@ Start_profiling($stage_tag); # profiling folder will contain this stage tag to h
 print "$stage_tag\n"; 
 run_your_stage with the right parameters; # call your workflow stage
 # CHECK THE EXIT STATUS OF YOUR WORKFLOW STAGE, ON FAILURE TOO CALL Stop_Profiling() to avoid orphan profiling processes
-Stop_Profiling(); # invokes the kill scripts to stop profiling
-sleep(60); # ideal for killing scripts and not having any overhead for the next stage
+Stop_Profiling(); # stops profiling; the collectors have exited when it returns, so the next stage can start right away
 
 # Better to write to a log file the output of each stage. We do that for our pipelines. 
 printf LOG "#done in %02d:%02d:%02d\n",int($runningTime /3600),int(($runningTime % 3600) /60),int($runningTime %60);
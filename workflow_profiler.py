@@ -45,17 +45,25 @@ workflow_profiler.py
                      stage of profiled data.
                   -- If workflow ran successfully, continue to run post-
                      processing script. Else exit with errors.
+                  -- With -live, the post-processing script runs alongside
+                     the workflow instead, see live_parser().
+                  -- Given a list of thread counts, runs and post-processes
+                     the workflow at each of them and reports how each stage
+                     scales, see sweep().
               - Run post-processing script : parser()
                   -- Creates a folder under samplename_datetimestamp called 
                      post_processed_stats.
                   -- Takes each run.* directory and generates the parsed csv data 
                      and relating png plots for the full workflow.
                   -- If post-processing script ran successfully, exit main 
-                     successfully. Else exit with errors.
+                     successfully. Else exit with errors. A plot that failed
+                     (e.g. gnuplot is not installed) fails the post-
+                     processing, with -live or without.
     Usage:
          workflow_profiler.py [-h] [-pr PROFILING] [-pp POST_PROCESSING]
                               [-int SAMPLING_INTERVAL] [-w SLIDING_WINDOW]
-                              [-p] [-A] [-s] [-i]
+                              [-p] [-live LIVE_REFRESH] [-c {sysstat,procfs}]
+                              [-ab] [-A] [-s] [-i] [-m] [-f] [-n] [-W]
                               workflow_script workflow_name sample_name
                               no_of_threads input_directory output_directory
 
@@ -68,6 +76,35 @@ workflow_profiler.py
        interval and only sar collected
        $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
          simulated 16 /data/simulated/ /foo/test/ -pp 0 -int 100 -s
+    3. Run a workflow sampled every half second by the procfs collector, a
+       single python process per stage in place of sar and iostat
+       $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
+         simulated 16 /data/simulated/ /foo/test/ -c procfs -int 0.5 -Ap
+    4. Measure what profiling costs the workflow: run it without and then
+       with profiling, and compare the runtime of each stage
+       $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
+         simulated 16 /data/simulated/ /foo/test/ -ab -A
+    5. Also collect what the workflow's own processes use, next to the 
+       statistics of the whole system
+       $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
+         simulated 16 /data/simulated/ /foo/test/ -AWp
+    6. Find the thread count each stage stops scaling at: run the workflow
+       with 1 to 32 threads, and report the speedup, the parallel efficiency
+       and the resources per thread of each stage
+       $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
+         simulated 1,2,4,8,16,32 /data/simulated/ /foo/test/ -AWp
+    7. See how the threads of each stage spread over the cores: the load
+       of every core, from mpstat, as a heatmap next to the busiest core
+       $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
+         simulated 64 /data/simulated/ /foo/test/ -Amp
+    8. Follow the memory in use, cached and available, from free, next to
+       the committed memory of sar
+       $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
+         simulated 16 /data/simulated/ /foo/test/ -Afp
+    9. See what each stage pulls over the network, next to its storage io,
+       and whether tcp retransmits
+       $ workflow_profiler.py data_collection_dnaworkflow.pl workflow_name
+         simulated 16 /data/simulated/ /foo/test/ -Anp
 """
 
 import os
@@ -77,6 +114,14 @@ import argparse
 import subprocess
 import time
 import datetime
+import pty
+import select
+import traceback
+from collections import OrderedDict
+
+# The profiler's folder, which holds collect_stats.ksh, and the parser's
+PROFILER_DIR = os.path.dirname(os.path.abspath(__file__))
+PARSER_DIR = os.path.join(PROFILER_DIR, 'workflow_stats_parser')
 
 
 ################################
@@ -124,6 +169,17 @@ def main(argv=None):
     # Create object for handling the workflow and parser 
     run=executeWorkflow()
 
+    # A sweep runs the workflow and the parser at each thread count
+    if len(args.thread_counts) > 1:
+        failed = run.sweep(args)
+        if not failed:
+            print("MAIN:: Thread-count sweep completed successfully.")
+        else:
+            print("MAIN:: Thread-count sweep: the runs with %s threads returned errors. Verify their output.log for more information." % (", ".join(failed)))
+        print("       Data is present in \'%s\'" %(args.output_directory))
+        print("       Exiting now.\n")
+        sys.exit()
+
     ## 4. Run the workflow and Post-processing script
     # if pr = 0 : run workflow but don't run parser (even if pp = 1). 
     # if pr = 1 : run workflow and if retcode_workflow == 0 and if pp = 1, run parser
@@ -144,14 +200,16 @@ def main(argv=None):
         run.profiler(args)
         if retcode_workflow == 0:
             if int(args.post_processing) == 1:
-                run.parser(args)
+                if not run.is_live(args):
+                    run.parser(args)
                 if retcode_parser == 0:
                     print("MAIN:: Workflow Profiler completed successfully.")
                     print("       Data is present in \'%s\'" %(args.output_directory))
                     print("       Exiting now.\n")
                     sys.exit()
                 else:
-                    print("MAIN:: Post-processing returned errors. Need to verify the script.")
+                    print("MAIN:: Post-processing returned errors, or a plot failed (is gnuplot installed?).")
+                    print("       Verify post_processed_stats/parser.log for more information.")
                     print("       Exiting now.\n")
                     sys.exit()
             else:
@@ -192,7 +250,7 @@ class UserInput:
         parser.add_argument("workflow_script", help="Enter the location of your workflow script. Example: /foo/data_collection_workflow.pl")
         parser.add_argument("workflow_name", help="Enter the name of your workflow")
 	parser.add_argument("sample_name", help="Enter the name of the sample")
-	parser.add_argument("no_of_threads", help="Enter the number of threads you want to run on")
+	parser.add_argument("no_of_threads", help="Enter the number of threads you want to run on, or a comma-separated list of them to run the workflow with each and report how its stages scale. Example: 1,2,4,8,16,32")
 	parser.add_argument("input_directory", help="Enter the directory where the input files are located")
 	parser.add_argument("output_directory", help="Enter the directory where the output data will be stored")
          
@@ -200,16 +258,21 @@ class UserInput:
         parser.add_argument("-pr", "--profiling", help="Do you want to profile the workflow? ON by default", default='1')
         parser.add_argument("-pp", "--post-processing", help="Do you want to run the parser to generate CSVs and plots? ON by default", default='1')
         parser.add_argument("-int", "--sampling_interval", help="Sampling interval for profiling in seconds. Default=30", default='30')
-        parser.add_argument("-w", "--sliding_window", help="Sliding window (average) for plots in seconds. Default=100", default='100')
+        parser.add_argument("-w", "--sliding_window", help="Window in seconds named in the csv time column titles, the samples are not averaged over it. Default=100", default='100')
         parser.add_argument("-p", "--plot", help="Plot all data", action='store_true')
+        parser.add_argument("-live", "--live_refresh", help="Post-process while the workflow runs, refreshing the CSVs and plots every LIVE_REFRESH seconds. 0 (default) post-processes once the workflow is done", default='0')
+        parser.add_argument("-ab", "--ab_test", help="Run the workflow twice, without (-pr 0) then with profiling, and report the runtime of each stage in both runs and the difference", action='store_true')
+        parser.add_argument("-c", "--collector", help="What collects the statistics: sar and iostat (sysstat, default) or a single procfs sampler per stage (procfs), which allows a sampling interval below 1s", choices=['sysstat', 'procfs'], default='sysstat')
 
         # Required group to force user to pick at least one stats flag
         stats = parser.add_argument_group('statistics', 'statistics options')
         stats.add_argument("-A", "--all", help="Parse all statistics", action='store_true')
         stats.add_argument("-s", "--sar", help="Parse sar information", action='store_true')
         stats.add_argument("-i", "--iostat", help="Parse iostat information", action='store_true')
-        #stats.add_argument("-m", "--mpstat", help="Parse mpstat info (cpu)", action='store_true')
-        #stats.add_argument("-f", "--free", help="Parse free information", action='store_true')
+        stats.add_argument("-W", "--workflow_tree", help="Collect and parse the cpu, memory, io and page faults of the workflow's own processes", action='store_true')
+        stats.add_argument("-m", "--mpstat", help="Collect and parse the load of each core (mpstat)", action='store_true')
+        stats.add_argument("-f", "--free", help="Collect and parse the used, cached and available memory (free)", action='store_true')
+        stats.add_argument("-n", "--network", help="Collect and parse the network throughput of each interface, tcp retransmits and connections (sar -n)", action='store_true')
  
         args = parser.parse_args(args=argv) ## returns namespace object containing args
 	return args
@@ -242,6 +305,8 @@ class UserInput:
         od_err = 3                #output directory error
         od_len_err = 4            #output directory length error
         stats_err = 5             # stats argument error
+        ab_err = 6                # A/B test argument error
+        sweep_err = 7             # thread-count sweep argument error
         rlist = [success,args_ns] #return on success
         err_list = [-1, None]     #return on error           
 
@@ -271,6 +336,20 @@ class UserInput:
             return err_list
         #print("validate_args:: Input directory \'%s\' passes validation!" % (id))
  
+        ## 3.A list of thread counts is a sweep: each is a count, once
+        counts = args_ns.no_of_threads.split(',')
+        if len(counts) > 1:
+            invalid = [count for count in counts if not count.isdigit() or int(count) == 0]
+            if invalid or len(set(counts)) < len(counts):
+                print("validate_args:: Error: The thread counts \'%s\' of a sweep must be distinct numbers above 0" % (args_ns.no_of_threads))
+                err_list[0] = sweep_err
+                return err_list
+            if not int(args_ns.profiling) or not int(args_ns.post_processing):
+                print("validate_args:: Error: A sweep post-processes each run for its scaling report, it can't be used with -pr 0 or -pp 0")
+                err_list[0] = sweep_err
+                return err_list
+        args_ns.thread_counts = counts
+
         ## 3.Check that 'od' is a valid directory and create a directory within it for storing the output
         od = args_ns.output_directory
         if os.path.isabs(od) == False:
@@ -292,43 +371,65 @@ class UserInput:
         #Creating folder for storing the output.
         if not od.endswith("/"): od = od + "/"
         dt = datetime.datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d_%H-%M-%S')
-        od = od + args_ns.sample_name + "_" + args_ns.workflow_name + "_" + args_ns.no_of_threads + "t_" + str(args_ns.sampling_interval) + "s_" + dt + "/"
+        od = od + args_ns.sample_name + "_" + args_ns.workflow_name + "_" + "-".join(counts) + "t_" + str(args_ns.sampling_interval) + "s_" + dt + "/"
         if not os.path.exists(od): os.makedirs(od)
 	args_ns.output_directory = od #change the namespace value
         rlist[1] = args_ns
 
-        ## 4.Check for sampling_interval and sliding window for profiling
-        interval = int(args_ns.sampling_interval)
+        ## 5.Check for sampling_interval and sliding window for profiling
+        # Only the procfs collector samples more often than once a second
+        if args_ns.collector == 'procfs':
+            interval = float(args_ns.sampling_interval)
+            lowest = 0.1
+        else:
+            interval = int(args_ns.sampling_interval)
+            lowest = 5
         window = int(args_ns.sliding_window)
-        if not 5 <= interval <= 120: 
-	    print("validate_args:: Warning: Preferable to have sampling interval %ds within the bounds of 5s and 120s" % interval)
+        if not lowest <= interval <= 120: 
+	    print("validate_args:: Warning: Preferable to have sampling interval %gs within the bounds of %gs and 120s" % (interval, lowest))
         #else:
 	    #print("validate_args:: Sampling interval passes validation")
         if not window > 2*interval:
-	    print("validate_args:: Warning: Preferable to have sliding window %ds more than twice that of sampling interval %ds" % (window,interval))
+	    print("validate_args:: Warning: Preferable to have sliding window %ds more than twice that of sampling interval %gs" % (window,interval))
                    
  
-        ## 5.Check for 'all' stats, and if not true check that at least one of the other stats are selected
+        ## 6.Check for 'all' stats, and if not true check that at least one of the other stats are selected
         ## Check for stats only if profiling and post-processing are requested. 
         if int(args_ns.profiling) or int(args_ns.post_processing) == 1:
             all = args_ns.all
             sar = args_ns.sar
             iostat = args_ns.iostat
-            #mpstat = args_ns.mpstat
-            #free = args_ns.free
+            mpstat = args_ns.mpstat
+            free = args_ns.free
 
-            stats_error_msg = "A|--all, -s|--sar, -i|--iostat" # -m|--mpstat, -f|--free
+            stats_error_msg = "A|--all, -s|--sar, -i|--iostat, -m|--mpstat, -f|--free, -n|--network, -W|--workflow_tree"
 
-            #if not any([all, sar, iostat, mpstat, free]):
-            if not any([all, sar, iostat]):
+            if not any([all, sar, iostat, mpstat, free, args_ns.network, args_ns.workflow_tree]):
                 print("validate_args:: Profiling and/or post-procssing are enabled by default.")
                 print("validate_args:: Error: Choose at least one statistic to parse:")
                 print("                " + stats_error_msg)
                 print("                Also enable -p if you want post-processing script to generate plots.")
                 err_list[0] = stats_err
                 return err_list
+            # mpstat and free, like sar and iostat, sample in whole seconds
+            if (mpstat or free) and float(args_ns.sampling_interval) != int(float(args_ns.sampling_interval)):
+                print("validate_args:: Error: -m|--mpstat and -f|--free need a sampling interval of whole seconds, not %ss" % (args_ns.sampling_interval))
+                err_list[0] = stats_err
+                return err_list
             #print("validate_args:: Statistics check passes validation!")
 
+        ## 7.The A/B test compares with a profiled run, and finds the stages
+        ## of both runs by the tags in the workflow's dictionary
+        if args_ns.ab_test:
+            if not int(args_ns.profiling):
+                print("validate_args:: Error: -ab runs the workflow with and without profiling, it can't be used with -pr 0")
+                err_list[0] = ab_err
+                return err_list
+            if executeWorkflow().stage_tags(args_ns) is None:
+                print("validate_args:: Error: -ab needs the workflow \'%s\' in workflow_stats_parser/workflow_dictionaries.py" % (args_ns.workflow_name))
+                err_list[0] = ab_err
+                return err_list
+
         rlist[1] = args_ns  ## update the return list before returning
         return rlist
 
@@ -356,15 +457,19 @@ class executeWorkflow():
         global retcode_workflow
         
         # location of collect_stats.ksh script to be passed in to the pipeline script
-        collect_stats_path = os.getcwd() + '/collect_stats.ksh'
+        collect_stats_path = os.path.join(PROFILER_DIR, 'collect_stats.ksh')
 
         #Args for running the workflow
         collect_stats = []
-        if args.all: collect_stats.append("--sar --iostat")
-        if args.sar: collect_stats.append("--sar")
-        if args.iostat: collect_stats.append("--iostat")
-        #if args.mpstat: collect_stats.append("--mpstat")
-        #if args.free: collect_stats.append("--free")
+        if args.collector == 'procfs': collect_stats.append("--procfs")  # one stream holds all the stats
+        else:
+            if args.all: collect_stats.append("--sar --iostat")
+            # sar -A records the network too
+            if args.sar or (args.network and not args.all): collect_stats.append("--sar")
+            if args.iostat: collect_stats.append("--iostat")
+        if args.workflow_tree: collect_stats.append("--proctree")  # finds the workflow by WORKFLOW_ROOT_PID
+        if args.mpstat: collect_stats.append("--mpstat")  # not part of a procfs stream
+        if args.free: collect_stats.append("--free")  # not part of a procfs stream
         collect_stats = [' '.join(collect_stats)]
         
         # Only the valid arguments are passed based on whether profiling is enabled or not
@@ -373,12 +478,229 @@ class executeWorkflow():
         
         print("Running the workflow script... \n")
 
-        retcode_workflow = subprocess.check_call(workflow_args)
+        if args.ab_test:
+            retcode_workflow = self.ab_test(args, workflow_args)
+        elif self.is_live(args):
+            retcode_workflow = self.live_parser(args, workflow_args)
+        else:
+            retcode_workflow = subprocess.check_call(workflow_args, preexec_fn=export_root_pid)
         return(retcode_workflow)
 
+    def is_live(self, args):
+        # post-processing while the workflow runs is only possible with profiling
+        # (and the A/B test post-processes once its runs are done)
+        return int(args.profiling) == 1 and int(args.post_processing) == 1 and int(args.live_refresh) > 0 and not args.ab_test
+
+    def ab_test(self, args, workflow_args):
+        """
+        PURPOSE: Runs the workflow without profiling (A), into an 
+                 'unprofiled' folder of the output directory, then with 
+                 profiling (B), and reports the runtime of each stage
+
+        INPUTS:  args, workflow_args: the command of the profiled workflow
+
+        OUTPUTS: Returns the return code of the first run that failed, or
+                 the profiled run's. Writes ab_runtime.csv into the output
+                 directory.
+
+        CALLEES: profiler()
+        """
+        stages = self.stage_tags(args)
+        unprofiled_folder = args.output_directory + 'unprofiled/'
+        if not os.path.exists(unprofiled_folder): os.makedirs(unprofiled_folder)
+        unprofiled_args = workflow_args[:4] + [unprofiled_folder, '0']
+
+        print("A/B test: running the workflow without profiling... \n")
+        retcode, unprofiled = self.timed_run(unprofiled_args, stages)
+        if retcode != 0:
+            return(retcode)
+        print("A/B test: running the workflow with profiling... \n")
+        retcode, profiled = self.timed_run(workflow_args, stages)
+        self.ab_report(args, stages, unprofiled, profiled)
+        return(retcode)
+
+    def stage_tags(self, args):
+        """
+        PURPOSE: The stages of the workflow and their tags, as in its 
+                 workflow_stats_parser dictionary
+
+        INPUTS:  args
+
+        OUTPUTS: Returns an OrderedDict of stage name -> tag, or None when
+                 the workflow has no dictionary
+
+        CALLEES: validate_args(), ab_test()
+        """
+        import_parser()
+        import workflow_dictionaries
+        name = workflow_dictionaries.workflow_parse_dict.get(args.workflow_name.lower())
+        if name is None:
+            return(None)
+        return(getattr(workflow_dictionaries, name))
+
+    def timed_run(self, workflow_args, stages):
+        """
+        PURPOSE: Runs the workflow and times its stages. A stage starts when
+                 the workflow prints its tag on a line of its own, as the 
+                 workflow template does, and lasts until the next one starts
+                 or the workflow exits.
+
+        INPUTS:  workflow_args: the command of the workflow
+                 stages: stage name -> tag
+
+        OUTPUTS: Returns [return code, OrderedDict of stage name -> seconds,
+                 with 'Total' last]
+
+        ALGORITHM: The workflow's output goes through a pseudo-terminal, so 
+                 that it is not held back in the workflow's buffers and each
+                 tag is seen when it is printed; it is passed on to stdout.
+        """
+        tags = dict((tag, stage) for stage, tag in stages.items())
+        starts = OrderedDict()
+        master, slave = pty.openpty()
+        began = time.time()
+        workflow = subprocess.Popen(workflow_args, stdout=slave, preexec_fn=export_root_pid)
+        os.close(slave)
+        pending = ''
+        while True:
+            # the collectors the workflow starts in the background may keep
+            # the terminal open after it exits
+            if not select.select([master], [], [], 1)[0]:
+                if workflow.poll() is not None:
+                    break
+                continue
+            try:
+                chunk = os.read(master, 4096)
+            except OSError:
+                chunk = ''  # the terminal is closed
+            if not chunk:
+                break
+            now = time.time()
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+            lines = (pending + chunk).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                stage = tags.get(line.strip())
+                if stage is not None and stage not in starts:
+                    starts[stage] = now
+        retcode = workflow.wait()
+        ended = time.time()
+        os.close(master)
+
+        seconds = OrderedDict()
+        times = starts.values() + [ended]
+        for index, stage in enumerate(starts):
+            seconds[stage] = times[index + 1] - times[index]
+        seconds['Total'] = ended - began
+        return([retcode, seconds])
+
+    def ab_report(self, args, stages, unprofiled, profiled):
+        """
+        PURPOSE: Prints the runtime of each stage in the two runs and writes
+                 it to ab_runtime.csv in the output directory
+
+        INPUTS:  args, stages: stage name -> tag
+                 unprofiled, profiled: stage name -> seconds, see timed_run()
+
+        OUTPUTS: None
+
+        CALLEES: ab_test()
+        """
+        rows = [["stage", "unprofiled (s)", "profiled (s)", "delta (s)", "delta (%)"]]
+        for stage in stages.keys() + ['Total']:
+            a = unprofiled.get(stage)
+            b = profiled.get(stage)
+            if a is None or b is None:
+                # the stage's tag was not printed by one of the runs
+                rows.append([stage, "%.1f" % a if a is not None else "", "%.1f" % b if b is not None else "", "", ""])
+                continue
+            rows.append([stage, "%.1f" % a, "%.1f" % b, "%.1f" % (b - a), "%.1f" % ((b - a) / a * 100) if a else ""])
+
+        print("\nA/B test: runtime of each stage without and with profiling")
+        for row in rows:
+            print("  %-20s %15s %15s %12s %12s" % tuple(row))
+        report = args.output_directory + 'ab_runtime.csv'
+        with open(report, 'w') as csv_file:
+            for row in rows:
+                csv_file.write(','.join(row) + '\n')
+        print("A/B test: written to \'%s\'\n" % (report))
+
+    def sweep(self, args):
+        """
+        PURPOSE: Runs the workflow and post-processes it at each thread count
+                 of the sweep, each run into a <threads>t folder of the 
+                 output directory, then writes the scaling report of the 
+                 runs into its scaling_stats folder
+
+        INPUTS:  args
+
+        OUTPUTS: Returns the thread counts whose run or post-processing 
+                 failed. scaling.csv, and with -p the scaling plots (see 
+                 workflow_stats_parser/scaling_report.py).
+
+        CALLEES: main()
+        """
+        runs = []
+        failed = []
+        for threads in args.thread_counts:
+            run_args = argparse.Namespace(**vars(args))
+            run_args.no_of_threads = threads
+            run_args.output_directory = args.output_directory + threads + "t/"
+            if not os.path.exists(run_args.output_directory): os.makedirs(run_args.output_directory)
+            print("Sweep: running the workflow with %s threads... \n" % (threads))
+            # a failed run is reported, and the sweep goes on with the others
+            try:
+                self.profiler(run_args)
+            except subprocess.CalledProcessError as error:
+                print("Sweep: the workflow with %s threads returned %d\n" % (threads, error.returncode))
+                failed.append(threads)
+                continue
+            if retcode_workflow == 0 and not self.is_live(run_args):
+                self.parser(run_args)
+            if retcode_workflow != 0 or retcode_parser != 0:
+                failed.append(threads)
+                continue
+            runs.append((int(threads), run_args.output_directory))
+
+        if runs:
+            import_parser()
+            import scaling_report
+            print("\nSweep: how each stage scales with the thread count\n")
+            try:
+                scaling_report.write_report(runs, args.output_directory + 'scaling_stats', args.workflow_name.lower(),
+                                            plot=args.plot)
+            except (IOError, OSError, ValueError, KeyError):
+                traceback.print_exc()
+        return(failed)
+
+    def live_parser(self, args, workflow_args):
+        """
+        PURPOSE: Runs the workflow with the post-processing script in live 
+                 mode next to it: the parser refreshes the csv's and plots 
+                 every -live seconds, and once more after the workflow exits
+
+        INPUTS:  args, workflow_args: the command of the workflow
+
+        OUTPUTS: Returns the workflow's return code. Sets retcode_parser.
+
+        CALLEES: profiler()
+        """
+        global retcode_parser
+
+        workflow = subprocess.Popen(workflow_args, preexec_fn=export_root_pid)
+        parser_args = self.parser_args(args) + ["--live", args.live_refresh, "--follow_pid", str(workflow.pid)]
+        print("Post-processing every %s seconds while the workflow runs... \n" % (args.live_refresh))
+        live = subprocess.Popen(parser_args)
+
+        retcode = workflow.wait()
+        retcode_parser = live.wait()
+        return(retcode)
+
     def parser(self, args):
         """
-        PURPOSE: Run the post-processing script with the provided command line arguments
+        PURPOSE: Post-process the profiled run, in this process, through the
+                 parser's library entry point
 
         INPUTS:  args
 
@@ -391,10 +713,58 @@ class executeWorkflow():
         #return code for parser script to be checked in the main function for errors.
         global retcode_parser
         
+        import_parser()
+        import workflow_stats_parser
+        print("\nRunning the post-processing script... \n")
+
+        # The return code is the script's exit status, as in the live mode:
+        # 1 when a plot failed (the parser plots for -A as well as for -p).
+        # Its argument errors raise ValueError, and must not end the 
+        # profiler after the workflow has run
+        try:
+            run = workflow_stats_parser.post_process(args.output_directory, args.workflow_name.lower(),
+                                                     self.parser_metrics(args, workflow_stats_parser),
+                                                     int(args.sliding_window), self.profiling_folder(args),
+                                                     plot=args.plot or args.all, log_level='debug')
+            retcode_parser = run.returncode
+        except Exception:
+            traceback.print_exc()
+            retcode_parser = 1
+        return(retcode_parser)
+
+    def parser_metrics(self, args, workflow_stats_parser):
+        # The metrics of the statistics arguments, as the parser's -A, -s,
+        # -i, -m, -f, -n and -W choose them
+        metrics = []
+        if args.all: metrics += workflow_stats_parser.DEFAULT_METRICS
+        else:
+            if args.iostat: metrics.append('iostat')
+            if args.sar: metrics += workflow_stats_parser.SAR_METRICS
+        if args.mpstat: metrics += workflow_stats_parser.MPSTAT_METRICS
+        if args.free: metrics += workflow_stats_parser.FREE_METRICS
+        if args.network: metrics += workflow_stats_parser.NETWORK_METRICS
+        if args.workflow_tree: metrics += workflow_stats_parser.WORKFLOW_METRICS
+        return(metrics)
+
+    def profiling_folder(self, args):
         #Creating folder for storing the post processed stats
-        parser_path= os.getcwd() + "/workflow_stats_parser/workflow_stats_parser.py"
         profiling_folder = args.output_directory + 'post_processed_stats'
         if not os.path.exists(profiling_folder): os.makedirs(profiling_folder)
+        return(profiling_folder)
+
+    def parser_args(self, args):
+        """
+        PURPOSE: The command line of the post-processing script, for the live
+                 mode, which runs it next to the workflow
+
+        INPUTS:  args
+
+        OUTPUTS: Returns the command as a list. Creates the post_processed_stats folder.
+
+        CALLEES: live_parser()
+        """
+        parser_path = os.path.join(PARSER_DIR, 'workflow_stats_parser.py')
+        profiling_folder = self.profiling_folder(args)
         
         # Support for a single stage is not provided here. To do so, run the stand-alone parser script
         #Args for running the parser
@@ -404,14 +774,24 @@ class executeWorkflow():
         if args.all: parser_args.append("-A")
         if args.sar: parser_args.append("-s")
         if args.iostat: parser_args.append("-i")
-        #if args.mpstat: parser_args.append("-m")
-        #if args.free: parser_args.append("-f")
-        
-        print("\nRunning the post-processing script... \n")
-
-        retcode_parser=subprocess.check_call(parser_args)
-        return(retcode_parser)
+        if args.workflow_tree: parser_args.append("-W")
+        if args.mpstat: parser_args.append("-m")
+        if args.free: parser_args.append("-f")
+        if args.network: parser_args.append("-n")
+        return(parser_args)
   
+def import_parser():
+    # The parser's modules are imported from its folder, wherever the
+    # profiler is run from
+    if PARSER_DIR not in sys.path:
+        sys.path.insert(0, PARSER_DIR)
+
+def export_root_pid():
+    # Run in the workflow's process before it starts: the collectors the
+    # workflow starts through collect_stats.ksh find its process tree by
+    # WORKFLOW_ROOT_PID (see process_tree_collector.py)
+    os.environ['WORKFLOW_ROOT_PID'] = str(os.getpid())
+
 ################################
 # Entry Point for Profiler
 ################################
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    collector_overhead.py
+
+    PURPOSE: Accounts for what the profiler's own collectors cost the
+             workload. Just before 'collect_stats.ksh --kill-all' stops the
+             collectors of a session, collector_supervisor.py writes, into
+             the stage folder each one writes its log to, OVERHEAD_FILE with
+             the CPU time, the peak RSS and the bytes written of each
+             process. The collectors are the processes the supervisor
+             recorded in the session's registry, and what they started: the
+             cpu time of the children they waited for, such as the 'free'
+             the free loop runs, counts as theirs. Run on its own, this
+             does the same for the collectors of a session that is still
+             running.
+
+             The parser sums them up per stage into OVERHEAD_CSV, next to
+             the other csv files, see UserInput.write_overhead_summary().
+
+    USAGE:
+    collector_overhead.py [-S session]
+
+    REQUIREMENTS: Linux, Python 2.6 or 2.7. Only the standard library, like
+        procfs_collector.py.
+"""
+
+from __future__ import division
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from collections import OrderedDict
+from tempfile import mkstemp
+
+# The file written into each stage folder, and the parser's summary
+OVERHEAD_FILE = 'collector_overhead.json'
+OVERHEAD_CSV = 'collector_overhead.csv'
+OVERHEAD_COLUMNS = ['stage', 'collector', 'pid', 'run time (s)', 'cpu time (s)',
+                    'cpu (% of a core)', 'peak rss (MB)', 'log written (MB)', 'disk writes (MB)']
+
+# The commands started by collect_stats.ksh; sar has sadc write its file.
+# The process tree leaves them out of the workflow's, see is_collector_command()
+COLLECTOR_COMMANDS = ['sar', 'sadc', 'iostat', 'mpstat', 'free', 'netstat']
+COLLECTOR_SCRIPTS = ['procfs_collector.py', 'process_tree_collector.py']
+
+
+class CollectorSnapshot ():
+    """
+    PURPOSE: Reads the resource usage of the collector processes from
+        procfs, at one point in time.
+        Usage example:
+            collectors = session.collectors ()
+            snapshot = CollectorSnapshot ('/proc', session.processes (collectors),
+                                          session.output_files (collectors))
+            for stage_dir, processes in snapshot.by_stage ().iteritems ():
+                ...
+
+    ATTRIBUTES:
+        proc_dir: where procfs is mounted
+        pids: the processes to look at, the collectors of a session and
+            what they started, see CollectorSession.processes()
+        output_files: the files the supervisor sent the collectors'
+            standard output to (their -o), see CollectorSession.start()
+        clock_ticks: the unit of the cpu times in /proc/<pid>/stat
+        uptime: seconds since boot, when the snapshot was taken
+    """
+
+    def __init__ (self, proc_dir, pids, output_files=()):
+        self.proc_dir = proc_dir
+        self.pids = pids
+        self.output_files = set (output_files)
+        self.clock_ticks = os.sysconf ('SC_CLK_TCK')
+        with open (os.path.join (proc_dir, 'uptime'), 'r') as uptime:
+            self.uptime = float (uptime.read ().split ()[0])
+
+    def by_stage (self):
+        """
+        PURPOSE: Groups the collector processes by the stage folder they
+            write to
+
+        INPUTS: None
+
+        OUTPUTS: Returns stage folder -> list of process dicts, see
+            read_process()
+
+        ALGORITHM: A process that has no log open (sar, whose sadc child
+            writes the file) goes with its parent's or its child's stage
+        """
+        processes = OrderedDict ()
+        for pid in sorted (self.pids):
+            process = self.read_process (pid)
+            if process:
+                processes[process['pid']] = process
+
+        stages = OrderedDict ()
+        for process in processes.itervalues ():
+            stage_dir = self.stage_dir (process)
+            if stage_dir is None:
+                relatives = [other for other in processes.itervalues ()
+                             if other['ppid'] == process['pid'] or other['pid'] == process['ppid']]
+                for other in relatives:
+                    stage_dir = stage_dir or self.stage_dir (other)
+            if stage_dir is not None:
+                stages.setdefault (stage_dir, []).append (process)
+        return stages
+
+    def stage_dir (self, process):
+        folders = set (os.path.dirname (log) for log in process['logs'])
+        if len (folders) == 1:
+            return folders.pop ()
+        return None
+
+    def read_process (self, pid):
+        """
+        PURPOSE: Reads the resource usage of one process
+
+        INPUTS: pid: the process id
+
+        OUTPUTS: Returns a dict, None for a process that is gone or can't
+            be read:
+                pid, ppid, uid, command, cmdline
+                elapsed_seconds: since it started
+                user_seconds, system_seconds: its cpu time so far, with
+                    that of the children it waited for
+                rss_kb, peak_rss_kb: resident memory now and at its peak
+                logs: the files it has open for writing, see open_logs()
+                log_bytes: their total size
+                disk_write_bytes: what it wrote to storage, None when the
+                    kernel does not account for it
+        """
+        base = os.path.join (self.proc_dir, str (pid))
+        try:
+            with open (os.path.join (base, 'stat'), 'r') as stat_file:
+                stat = stat_file.read ()
+            with open (os.path.join (base, 'cmdline'), 'r') as cmdline_file:
+                cmdline = [arg for arg in cmdline_file.read ().split ('\0') if arg]
+            status = self.read_fields (os.path.join (base, 'status'))
+        except (IOError, OSError):
+            return None
+        # the command is in parentheses and may hold spaces
+        command = stat[stat.index ('(') + 1:stat.rindex (')')]
+        fields = stat[stat.rindex (')') + 2:].split ()
+        try:
+            io = self.read_fields (os.path.join (base, 'io'))
+        except (IOError, OSError):
+            io = {}
+        logs = self.open_logs (base)
+
+        return {
+            'pid': pid,
+            'ppid': int (fields[1]),
+            'uid': int (status.get ('Uid', '-1').split ()[0]),
+            'command': command,
+            'cmdline': cmdline,
+            'elapsed_seconds': round (self.uptime - int (fields[19]) / self.clock_ticks, 2),
+            # utime + cutime and stime + cstime, fields 14 to 17 of stat
+            'user_seconds': round ((int (fields[11]) + int (fields[13])) / self.clock_ticks, 2),
+            'system_seconds': round ((int (fields[12]) + int (fields[14])) / self.clock_ticks, 2),
+            'rss_kb': int (status.get ('VmRSS', '0 kB').split ()[0]),
+            'peak_rss_kb': int (status.get ('VmHWM', '0 kB').split ()[0]),
+            'logs': logs,
+            'log_bytes': sum (os.path.getsize (log) for log in logs if os.path.isfile (log)),
+            'disk_write_bytes': int (io['write_bytes']) if 'write_bytes' in io else None,
+        }
+
+    def read_fields (self, filename):
+        # 'Name:   value' lines, as in /proc/<pid>/status and io
+        fields = {}
+        with open (filename, 'r') as field_file:
+            for line in field_file:
+                if ':' in line:
+                    name, value = line.split (':', 1)
+                    fields[name.strip ()] = value.strip ()
+        return fields
+
+    def open_logs (self, base):
+        # The regular files the process has open for writing. Its standard
+        # output only counts when it is one of output_files, the -o the
+        # supervisor gave the collector (iostat > log), and there is none of
+        # those: it is else the workflow's own log, inherited from
+        # collect_stats.ksh. Its standard error, inherited too, never does
+        logs = []
+        outputs = []
+        try:
+            descriptors = os.listdir (os.path.join (base, 'fd'))
+        except OSError:
+            return logs
+        for descriptor in descriptors:
+            if descriptor in ('0', '2'):
+                continue
+            try:
+                target = os.readlink (os.path.join (base, 'fd', descriptor))
+                flags = self.read_fields (os.path.join (base, 'fdinfo', descriptor)).get ('flags', '0')
+            except (IOError, OSError):
+                continue
+            if descriptor == '1' and target not in self.output_files:
+                continue
+            if (int (flags, 8) & (os.O_WRONLY | os.O_RDWR) and os.path.isabs (target)
+                    and os.path.isfile (target)):
+                found = outputs if descriptor == '1' else logs
+                if target not in found:
+                    found.append (target)
+        return logs or outputs
+
+
+def write_overhead (stage_dir, processes, taken):
+    """
+    PURPOSE: Writes OVERHEAD_FILE into a stage folder, under a temporary
+        name first
+
+    INPUTS:
+        stage_dir: the stage folder
+        processes: the stage's collector processes
+        taken: when the snapshot was taken, seconds since the epoch
+
+    OUTPUTS: Returns the path of the file
+    """
+    path = os.path.join (stage_dir, OVERHEAD_FILE)
+    handle, temp_name = mkstemp (dir=stage_dir, prefix='.' + OVERHEAD_FILE)
+    with os.fdopen (handle, 'w') as temp_file:
+        json.dump ({'taken': taken, 'host': socket.gethostname (), 'processes': processes},
+                   temp_file, indent=2)
+    os.chmod (temp_name, 0644)
+    os.rename (temp_name, path)
+    return path
+
+
+def read_overhead (stage_dir):
+    """
+    PURPOSE: Reads the OVERHEAD_FILE of a stage folder
+
+    INPUTS: stage_dir: the stage folder
+
+    OUTPUTS: Returns the list of process dicts, None when the stage has
+        none (it was not stopped by 'collect_stats.ksh --kill-all')
+
+    CALLEES: UserInput.write_overhead_summary()
+    """
+    try:
+        with open (os.path.join (stage_dir, OVERHEAD_FILE), 'r') as overhead_file:
+            return json.load (overhead_file)['processes']
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+
+def is_collector_command (command, cmdline):
+    """
+    PURPOSE: Checks whether a process is one of the profiler's collectors
+
+    INPUTS:
+        command: its name, as in /proc/<pid>/stat
+        cmdline: its arguments
+
+    OUTPUTS: True or False
+
+    CALLEES: ProcessTreeCollector.read_counters()
+    """
+    if command in COLLECTOR_COMMANDS:
+        return True
+    return any (os.path.basename (arg) in COLLECTOR_SCRIPTS for arg in cmdline)
+
+
+def collector_name (process):
+    # The script, for a collector run by python
+    for arg in process['cmdline']:
+        if os.path.basename (arg) in COLLECTOR_SCRIPTS:
+            return os.path.basename (arg)
+    return process['command']
+
+
+def overhead_rows (stage, processes):
+    """
+    PURPOSE: The rows of OVERHEAD_CSV for one stage: one per collector
+        process, then the stage's total
+
+    INPUTS:
+        stage: the stage name
+        processes: the stage's process dicts
+
+    OUTPUTS: Returns a list of lists of strings, the columns of
+        OVERHEAD_COLUMNS
+
+    CALLEES: UserInput.write_overhead_summary()
+    """
+    def row (name, pid, elapsed, cpu, peak_rss_kb, log_bytes, disk_bytes):
+        return [stage, name, pid, '%.2f' % elapsed, '%.2f' % cpu,
+                '%.2f' % (cpu / elapsed * 100 if elapsed else 0),
+                '%.1f' % (peak_rss_kb / 1024), '%.2f' % (log_bytes / 2 ** 20),
+                '' if disk_bytes is None else '%.2f' % (disk_bytes / 2 ** 20)]
+
+    rows = []
+    for process in processes:
+        rows.append (row (collector_name (process), str (process['pid']), process['elapsed_seconds'],
+                          process['user_seconds'] + process['system_seconds'],
+                          process['peak_rss_kb'], process['log_bytes'], process['disk_write_bytes']))
+    disk_bytes = [process['disk_write_bytes'] for process in processes]
+    # the cpu share of the stage total is over the longest running collector
+    rows.append (row ('total', '', max (process['elapsed_seconds'] for process in processes),
+                      sum (process['user_seconds'] + process['system_seconds'] for process in processes),
+                      sum (process['peak_rss_kb'] for process in processes),
+                      sum (process['log_bytes'] for process in processes),
+                      None if None in disk_bytes else sum (disk_bytes)))
+    return rows
+
+
+def main (argv=None):
+    """
+    PURPOSE: The entry point: writes the OVERHEAD_FILE of every stage the
+        session has collectors running for
+
+    INPUTS: argv - a list holding the command line user arguments
+
+    OUTPUTS: Exits 0
+    """
+    parser = argparse.ArgumentParser (description="Records the profiler collectors' resource usage")
+    parser.add_argument ("-S", "--session", help="The session. Default: $COLLECTOR_SESSION, else $WORKFLOW_ROOT_PID")
+    parser.add_argument ("--proc", default='/proc', help=argparse.SUPPRESS)
+    args = parser.parse_args (argv)
+
+    # collector_supervisor.py imports this module
+    from collector_supervisor import CollectorSession, session_name
+    session = CollectorSession (args.proc, session_name (args.session))
+    collectors = session.collectors ()
+    snapshot = CollectorSnapshot (args.proc, session.processes (collectors), session.output_files (collectors))
+    taken = time.time ()
+    for stage_dir, processes in snapshot.by_stage ().iteritems ():
+        print ("collector overhead: [{0}]".format (write_overhead (stage_dir, processes, taken)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit (main ())
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    collector_supervisor.py
+
+    PURPOSE: Starts and stops the collectors of a profiling session. Each
+             collector collect_stats.ksh starts is recorded, with its pid and
+             the time it started, in the session's folder of the registry
+             (REGISTRY_DIR, one per user); 'collect_stats.ksh --kill-all'
+             then stops exactly those processes, and what they started (sar's
+             sadc), and waits until they are gone. Nothing else is signalled,
+             so the collectors of another session, or the user's own sar,
+             are left alone.
+
+             The session is named by -S, else by $COLLECTOR_SESSION, else by
+             $WORKFLOW_ROOT_PID, which workflow_profiler.py sets for each
+             workflow it runs, so two profiled workflows on one machine are
+             two sessions.
+
+    USAGE:
+    collector_supervisor.py start [-S session] [-o output_file] -- command ...
+    collector_supervisor.py stop [-S session] [-t seconds]
+    collector_supervisor.py list [-S session]
+
+    start                 Starts command in the background, its output to
+                          output_file (-o, default: the terminal), and
+                          records it
+    stop                  Records what the session's collectors cost their
+                          stages (see collector_overhead.py), sends them
+                          SIGUSR1 and waits until they have exited, their
+                          logs complete. Those still running after -t
+                          seconds (default 5) are killed.
+    list                  Prints the session's running collectors
+
+    REQUIREMENTS: Linux, Python 2.6 or 2.7. Only the standard library, like
+        procfs_collector.py.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from tempfile import gettempdir, mkstemp
+
+from collector_overhead import CollectorSnapshot, write_overhead
+
+# The registry: a folder per session holding a <pid>.json file per collector
+REGISTRY_DIR = os.path.join (gettempdir (), 'workflow_profiler.{0}'.format (os.getuid ()))
+SESSION_VARIABLES = ['COLLECTOR_SESSION', 'WORKFLOW_ROOT_PID']
+DEFAULT_SESSION = 'default'
+
+# How long stop waits for the collectors to exit, and how often it looks
+DEFAULT_STOP_TIMEOUT = 5
+STOP_POLL_INTERVAL = 0.01
+
+
+class CollectorSession ():
+    """
+    PURPOSE: The collectors one profiling session started, as recorded in
+        its registry folder.
+        Usage example:
+            session = CollectorSession ('/proc', session_name ())
+            session.start (['iostat', '-xt', '30'], output_file)
+            ...
+            session.stop (5)
+
+    ATTRIBUTES:
+        proc_dir: where procfs is mounted
+        name: the session's name
+        folder: its folder in REGISTRY_DIR
+    """
+
+    def __init__ (self, proc_dir, name):
+        self.proc_dir = proc_dir
+        self.name = name
+        self.folder = os.path.join (REGISTRY_DIR, name.replace ('/', '_'))
+
+    def start (self, command, output_file=None):
+        """
+        PURPOSE: Starts one collector in the background and records it
+
+        INPUTS:
+            command: the collector's command line, a list
+            output_file: where its standard output goes, None for the
+                terminal
+
+        OUTPUTS: Returns the collector's pid
+        """
+        output = open (output_file, 'w') if output_file else None
+        try:
+            with open (os.devnull, 'r') as no_input:
+                collector = subprocess.Popen (command, stdin=no_input, stdout=output, close_fds=True)
+        finally:
+            if output:
+                output.close ()
+        # The record is written before this returns, so a stop that
+        # follows right away finds it
+        self.record (collector.pid, command, output_file)
+        return collector.pid
+
+    def record (self, pid, command, output_file=None):
+        if not os.path.isdir (self.folder):
+            try:
+                os.makedirs (self.folder, 0700)
+            except OSError:
+                pass  # made by a collector started at the same time
+        # the path the kernel shows for the collector's standard output
+        output_file = os.path.realpath (output_file) if output_file else None
+        entry = {'pid': pid, 'started': self.start_time (pid), 'command': command,
+                 'output_file': output_file}
+        handle, temporary = mkstemp (dir=self.folder, suffix='.tmp')
+        with os.fdopen (handle, 'w') as entry_file:
+            json.dump (entry, entry_file)
+        os.rename (temporary, os.path.join (self.folder, '{0}.json'.format (pid)))
+
+    def collectors (self):
+        """
+        PURPOSE: Reads the session's records, dropping those of collectors
+            that are gone
+
+        INPUTS: None
+
+        OUTPUTS: Returns a list of the records of the running collectors,
+            dicts with the pid, the start time, the command and the
+            output_file its standard output went to (None for the terminal)
+        """
+        running = []
+        try:
+            names = sorted (os.listdir (self.folder))
+        except OSError:
+            return running
+        for name in names:
+            if not name.endswith ('.json'):
+                continue
+            path = os.path.join (self.folder, name)
+            try:
+                with open (path, 'r') as entry_file:
+                    entry = json.load (entry_file)
+            except (IOError, ValueError):
+                continue
+            if self.is_running (entry['pid'], entry['started']):
+                running.append (entry)
+            else:
+                self.forget (entry['pid'])
+        return running
+
+    def stop (self, timeout=DEFAULT_STOP_TIMEOUT):
+        """
+        PURPOSE: Stops the session's collectors and waits until they exit
+
+        INPUTS: timeout: seconds to wait before the collectors still running
+            are killed
+
+        OUTPUTS: Returns the number of collectors that had to be killed
+
+        ALGORITHM: The processes the collectors started are stopped with
+            them. A pid is only signalled while its process is the one that
+            was recorded: the start time tells a reused pid apart.
+        """
+        collectors = self.collectors ()
+        processes = self.processes (collectors)
+        if not processes:
+            return 0
+
+        # What the collectors cost, read before they are stopped
+        taken = time.time ()
+        snapshot = CollectorSnapshot (self.proc_dir, processes.keys (), self.output_files (collectors))
+        for stage_dir, usage in snapshot.by_stage ().iteritems ():
+            print ("collector overhead: [{0}]".format (write_overhead (stage_dir, usage, taken)))
+
+        for entry in collectors:
+            print ("stopping {0} [{1}]".format (os.path.basename (entry['command'][0]), entry['pid']))
+        self.signal (processes, signal.SIGUSR1)
+        deadline = time.time () + timeout
+        while processes and time.time () < deadline:
+            time.sleep (STOP_POLL_INTERVAL)
+            processes = dict ((pid, started) for pid, started in processes.iteritems ()
+                              if self.is_running (pid, started))
+        if processes:
+            print ("killing {0} collector processes still running after {1}s: {2}".format (
+                len (processes), timeout, ' '.join (str (pid) for pid in sorted (processes))))
+            self.signal (processes, signal.SIGKILL)
+        for entry in collectors:
+            self.forget (entry['pid'])
+        return len (processes)
+
+    def processes (self, collectors):
+        """
+        PURPOSE: The processes of the session: its collectors and what
+            they started
+
+        INPUTS: collectors: the records of the running collectors, see
+            collectors()
+
+        OUTPUTS: Returns pid -> start time
+
+        CALLEES: stop(), collector_overhead.main()
+        """
+        processes = dict ((entry['pid'], entry['started']) for entry in collectors)
+        for entry in collectors:
+            processes.update (self.descendants (entry['pid']))
+        return processes
+
+    def output_files (self, collectors):
+        # the files start() sent the collectors' standard output to; records
+        # written before they were kept have none
+        return set (entry['output_file'] for entry in collectors if entry.get ('output_file'))
+
+    def signal (self, processes, signum):
+        for pid, started in processes.iteritems ():
+            if self.is_running (pid, started):
+                try:
+                    os.kill (pid, signum)
+                except OSError:
+                    pass  # it just exited
+
+    def forget (self, pid):
+        try:
+            os.remove (os.path.join (self.folder, '{0}.json'.format (pid)))
+        except OSError:
+            pass
+        try:
+            os.rmdir (self.folder)
+        except OSError:
+            pass  # other collectors are still recorded
+
+    # Helpers -------
+    def read_stat (self, pid):
+        # The fields after the command, which is in parentheses and may hold
+        # spaces; None for a process that is gone
+        try:
+            with open (os.path.join (self.proc_dir, str (pid), 'stat'), 'r') as stat_file:
+                stat = stat_file.read ()
+        except (IOError, OSError):
+            return None
+        return stat[stat.rindex (')') + 2:].split ()
+
+    def start_time (self, pid):
+        # field 22 of stat, in clock ticks since boot, see proc(5)
+        fields = self.read_stat (pid)
+        return int (fields[19]) if fields else None
+
+    def is_running (self, pid, started):
+        # a zombie has exited, whether or not its parent reaped it
+        fields = self.read_stat (pid)
+        return fields is not None and fields[0] != 'Z' and int (fields[19]) == started
+
+    def descendants (self, pid):
+        # pid -> start time of the processes below pid
+        children = {}
+        for name in os.listdir (self.proc_dir):
+            if name.isdigit ():
+                fields = self.read_stat (name)
+                if fields:
+                    children.setdefault (int (fields[1]), []).append ((int (name), int (fields[19])))
+        found = {}
+        pending = [pid]
+        while pending:
+            for child, started in children.get (pending.pop (), []):
+                if child not in found:
+                    found[child] = started
+                    pending.append (child)
+        return found
+
+
+def session_name (name=None):
+    # -S, else the first of SESSION_VARIABLES that is set
+    for candidate in [name] + [os.environ.get (variable) for variable in SESSION_VARIABLES]:
+        if candidate:
+            return candidate
+    return DEFAULT_SESSION
+
+
+def main (argv=None):
+    """
+    PURPOSE: The entry point: starts a collector, stops the session's
+        collectors or lists them
+
+    INPUTS: argv - a list holding the command line user arguments
+
+    OUTPUTS: Exits 0, or 1 when a collector had to be killed
+    """
+    parser = argparse.ArgumentParser (description="Starts and stops the collectors of a profiling session")
+    parser.add_argument ("action", choices=['start', 'stop', 'list'])
+    parser.add_argument ("-S", "--session", help="The session. Default: $COLLECTOR_SESSION, else $WORKFLOW_ROOT_PID")
+    parser.add_argument ("-o", "--output", help="start: the file the collector's output goes to")
+    parser.add_argument ("-t", "--timeout", type=float, default=DEFAULT_STOP_TIMEOUT,
+                         help="stop: seconds to wait for the collectors to exit. Default {0}".format (DEFAULT_STOP_TIMEOUT))
+    parser.add_argument ("--proc", default='/proc', help=argparse.SUPPRESS)
+    # The collector's command line follows --, and may have options of its
+    # own, such as sar's -o
+    argv = sys.argv[1:] if argv is None else argv
+    command = []
+    if '--' in argv:
+        command = argv[argv.index ('--') + 1:]
+        argv = argv[:argv.index ('--')]
+    args = parser.parse_args (argv)
+    if args.action == 'start' and not command:
+        parser.error ("start needs the collector's command line")
+
+    session = CollectorSession (args.proc, session_name (args.session))
+    if args.action == 'start':
+        try:
+            pid = session.start (command, args.output)
+        except (IOError, OSError), error:
+            print ("can't start {0}: {1}".format (command[0], error))
+            return 1
+        print ("started {0} [{1}] in session {2}".format (os.path.basename (command[0]), pid, session.name))
+    elif args.action == 'stop':
+        return 1 if session.stop (args.timeout) else 0
+    else:
+        for entry in session.collectors ():
+            print ("{0} {1}".format (entry['pid'], ' '.join (entry['command'])))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit (main ())
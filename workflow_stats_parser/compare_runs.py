@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    compare_runs.py
+
+    PURPOSE: The compare mode: compares post-processed runs, e.g. before and
+             after a tool upgrade. The first run is the baseline; the stages
+             of the others are aligned with its stages by their names in
+             workflow_dictionaries.py. For each stage, the QUANTITIES of each
+             run are reported next to the baseline's, with the change and
+             whether it is significant (see Comparison.compare ()), in
+             compare.csv and on the screen. With matplotlib, a plot per
+             metric overlays the runs, stage by stage.
+
+             With a threshold file, the significant changes beyond its
+             limits are regressions, and the exit status is 1 when there is
+             one, so that a release pipeline can stop on it.
+
+    USAGE:
+    compare_runs.py baseline run [run ...] [-N workflow_name] [-o folder]
+                    [-t threshold_file] [--no_plots]
+
+    baseline, run         Output folders of the parser (which hold the
+                          'series' folder), or run folders that hold a
+                          post_processed_stats folder
+    -N, --workflow_name   The workflow, for the order of the stages.
+                          Default: the baseline's order
+    -o, --output          Where compare.csv and the plots are written.
+                          Default: ./compare_stats
+    -t, --thresholds      The threshold file, see THRESHOLD FILE
+    --no_plots            Write compare.csv only
+
+    THRESHOLD FILE: JSON, the limits of each quantity of QUANTITIES, in
+        percent of the baseline, and optionally the smallest change that
+        counts, in the quantity's units; the limits of a stage in "stages"
+        replace those of the quantity for that stage:
+            {
+                "duration": {"max_increase_pct": 10},
+                "cpu_mean": {"max_increase_pct": 20, "max_decrease_pct": 30},
+                "iowait_mean": {"max_increase_pct": 50, "min_delta": 1},
+                "stages": {"Stage2": {"duration": {"max_increase_pct": 25}}}
+            }
+        A quantity without limits is reported, never a regression.
+
+    OUTPUTS: Exits 0; 1 when a threshold is exceeded; 2 on an error.
+
+    REQUIREMENTS: numpy, as the parser. matplotlib for the plots.
+"""
+
+from __future__ import division
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from collections import OrderedDict, namedtuple
+
+import numpy
+
+from workflow_stats_parser import SeriesStore, SERIES_STORE_DIR, METRIC_PLOTS, TEMPLATE_DIR, TICKS_PER_SECOND, get_workflow
+from plot_renderer import MatplotlibRenderer, matplotlib_available
+
+# What is compared, per stage:
+#   name      - the name in compare.csv and in the threshold file
+#   metric    - the series it is computed from, None for the stage duration
+#   statistic - mean, p95 (the 95th percentile) or duration
+#   units     - its units
+Quantity = namedtuple ('Quantity', ['name', 'metric', 'statistic', 'units'])
+QUANTITIES = [
+    Quantity ('duration', None, 'duration', 's'),
+    Quantity ('cpu_mean', 'sar', 'mean', '%'),
+    Quantity ('cpu_p95', 'sar', 'p95', '%'),
+    Quantity ('iowait_mean', 'iowait', 'mean', '%'),
+    Quantity ('read_mean', 'sar_reads', 'mean', 'MB/s'),
+    Quantity ('write_mean', 'sar_writes', 'mean', 'MB/s'),
+    Quantity ('committed_mem_mean', 'active_mem', 'mean', 'GB'),
+    Quantity ('net_rx_mean', 'net_rx', 'mean', 'MB/s'),
+    Quantity ('net_tx_mean', 'net_tx', 'mean', 'MB/s'),
+    Quantity ('tcp_retrans_mean', 'tcp_retrans', 'mean', '/s'),
+]
+
+# The score above which a change is significant: about 95% confidence
+SIGNIFICANT_SCORE = 2
+
+COMPARE_CSV = 'compare.csv'
+COMPARE_COLUMNS = ['stage', 'quantity', 'units', 'baseline', 'run', 'baseline_value', 'value',
+                   'delta', 'delta_pct', 'score', 'significant', 'regression']
+DEFAULT_OUTPUT_DIR = './compare_stats'
+
+
+class RunStats ():
+    """
+    PURPOSE: The series of one post-processed run, read from its
+        SeriesStore, and their statistics per stage
+        Usage example:
+            run = RunStats ('/foo/run1/post_processed_stats')
+            run.series['sar']['Stage1'].values.mean ()
+
+    ATTRIBUTES:
+        name: the name of the run, that of its folder
+        folder: the parser's output folder of the run
+        stages: the names of its stages, in order
+        series: metric -> stage name -> TimeSeries
+    """
+    def __init__ (self, path):
+        self.folder = find_output_folder (path)
+        name = os.path.basename (os.path.normpath (self.folder))
+        if name == 'post_processed_stats':
+            name = os.path.basename (os.path.dirname (os.path.normpath (self.folder)))
+        self.name = name
+        store = SeriesStore (os.path.join (self.folder, SERIES_STORE_DIR))
+        index = store.index ()
+        self.stages = list (index['stages'])
+        self.series = OrderedDict ()
+        for metric in index['metrics']:
+            self.series[metric] = OrderedDict ((series.stage, series) for series in store.load (metric))
+
+    def interval (self, stage):
+        # The sampling interval of a stage, in seconds: the median step
+        # between the timestamps of its series
+        steps = [numpy.diff (series_by_stage[stage].times) for series_by_stage in self.series.itervalues ()
+                 if stage in series_by_stage and len (series_by_stage[stage]) > 1]
+        steps = numpy.concatenate (steps) if steps else numpy.array ([])
+        steps = steps[steps > 0]
+        return float (numpy.median (steps)) / TICKS_PER_SECOND if len (steps) else 0.0
+
+    def duration (self, stage):
+        # From the first sample to the last one of any metric, plus one
+        # interval: the stage is only known to the sampling interval
+        series_list = [series_by_stage[stage] for series_by_stage in self.series.itervalues ()
+                       if stage in series_by_stage and len (series_by_stage[stage])]
+        if not series_list:
+            return None
+        first = min (series.times[0] for series in series_list)
+        last = max (series.times[-1] for series in series_list)
+        return float (last - first) / TICKS_PER_SECOND + self.interval (stage)
+
+    def samples (self, metric, stage):
+        # The values of a metric in a stage, None when there are none
+        series = self.series.get (metric, {}).get (stage)
+        if series is None or not len (series):
+            return None
+        return numpy.asarray (series.values, dtype=numpy.float64)
+
+
+class Comparison ():
+    """
+    PURPOSE: Compares runs with a baseline, stage by stage
+        Usage example:
+            comparison = Comparison (baseline, [run], stages, thresholds)
+            rows = comparison.compare ()
+
+    ATTRIBUTES:
+        baseline: the RunStats the others are compared with
+        runs: the other RunStats
+        stages: the stage names, in workflow order
+        thresholds: the threshold file's contents, {} for none
+    """
+    def __init__ (self, baseline, runs, stages, thresholds=None):
+        self.baseline = baseline
+        self.runs = runs
+        self.stages = stages
+        self.thresholds = thresholds or {}
+
+    def compare (self):
+        """
+        PURPOSE: Compares each run with the baseline
+
+        INPUTS: None
+
+        OUTPUTS: Returns the rows of compare.csv, see COMPARE_COLUMNS
+
+        ALGORITHM: The score of a change tells whether it is significant
+            (above SIGNIFICANT_SCORE):
+              mean      the change over its standard error (Welch)
+              p95       the share of the run's samples above the baseline's
+                        95th percentile against the 5% expected, over its
+                        standard error (binomial)
+              duration  the change in sampling intervals, the resolution
+                        of the stage boundaries
+        """
+        rows = []
+        for run in self.runs:
+            for stage in self.stages:
+                for quantity in QUANTITIES:
+                    if quantity.metric and not (quantity.metric in self.baseline.series or quantity.metric in run.series):
+                        continue
+                    rows.append (self.compare_quantity (run, stage, quantity))
+        return rows
+
+    def compare_quantity (self, run, stage, quantity):
+        base_value, value, score = self.measure (run, stage, quantity)
+        row = [stage, quantity.name, quantity.units, self.baseline.name, run.name,
+               format_value (base_value), format_value (value)]
+        if base_value is None or value is None:
+            # A stage the run did not get to fails a gate on the quantity
+            missing = value is None
+            return row + ['', '', '', 'missing' if missing else 'new',
+                          'yes' if missing and self.limits (stage, quantity.name) else 'no']
+
+        delta = value - base_value
+        if base_value:
+            delta_pct = 100 * delta / abs (base_value)
+        else:
+            delta_pct = 0.0 if not delta else float ('inf') * numpy.sign (delta)
+        significant = score >= SIGNIFICANT_SCORE
+        regression = significant and self.exceeds (stage, quantity.name, delta, delta_pct)
+        return row + [format_value (delta), format_value (delta_pct), format_value (score),
+                      'yes' if significant else 'no', 'yes' if regression else 'no']
+
+    def measure (self, run, stage, quantity):
+        # Returns (the baseline's value, the run's value, the score)
+        if quantity.statistic == 'duration':
+            base_value, value = self.baseline.duration (stage), run.duration (stage)
+            if base_value is None or value is None:
+                return base_value, value, 0.0
+            resolution = max (self.baseline.interval (stage), run.interval (stage))
+            return base_value, value, abs (value - base_value) / resolution if resolution else 0.0
+
+        base = self.baseline.samples (quantity.metric, stage)
+        samples = run.samples (quantity.metric, stage)
+        if base is None or samples is None:
+            return (None if base is None else statistic (base, quantity.statistic),
+                    None if samples is None else statistic (samples, quantity.statistic), 0.0)
+        base_value, value = statistic (base, quantity.statistic), statistic (samples, quantity.statistic)
+        count = len (samples)
+        if quantity.statistic == 'p95':
+            above = numpy.mean (samples > base_value)
+            error = numpy.sqrt (0.05 * 0.95 / count)
+            return base_value, value, abs (above - 0.05) / error
+
+        base_count = len (base)
+        error = numpy.sqrt (base.var () / base_count + samples.var () / count)
+        if not error:
+            return base_value, value, float ('inf') if value != base_value else 0.0
+        return base_value, value, abs (value - base_value) / error
+
+    def limits (self, stage, name):
+        # The limits of a quantity in a stage, None when it has none
+        return self.thresholds.get ('stages', {}).get (stage, {}).get (name, self.thresholds.get (name))
+
+    def exceeds (self, stage, name, delta, delta_pct):
+        # Whether a change is beyond the limits of the threshold file
+        limits = self.limits (stage, name)
+        if not limits:
+            return False
+        if abs (delta) < limits.get ('min_delta', 0):
+            return False
+        if 'max_increase_pct' in limits and delta_pct > limits['max_increase_pct']:
+            return True
+        if 'max_decrease_pct' in limits and -delta_pct > limits['max_decrease_pct']:
+            return True
+        return False
+
+    def plot (self, output_dir):
+        """
+        PURPOSE: Draws a plot per metric of QUANTITIES that overlays the
+            runs, stage by stage
+
+        INPUTS: output_dir: where the .png files are written
+
+        OUTPUTS: Returns the paths of the .png files
+        """
+        renderer = MatplotlibRenderer (output_dir, '')
+        template_dir = os.path.join (os.path.dirname (os.path.abspath (__file__)), TEMPLATE_DIR)
+        runs = [self.baseline] + self.runs
+        plots = []
+        for metric in OrderedDict.fromkeys (quantity.metric for quantity in QUANTITIES if quantity.metric):
+            if not any (metric in run.series for run in runs):
+                continue
+            templates = [name for name in sorted (os.listdir (template_dir))
+                         if re.search (METRIC_PLOTS[metric][0], name)]
+            plots.append (renderer.overlay (os.path.join (template_dir, templates[0]), self.stages,
+                                            [(run.name, run.series.get (metric, {})) for run in runs]))
+        return plots
+
+
+def statistic (values, name):
+    if name == 'p95':
+        return float (numpy.percentile (values, 95))
+    return float (values.mean ())
+
+
+def format_value (value):
+    if value is None:
+        return ''
+    if numpy.isinf (value):
+        return 'inf' if value > 0 else '-inf'
+    return '{0:.2f}'.format (value)
+
+
+def find_output_folder (path):
+    """
+    PURPOSE: Finds the parser's output folder of a run
+
+    INPUTS: path: the output folder, or the run folder that holds a
+        post_processed_stats folder
+
+    OUTPUTS: Returns the output folder. Raises IOError when there is no
+        series store in either.
+    """
+    for folder in (path, os.path.join (path, 'post_processed_stats')):
+        if os.path.isfile (os.path.join (folder, SERIES_STORE_DIR, SeriesStore.INDEX_FILE)):
+            return folder
+    raise IOError ("no post-processed series in {0}: run workflow_stats_parser.py on it first".format (path))
+
+
+def aligned_stages (runs, workflow_name=None):
+    # The stages of the workflow's dictionary, else those of the baseline
+    # followed by any only the other runs have
+    if workflow_name:
+        workflow = get_workflow (workflow_name)
+        if workflow is None:
+            raise ValueError ("unknown workflow '{0}', see workflow_dictionaries.py".format (workflow_name))
+        return workflow.keys ()
+    stages = []
+    for run in runs:
+        stages += [stage for stage in run.stages if stage not in stages]
+    return stages
+
+
+def main (argv=None):
+    """
+    PURPOSE: The entry point: compares the runs and writes the report
+
+    INPUTS: argv - a list holding the command line user arguments
+
+    OUTPUTS: Exits 0; 1 when a threshold is exceeded; 2 on an error
+    """
+    parser = argparse.ArgumentParser (description="Compares post-processed runs with a baseline, stage by stage")
+    parser.add_argument ("baseline", help="The post-processed baseline run")
+    parser.add_argument ("runs", nargs='+', help="The post-processed runs to compare with it")
+    parser.add_argument ("-N", "--workflow_name", help="The workflow, for the order of the stages")
+    parser.add_argument ("-o", "--output", default=DEFAULT_OUTPUT_DIR,
+                         help="Where compare.csv and the plots are written. Default: " + DEFAULT_OUTPUT_DIR)
+    parser.add_argument ("-t", "--thresholds", help="The threshold file: a regression exits 1")
+    parser.add_argument ("--no_plots", action='store_true', help="Write compare.csv only")
+    args = parser.parse_args (argv)
+
+    try:
+        runs = [RunStats (path) for path in [args.baseline] + args.runs]
+        stages = aligned_stages (runs, args.workflow_name)
+        thresholds = {}
+        if args.thresholds:
+            with open (args.thresholds, 'r') as threshold_file:
+                thresholds = json.load (threshold_file)
+    except (IOError, OSError, ValueError, KeyError), error:
+        print ("compare: {0}".format (error))
+        return 2
+
+    comparison = Comparison (runs[0], runs[1:], stages, thresholds)
+    rows = comparison.compare ()
+    if not os.path.isdir (args.output):
+        os.makedirs (args.output)
+    output_file = os.path.join (args.output, COMPARE_CSV)
+    with open (output_file, 'wb') as output:
+        writer = csv.writer (output)
+        writer.writerow (COMPARE_COLUMNS)
+        writer.writerows (rows)
+
+    # the run column is as wide as the longest run name
+    layout = "{0:<12} {1:<20} {2:<%d} {3:>12} {4:>12} {5:>10} {6:>5}" % max ([16] + [len (row[4]) for row in rows])
+    print (layout.format ('stage', 'quantity', 'run', 'baseline', 'value', 'delta %', 'sig'))
+    for row in rows:
+        # significant changes are starred
+        flag = '*' if row[10] == 'yes' else ''
+        if row[11] == 'yes':
+            flag = 'REGRESSION'
+        print (layout.format (
+            row[0], row[1] + ' (' + row[2] + ')', row[4], row[5], row[6], row[8] or row[10], flag))
+    print ("compare: written to {0}".format (output_file))
+
+    if not args.no_plots:
+        if matplotlib_available ():
+            for plot in comparison.plot (args.output):
+                print ("compare: {0}".format (plot))
+        else:
+            print ("compare: no plots, matplotlib is not installed")
+
+    regressions = [row for row in rows if row[11] == 'yes']
+    if regressions:
+        print ("compare: {0} regressions beyond {1}".format (len (regressions), args.thresholds))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit (main ())
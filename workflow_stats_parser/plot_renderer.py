@@ -0,0 +1,405 @@
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    plot_renderer.py
+
+    PURPOSE: Draws the workflow plots with matplotlib's Agg backend, straight
+             from the TimeSeries the parser has in memory. The csv files are
+             not read back and no process is started per plot.
+
+             The look of each plot (title, axis labels, line colours and the
+             name of the .png file) is read from its gnuplot template in
+             plot_templates, so that both backends draw the same plots and
+             there is one place to change them.
+
+    REQUIREMENTS:
+        matplotlib, only when this backend is selected (--plot_backend
+        matplotlib). gnuplot stays the default.
+"""
+
+from __future__ import division
+import math
+import os
+import re
+
+# The timestamps of a TimeSeries are in ms (see TICKS_PER_SECOND in
+# workflow_stats_parser.py): this many to an hour
+TICKS_PER_HOUR = 3600 * 1000
+
+
+def matplotlib_available ():
+    """
+    PURPOSE: Checks whether matplotlib can be imported
+
+    OUTPUTS: True or False
+
+    CALLEES: UserInput.check_args()
+    """
+    try:
+        import matplotlib
+    except ImportError:
+        return False
+    return True
+
+
+# The PlotTemplate of each template file, read once per process: a worker of
+# a batch plots every run it is given from them
+TEMPLATES = {}
+
+def load_template (template_file):
+    if template_file not in TEMPLATES:
+        TEMPLATES[template_file] = PlotTemplate (template_file)
+    return TEMPLATES[template_file]
+
+
+class PlotTemplate ():
+    """
+    PURPOSE: The settings of a gnuplot plot template that matter to the
+        matplotlib backend
+
+    ATTRIBUTES:
+        title: the plot title, without the subtitle
+        xlabel, ylabel: the axis labels
+        cblabel: the label of the colour bar of a heatmap
+        output: the file name of the .png
+        key_title: the title of the legend
+        key_rows: the legend has at most this many rows
+        colours: the line colours, one per stage
+    """
+    TITLE_REGEX = re.compile (r'^set title "(.*?)(?:\\n|")', re.M)
+    XLABEL_REGEX = re.compile (r'^set xlabel "([^"]*)"', re.M)
+    YLABEL_REGEX = re.compile (r'^set ylabel "([^"]*)"', re.M)
+    CBLABEL_REGEX = re.compile (r'^set cblabel "([^"]*)"', re.M)
+    OUTPUT_REGEX = re.compile (r'^set output "([^"]*)"', re.M)
+    KEY_TITLE_REGEX = re.compile (r'^set key .*title "([^"]*)"', re.M)
+    KEY_ROWS_REGEX = re.compile (r'^set key maxrows (\d+)', re.M)
+    COLOUR_REGEX = re.compile (r'^set style line (\d+) .*lc rgb "([^"]+)"', re.M)
+
+    def __init__ (self, template_file):
+        with open (template_file, 'r') as template:
+            text = template.read ()
+        self.title = self._find (self.TITLE_REGEX, text, '')
+        self.xlabel = self._find (self.XLABEL_REGEX, text, 'Time (hours)')
+        self.ylabel = self._find (self.YLABEL_REGEX, text, '')
+        self.cblabel = self._find (self.CBLABEL_REGEX, text, '')
+        self.output = os.path.basename (self._find (self.OUTPUT_REGEX, text,
+                                        os.path.splitext (os.path.basename (template_file))[0] + '.png'))
+        self.key_title = self._find (self.KEY_TITLE_REGEX, text, '')
+        self.key_rows = int (self._find (self.KEY_ROWS_REGEX, text, '4'))
+        colours = sorted ((int (number), colour) for number, colour in self.COLOUR_REGEX.findall (text))
+        self.colours = [colour for number, colour in colours] or ['red']
+
+    def _find (self, regex, text, default):
+        found = regex.search (text)
+        if found:
+            return found.group (1)
+        return default
+
+
+class MatplotlibRenderer ():
+    """
+    PURPOSE: Draws the plot of one metric: a line per workflow stage, the
+        time in hours since the start of the first stage on the x axis.
+        Like the gnuplot templates: 1920x1080, transparent, the legend
+        below the plot.
+        Usage example:
+            renderer = MatplotlibRenderer (output_dir, tag)
+            renderer.plot (template_file, series_list)
+
+    ATTRIBUTES:
+        output_dir: where the .png files are written
+        tag: the subtitle of the plots
+    """
+    SIZE = (19.2, 10.8)  # inches, at DPI
+    DPI = 100
+    LINE_WIDTH = 4
+    FONT_SIZE = 25
+    TITLE_FONT_SIZE = 35
+    HEATMAP_COLOURS = 'YlOrRd'  # the load of each core, see heatmap()
+
+    def __init__ (self, output_dir, tag):
+        self.output_dir = output_dir
+        self.tag = tag
+
+    def plot (self, template_file, series_list):
+        """
+        PURPOSE: Draws the series of one metric into a .png file
+
+        INPUTS:
+            template_file: the metric's gnuplot template
+            series_list: the metric's TimeSeries, one per stage
+
+        OUTPUTS: Returns the path of the .png file
+
+        CALLEES: SetOfColumns.make_csvs_for_metrics()
+        """
+        # Imported here so that matplotlib is only needed by this backend
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        template = load_template (template_file)
+        figure = Figure (figsize=self.SIZE, dpi=self.DPI)
+        FigureCanvasAgg (figure)
+        axes = figure.add_subplot (111)
+
+        # Times are in hours since the first sample of the first stage
+        started = [series for series in series_list if len (series)]
+        offset = started[0].times[0] if started else 0
+        for index, series in enumerate (series_list):
+            if not len (series):
+                continue
+            axes.plot ((series.times - offset) / TICKS_PER_HOUR, series.values,
+                       color=template.colours[index % len (template.colours)],
+                       linewidth=self.LINE_WIDTH, label=series.stage)
+
+        figure.suptitle (template.title, fontsize=self.TITLE_FONT_SIZE)
+        axes.set_title (self.tag, fontsize=self.TITLE_FONT_SIZE // 2)
+        axes.set_xlabel (template.xlabel, fontsize=self.FONT_SIZE)
+        axes.set_ylabel (template.ylabel, fontsize=self.FONT_SIZE)
+        axes.tick_params (labelsize=self.FONT_SIZE)
+        if started:
+            columns = int (math.ceil (len (started) / template.key_rows))
+            legend = axes.legend (loc='upper center', bbox_to_anchor=(0.5, -0.12), ncol=columns,
+                                  title=template.key_title, fontsize=self.FONT_SIZE)
+            legend.get_title ().set_fontsize (self.FONT_SIZE)
+        figure.subplots_adjust (bottom=0.3)
+
+        output_file = os.path.join (self.output_dir, template.output)
+        figure.savefig (output_file, dpi=self.DPI, transparent=True)
+        return output_file
+
+    def heatmap (self, template_file, series_list):
+        """
+        PURPOSE: Draws a metric that has a row of values per sample, the
+            load of each core, into a .png file: a row of the image per
+            core, the time in hours since the start of the first stage on
+            the x axis and the load as colour. The start of each stage is
+            marked by a vertical line.
+
+        INPUTS:
+            template_file: the metric's gnuplot template
+            series_list: the metric's TimeSeries, one per stage, whose
+                values are a samples x cores matrix
+
+        OUTPUTS: Returns the path of the .png file
+
+        CALLEES: SetOfColumns.plot_metric()
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        template = load_template (template_file)
+        figure = Figure (figsize=self.SIZE, dpi=self.DPI)
+        FigureCanvasAgg (figure)
+        axes = figure.add_subplot (111)
+
+        started = [series for series in series_list if len (series)]
+        offset = started[0].times[0] if started else 0
+        image = None
+        end = 0
+        cores = 0
+        for index, series in enumerate (series_list):
+            if not len (series):
+                continue
+            hours = (series.times - offset) / TICKS_PER_HOUR
+            # the last sample lasts as long as the others, on average
+            step = (hours[-1] - hours[0]) / (len (hours) - 1) if len (hours) > 1 else 1 / 3600
+            end = max (end, hours[-1] + step)
+            cores = max (cores, series.values.shape[1])
+            image = axes.imshow (series.values.T, aspect='auto', origin='lower', interpolation='nearest',
+                                 cmap=self.HEATMAP_COLOURS, vmin=0, vmax=100,
+                                 extent=(hours[0], hours[-1] + step, -0.5, series.values.shape[1] - 0.5))
+            axes.axvline (hours[0], color=template.colours[index % len (template.colours)],
+                          linewidth=self.LINE_WIDTH // 2, label=series.stage)
+        axes.set_xlim (0, end or 1)
+        axes.set_ylim (-0.5, max (cores, 1) - 0.5)
+
+        figure.suptitle (template.title, fontsize=self.TITLE_FONT_SIZE)
+        axes.set_title (self.tag, fontsize=self.TITLE_FONT_SIZE // 2)
+        axes.set_xlabel (template.xlabel, fontsize=self.FONT_SIZE)
+        axes.set_ylabel (template.ylabel, fontsize=self.FONT_SIZE)
+        axes.tick_params (labelsize=self.FONT_SIZE)
+        if image is not None:
+            colour_bar = figure.colorbar (image, ax=axes)
+            colour_bar.set_label (template.cblabel, fontsize=self.FONT_SIZE)
+            colour_bar.ax.tick_params (labelsize=self.FONT_SIZE)
+            columns = int (math.ceil (len (started) / template.key_rows))
+            axes.legend (loc='upper center', bbox_to_anchor=(0.5, -0.12), ncol=columns,
+                         fontsize=self.FONT_SIZE)
+        figure.subplots_adjust (bottom=0.3)
+
+        output_file = os.path.join (self.output_dir, template.output)
+        figure.savefig (output_file, dpi=self.DPI, transparent=True)
+        return output_file
+
+    def columns (self, template_file, series_list):
+        """
+        PURPOSE: Draws a metric that has a row of values per sample, the
+            traffic of each network interface, into a .png file: a line
+            per column, named after it, across the stages. The start of
+            each stage is marked by a dashed vertical line.
+
+        INPUTS:
+            template_file: the metric's gnuplot template
+            series_list: the metric's TimeSeries, one per stage, whose
+                values are a samples x columns matrix, the titles of the
+                columns in their columns attribute
+
+        OUTPUTS: Returns the path of the .png file
+
+        CALLEES: SetOfColumns.plot_metric()
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        template = load_template (template_file)
+        figure = Figure (figsize=self.SIZE, dpi=self.DPI)
+        FigureCanvasAgg (figure)
+        axes = figure.add_subplot (111)
+
+        started = [series for series in series_list if len (series)]
+        offset = started[0].times[0] if started else 0
+        # a stage may not have seen every interface: a column is the same
+        # line, and has the same colour, in all of them
+        names = []
+        for series in started:
+            names += [name for name in series.columns if name not in names]
+        labelled = set ()  # one legend entry per column
+        for series in started:
+            hours = (series.times - offset) / TICKS_PER_HOUR
+            for column, name in enumerate (series.columns):
+                number = names.index (name)
+                axes.plot (hours, series.values[:, column],
+                           color=template.colours[number % len (template.colours)],
+                           linewidth=self.LINE_WIDTH, label=name if name not in labelled else None)
+                labelled.add (name)
+            axes.axvline (hours[0], color='black', linestyle='--', linewidth=self.LINE_WIDTH // 2)
+
+        figure.suptitle (template.title, fontsize=self.TITLE_FONT_SIZE)
+        axes.set_title (self.tag, fontsize=self.TITLE_FONT_SIZE // 2)
+        axes.set_xlabel (template.xlabel, fontsize=self.FONT_SIZE)
+        axes.set_ylabel (template.ylabel, fontsize=self.FONT_SIZE)
+        axes.tick_params (labelsize=self.FONT_SIZE)
+        if names:
+            columns = int (math.ceil (len (names) / template.key_rows))
+            legend = axes.legend (loc='upper center', bbox_to_anchor=(0.5, -0.12), ncol=columns,
+                                  title=template.key_title, fontsize=self.FONT_SIZE)
+            legend.get_title ().set_fontsize (self.FONT_SIZE)
+        figure.subplots_adjust (bottom=0.3)
+
+        output_file = os.path.join (self.output_dir, template.output)
+        figure.savefig (output_file, dpi=self.DPI, transparent=True)
+        return output_file
+
+    def overlay (self, template_file, stages, runs):
+        """
+        PURPOSE: Draws the series of one metric in several runs into a .png
+            file: a plot per stage, a line per run, the time in hours since
+            the start of the stage in that run
+
+        INPUTS:
+            template_file: the metric's gnuplot template
+            stages: the names of the stages, in workflow order
+            runs: (name, stage name -> TimeSeries) per run; a run may miss
+                a stage
+
+        OUTPUTS: Returns the path of the .png file, compare_<the template's>
+
+        CALLEES: compare_runs.py
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        template = load_template (template_file)
+        figure = Figure (figsize=(self.SIZE[0], self.SIZE[1] * max (1, len (stages)) / 2), dpi=self.DPI)
+        FigureCanvasAgg (figure)
+        for number, stage in enumerate (stages):
+            axes = figure.add_subplot (len (stages), 1, number + 1)
+            for index, (name, series_by_stage) in enumerate (runs):
+                series = series_by_stage.get (stage)
+                if series is None or not len (series):
+                    continue
+                axes.plot ((series.times - series.times[0]) / TICKS_PER_HOUR, series.values,
+                           color=template.colours[index % len (template.colours)],
+                           linewidth=self.LINE_WIDTH // 2, label=name)
+            axes.set_title (stage, fontsize=self.FONT_SIZE)
+            axes.set_ylabel (template.ylabel, fontsize=self.FONT_SIZE // 2)
+            axes.tick_params (labelsize=self.FONT_SIZE // 2)
+            if number == 0:
+                axes.legend (loc='upper right', fontsize=self.FONT_SIZE // 2)
+        axes.set_xlabel ('Time since the start of the stage (hours)', fontsize=self.FONT_SIZE // 2)
+        figure.suptitle (template.title + ', by run', fontsize=self.TITLE_FONT_SIZE)
+        figure.subplots_adjust (hspace=0.5)
+
+        output_file = os.path.join (self.output_dir, 'compare_' + template.output)
+        figure.savefig (output_file, dpi=self.DPI, transparent=True)
+        return output_file
+
+    def scaling (self, template_file, title, ylabel, threads, lines, output_name, ideal=None):
+        """
+        PURPOSE: Draws a quantity of each stage against the thread count
+            into a .png file, a line per stage
+
+        INPUTS:
+            template_file: a gnuplot template, for the colours of the stages
+            title, ylabel: the plot title and the y axis label
+            threads: the thread counts, in increasing order
+            lines: (stage name, a value per thread count, None where the
+                stage has none) per stage
+            output_name: the file name of the .png
+            ideal: a value per thread count drawn as a dashed line, e.g. the
+                linear speedup, or None
+
+        OUTPUTS: Returns the path of the .png file
+
+        CALLEES: scaling_report.py
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        figure = Figure (figsize=self.SIZE, dpi=self.DPI)
+        FigureCanvasAgg (figure)
+        axes = figure.add_subplot (1, 1, 1)
+        colours = load_template (template_file).colours
+        for index, (stage, values) in enumerate (lines):
+            points = [(count, value) for count, value in zip (threads, values) if value is not None]
+            if not points:
+                continue
+            axes.plot ([count for count, value in points], [value for count, value in points],
+                       color=colours[index % len (colours)], linewidth=self.LINE_WIDTH,
+                       marker='o', label=stage)
+        if ideal is not None:
+            axes.plot (threads, ideal, color='grey', linestyle='--', linewidth=self.LINE_WIDTH // 2, label='ideal')
+        axes.set_xticks (threads)
+        axes.set_xlabel ('Threads', fontsize=self.FONT_SIZE)
+        axes.set_ylabel (ylabel, fontsize=self.FONT_SIZE)
+        axes.tick_params (labelsize=self.FONT_SIZE // 2)
+        axes.grid (True)
+        axes.legend (loc='best', fontsize=self.FONT_SIZE // 2)
+        figure.suptitle (title if not self.tag else title + '\n' + self.tag, fontsize=self.TITLE_FONT_SIZE)
+
+        output_file = os.path.join (self.output_dir, output_name)
+        figure.savefig (output_file, dpi=self.DPI, transparent=True)
+        return output_file
@@ -1,4 +1,3 @@
-#!/bin/bash
 #################################################################################
 # The MIT License (MIT)                                                         #
 #                                                                               #
@@ -23,23 +22,42 @@
 # THE SOFTWARE.                                                                 #
 #################################################################################
 
-unset me
-unset free
+clear
+reset
+print "network sent by each interface in MB/sec"
+set terminal pngcairo transparent enhanced font "arial,25" fontscale 1.0 size 1920, 1080
+set key outside bottom center box title "Interface" enhanced
+set key maxrows 4
+set key font ",25" spacing 1 samplen 2.9 width 2 height 1
+set xlabel "Time (hours)" font ",25"
+set ylabel "MBs/sec" font ",25"
 
-export me=`whoami`
+set output "/post_processed_stats/output_net_tx_iface.png"
+set title "Average Network Sent by Each Interface (MBs/s)\n{/*0.5 <subtitle>}" font ",35"
+set datafile separator ","
+#set xdata time
+set timefmt "%Y-%m-%d %H:%M:%S"
+#set xtics format "%d:%H:%M" font ",25"
+set ytics font ",25"
 
-#  Capture and record the PID of the correct emon 'counter' process:
-ps -aef | grep ${me} | grep 'free -' | grep -v 'grep' | grep -v 'kill' | awk '{printf "%8d", $2}' > ./dum_PID_free
-sort ./dum_PID_free > ./dum_PID_free.sorted
-free_PID=`tail -1 ./dum_PID_free.sorted | awk '{printf "%8d", $1}'`
-echo "free_PID: "${free_PID}
-while read line; do    
-  kill -s SIGUSR1 ${line}
-done < dum_PID_free.sorted
+set style line 1 lt 1 lc rgb "red" lw 4
+set style line 2 lt 1 lc rgb "orange" lw 4
+set style line 3 lt 1 lc rgb "brown" lw 4
+set style line 4 lt 1 lc rgb "green" lw 4
+set style line 5 lt 1 lc rgb "cyan" lw 4
+set style line 6 lt 1 lc rgb "blue" lw 4
+set style line 7 lt 1 lc rgb "violet" lw 4
+set style line 8 lt 1 lc rgb "yellow" lw 4
+set style line 9 lt 1 lc rgb "green" lw 4
+set style line 10 lt 1 lc rgb "cyan" lw 4
+set style line 11 lt 1 lc rgb "blue" lw 4
+set style line 12 lt 1 lc rgb "violet" lw 4
+show style line
 
-# Now kill that process
-#if [[ -z "${free_PID}" ]]; then 
-#  kill -s SIGUSR1 ${free_PID}
-#fi
-rm dum_PID_free*
-#    perl ./sar_parser.pl -f ${SARTSV} -o ${SAROUT}.csv &&
+# A line per interface, across the stages
+columns = 2
+names = "eth0 eth1"
+offset = 0
+t0(x)=(offset=($0==0) ? x : offset, x - offset)
+
+plot for [i=1:columns] "/post_processed_stats/2014-03-03_13.29.19_net_tx_iface.csv" using (t0(timecolumn(2))/3600):(column(i + 2)) every ::2 ls i t word(names, i) with lines
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    process_tree_collector.py
+
+    PURPOSE: Collects the resource usage of the workflow alone: its process
+             tree, from the process workflow_profiler.py started (see
+             WORKFLOW_ROOT_PID) down, without the profiler's collectors.
+             Started by 'collect_stats.ksh --proctree' with the other
+             collectors of a stage, so its samples belong to that stage.
+
+             The stream has the format of procfs_collector.py, with one
+             column per TREE_FIELDS, the sum over the tree's processes of:
+                 tree.procs, tree.threads    how many there are
+                 tree.cpu_ticks              user and system time, with that
+                                             of the children they reaped
+                 tree.minflt, tree.majflt    page faults, likewise
+                 tree.read_bytes,            storage reads and writes
+                 tree.write_bytes            (/proc/<pid>/io), likewise
+                 tree.rss_kb                 resident memory
+             A process that leaves the tree without being reaped by it (it
+             was orphaned) takes its counts along, so the counters may go
+             down; ProcfsReader counts no usage for such a sample.
+
+    USAGE:
+    process_tree_collector.py -o output_file [-p pid] [-i seconds] [-c count]
+
+    -o, --output          The stream file, e.g. <prefix>.30s.proctree
+    -p, --pid             The root of the tree. Default: $WORKFLOW_ROOT_PID
+    -i, --interval        Seconds between samples, may be below 1. Default 30
+    -c, --count           Stop after this many samples. Default 0: until
+                          stopped
+
+    REQUIREMENTS: Linux, Python 2.6 or 2.7, only the standard library.
+"""
+
+import argparse
+import os
+import signal
+import sys
+
+from procfs_collector import ProcfsCollector
+from collector_overhead import is_collector_command
+
+# Set by workflow_profiler.py to the pid of the workflow it runs
+ROOT_PID_VARIABLE = 'WORKFLOW_ROOT_PID'
+TREE_FIELDS = ['procs', 'threads', 'cpu_ticks', 'minflt', 'majflt',
+               'read_bytes', 'write_bytes', 'rss_kb']
+
+
+class ProcessTreeCollector (ProcfsCollector):
+    """
+    PURPOSE: Sums the counters of a process tree on every tick, see
+        ProcfsCollector.
+        Usage example:
+            collector = ProcessTreeCollector ('/proc', output_file, 30, pid)
+            collector.run ()
+
+    ATTRIBUTES:
+        root_pid: the root of the tree
+    """
+    def __init__ (self, proc_dir, output_file, interval, root_pid):
+        self.root_pid = root_pid
+        self.page_kb = os.sysconf ('SC_PAGE_SIZE') // 1024
+        ProcfsCollector.__init__ (self, proc_dir, output_file, interval)
+
+    def whole_disks (self):
+        return set ()
+
+    def read_counters (self):
+        """
+        PURPOSE: Sums the counters of the processes in the tree
+
+        INPUTS: None
+
+        OUTPUTS: Returns column name -> value, see TREE_FIELDS
+
+        ALGORITHM: The parent of every process is read from its stat file;
+            the tree is walked from the root. A collector, and what it
+            started, is left out.
+        """
+        stats = {}
+        children = {}
+        for name in os.listdir (self.proc_dir):
+            if name.isdigit ():
+                stat = self.read_process_stat (name)
+                if stat:
+                    stats[int (name)] = stat
+                    children.setdefault (int (stat[1][1]), []).append (int (name))
+
+        counters = dict (('tree.' + field, 0) for field in TREE_FIELDS)
+        pending = [self.root_pid] if self.root_pid in stats else []
+        while pending:
+            pid = pending.pop ()
+            command, fields = stats[pid]
+            if pid == os.getpid () or is_collector_command (command, self.read_cmdline (pid)):
+                continue
+            pending.extend (children.get (pid, []))
+            # fields[0] is the 3rd field of stat, see proc(5)
+            counters['tree.procs'] += 1
+            counters['tree.threads'] += int (fields[17])
+            counters['tree.cpu_ticks'] += sum (int (value) for value in fields[11:15])
+            counters['tree.minflt'] += int (fields[7]) + int (fields[8])
+            counters['tree.majflt'] += int (fields[9]) + int (fields[10])
+            counters['tree.rss_kb'] += int (fields[21]) * self.page_kb
+            for line in self.read_process_file (pid, 'io'):
+                name, _, value = line.partition (':')
+                if name in ('read_bytes', 'write_bytes'):
+                    counters['tree.' + name] += int (value)
+        return counters
+
+    def read_process_stat (self, pid):
+        # Returns (command, the fields after it), None for a process that
+        # is gone. The command is in parentheses and may hold spaces.
+        lines = self.read_process_file (pid, 'stat')
+        if not lines:
+            return None
+        stat = lines[0]
+        return stat[stat.index ('(') + 1:stat.rindex (')')], stat[stat.rindex (')') + 2:].split ()
+
+    def read_cmdline (self, pid):
+        return ''.join (self.read_process_file (pid, 'cmdline')).split ('\0')
+
+    def read_process_file (self, pid, name):
+        # Unlike the files of ProcfsCollector.read(), these are opened
+        # each time: the processes come and go
+        try:
+            with open (os.path.join (self.proc_dir, str (pid), name), 'r') as proc_file:
+                return proc_file.read ().splitlines ()
+        except (IOError, OSError):
+            return []
+
+
+def main (argv=None):
+    """
+    PURPOSE: The entry point: parses the arguments and collects until
+        stopped
+
+    INPUTS: argv - a list holding the command line user arguments
+
+    OUTPUTS: Exits 0 once stopped
+    """
+    parser = argparse.ArgumentParser (description="Collects the workflow's process tree statistics into a binary stream")
+    parser.add_argument ("-o", "--output", required=True, help="The stream file")
+    parser.add_argument ("-p", "--pid", type=int, default=os.environ.get (ROOT_PID_VARIABLE),
+                         help="The root of the tree. Default: $" + ROOT_PID_VARIABLE)
+    parser.add_argument ("-i", "--interval", type=float, default=30,
+                         help="Seconds between samples, may be below 1. Default 30")
+    parser.add_argument ("-c", "--count", type=int, default=0,
+                         help="Stop after this many samples. Default 0: until stopped")
+    parser.add_argument ("--proc", default='/proc', help=argparse.SUPPRESS)
+    args = parser.parse_args (argv)
+    if args.pid is None:
+        parser.error ("-p is required when $" + ROOT_PID_VARIABLE + " is not set")
+    if args.interval <= 0:
+        parser.error ("-i must be above 0")
+
+    collector = ProcessTreeCollector (args.proc, args.output, args.interval, int (args.pid))
+    for signum in (signal.SIGTERM, signal.SIGUSR1, signal.SIGINT, signal.SIGHUP):
+        signal.signal (signum, collector.stop)
+    collector.run (args.count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit (main ())
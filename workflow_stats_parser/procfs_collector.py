@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    procfs_collector.py
+
+    PURPOSE: Collects the system statistics of a workflow stage in a single
+             process, in place of sar, iostat, mpstat, free and netstat. The
+             counters are read straight from procfs on a common wall-clock
+             tick (a multiple of the interval since the epoch, so the
+             samples of all the stages and machines line up) and appended to
+             one binary stream file, which the parser reads with
+             ProcfsReader (procfs_reader.py).
+
+             Started by 'collect_stats.ksh --procfs'; stops on SIGTERM,
+             SIGUSR1 ('collect_stats.ksh --kill-all', see
+             collector_supervisor.py) or Ctrl-C.
+
+    USAGE:
+    procfs_collector.py -o output_file [-i seconds] [-c count]
+
+    -o, --output          The stream file, e.g. <prefix>.30s.procfs
+    -i, --interval        Seconds between samples, may be below 1. Default 30
+    -c, --count           Stop after this many samples. Default 0: until
+                          stopped
+
+    STREAM FORMAT:
+        STREAM_MAGIC (8 bytes), the format version (uint16), the length
+        of the header (uint32), the header: JSON with the interval, the
+        host, the clock ticks per second, the number of cpus, the offset of
+        local time from UTC in seconds and the names of the columns; then
+        zero bytes up to a multiple of 8. Then one record per sample: the
+        time it was taken (float64, seconds since the epoch), the presence
+        mask (a uint64 per 64 columns, bit N of word N // 64 set when
+        column N was read) and one uint64 per column, all little endian.
+        A column that was not read (a disk or network interface that went
+        away since the start) is 0 and its bit is clear. Version 1 streams
+        have no mask. The columns are the raw counters and levels:
+            cpu.<field>, cpu<N>.<field>   /proc/stat, in clock ticks
+            stat.<field>                  /proc/stat: ctxt, processes, ...
+            disk.<device>.<field>         /proc/diskstats, whole disks only
+            mem.<field>                   /proc/meminfo, in kB
+            vm.<field>                    /proc/vmstat
+            net.<interface>.<field>       /proc/net/dev
+            tcp.<field>                   /proc/net/snmp, the Tcp: lines
+            load.<field>                  /proc/loadavg, in thousandths
+        A record is written with a single write, so a reader of a stream
+        that is still being written only has to ignore a partial last one.
+
+    REQUIREMENTS: Linux, Python 2.6 or 2.7. Only the standard library, so
+        it can run on machines where numpy is not installed.
+"""
+
+from __future__ import division
+import argparse
+import json
+import math
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+
+STREAM_MAGIC = 'WPPROCFS'
+STREAM_VERSION = 2
+# magic, version, header length
+STREAM_PREAMBLE = struct.Struct ('<8sHI')
+
+# Field names of the lines of /proc/stat, /proc/diskstats and /proc/net/dev
+CPU_FIELDS = ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq',
+              'steal', 'guest', 'guest_nice']
+STAT_FIELDS = ['ctxt', 'intr', 'processes', 'procs_running', 'procs_blocked']
+DISK_FIELDS = ['reads', 'reads_merged', 'sectors_read', 'read_ms',
+               'writes', 'writes_merged', 'sectors_written', 'write_ms',
+               'in_flight', 'io_ms', 'weighted_io_ms']
+NET_FIELDS = ['rx_bytes', 'rx_packets', 'rx_errs', 'rx_drop', 'rx_fifo',
+              'rx_frame', 'rx_compressed', 'rx_multicast',
+              'tx_bytes', 'tx_packets', 'tx_errs', 'tx_drop', 'tx_fifo',
+              'tx_colls', 'tx_carrier', 'tx_compressed']
+# The counters of the Tcp: lines of /proc/net/snmp that sar -n TCP,ETCP print,
+# and CurrEstab, the connections established at the time of the record (a
+# level, see ProcfsReader's sar -n SOCK)
+TCP_FIELDS = ['ActiveOpens', 'PassiveOpens', 'AttemptFails', 'EstabResets',
+              'InSegs', 'OutSegs', 'RetransSegs', 'InErrs', 'OutRsts', 'CurrEstab']
+VM_FIELDS = ['pgpgin', 'pgpgout', 'pswpin', 'pswpout', 'pgfault', 'pgmajfault']
+LOAD_FIELDS = ['1min', '5min', '15min']
+
+
+class ProcfsCollector ():
+    """
+    PURPOSE: Reads the procfs files once per tick and appends a record to
+        the stream. The files stay open between ticks and are read again
+        from the start, so a sample costs a few reads and one write.
+        Usage example:
+            collector = ProcfsCollector ('/proc', output_file, 30)
+            collector.run ()
+
+    ATTRIBUTES:
+        proc_dir: where procfs is mounted
+        interval: seconds between samples
+        columns: the names of the record's columns, fixed at the start;
+            the presence mask of each record tells those read from the
+            others
+        stopped: set by a signal, the collector stops before the next tick
+    """
+    def __init__ (self, proc_dir, output_file, interval):
+        self.proc_dir = proc_dir
+        self.output_file = output_file
+        self.interval = interval
+        self.stopped = False
+        self._files = {}
+        self.disks = self.whole_disks ()
+        self.columns = sorted (self.read_counters ().keys ())
+        self._mask_words = mask_words (len (self.columns))
+        self._record = struct.Struct ('<d' + 'Q' * (self._mask_words + len (self.columns)))
+
+    def run (self, count=0):
+        """
+        PURPOSE: Writes the stream header, then a record on every tick
+            until stopped, or until count records were written
+
+        INPUTS: count: the number of records, 0 for no limit
+
+        OUTPUTS: None
+        """
+        handle = os.open (self.output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0644)
+        try:
+            os.write (handle, self.stream_header ())
+            written = 0
+            while not self.stopped and (not count or written < count):
+                self.wait_for_tick ()
+                if self.stopped:
+                    break
+                now = time.time ()
+                counters = self.read_counters ()
+                mask = [0] * self._mask_words
+                for index, name in enumerate (self.columns):
+                    if name in counters:
+                        mask[index // 64] |= 1 << (index % 64)
+                values = [min (max (int (counters.get (name, 0)), 0), (1 << 64) - 1)
+                          for name in self.columns]
+                os.write (handle, self._record.pack (now, *(mask + values)))
+                written += 1
+        finally:
+            os.close (handle)
+            for proc_file in self._files.itervalues ():
+                proc_file.close ()
+
+    def stop (self, signum=None, frame=None):
+        self.stopped = True
+
+    def stream_header (self):
+        header = json.dumps ({
+            'interval': self.interval,
+            'host': socket.gethostname (),
+            'clock_ticks': os.sysconf ('SC_CLK_TCK'),
+            'cpus': os.sysconf ('SC_NPROCESSORS_ONLN'),
+            'utc_offset': utc_offset (time.time ()),
+            'columns': self.columns,
+        })
+        preamble = STREAM_PREAMBLE.pack (STREAM_MAGIC, STREAM_VERSION, len (header))
+        padding = -(len (preamble) + len (header)) % 8
+        return preamble + header + '\0' * padding
+
+    def wait_for_tick (self):
+        # The ticks are multiples of the interval since the epoch
+        now = time.time ()
+        tick = math.floor (now / self.interval + 1) * self.interval
+        while not self.stopped and now < tick:
+            time.sleep (min (tick - now, 1))
+            now = time.time ()
+
+    # Readers of the procfs files -------
+    def read_counters (self):
+        """
+        PURPOSE: Reads all the counters once
+
+        INPUTS: None
+
+        OUTPUTS: Returns column name -> value
+        """
+        counters = {}
+        counters.update (self.read_stat ())
+        counters.update (self.read_diskstats ())
+        counters.update (self.read_meminfo ())
+        counters.update (self.read_vmstat ())
+        counters.update (self.read_net_dev ())
+        counters.update (self.read_net_snmp ())
+        counters.update (self.read_loadavg ())
+        return counters
+
+    def read_stat (self):
+        counters = {}
+        for line in self.read ('stat'):
+            words = line.split ()
+            if not words:
+                continue
+            if words[0].startswith ('cpu'):
+                for field, value in zip (CPU_FIELDS, words[1:]):
+                    counters[words[0] + '.' + field] = int (value)
+            elif words[0] in STAT_FIELDS:
+                counters['stat.' + words[0]] = int (words[1])
+        return counters
+
+    def read_diskstats (self):
+        counters = {}
+        for line in self.read ('diskstats'):
+            words = line.split ()
+            if len (words) < 3 + len (DISK_FIELDS) or words[2] not in self.disks:
+                continue
+            for field, value in zip (DISK_FIELDS, words[3:]):
+                counters['disk.' + words[2] + '.' + field] = int (value)
+        return counters
+
+    def read_meminfo (self):
+        counters = {}
+        for line in self.read ('meminfo'):
+            words = line.split ()
+            if len (words) >= 2:
+                counters['mem.' + words[0].rstrip (':')] = int (words[1])
+        return counters
+
+    def read_vmstat (self):
+        counters = {}
+        for line in self.read ('vmstat'):
+            words = line.split ()
+            if len (words) == 2 and words[0] in VM_FIELDS:
+                counters['vm.' + words[0]] = int (words[1])
+        return counters
+
+    def read_net_dev (self):
+        counters = {}
+        for line in self.read ('net/dev'):
+            if ':' not in line:
+                continue  # the two title lines
+            interface, values = line.split (':', 1)
+            for field, value in zip (NET_FIELDS, values.split ()):
+                counters['net.' + interface.strip () + '.' + field] = int (value)
+        return counters
+
+    def read_net_snmp (self):
+        # a line of names, then a line of values, per protocol
+        counters = {}
+        tcp = [line.split ()[1:] for line in self.read ('net/snmp') if line.startswith ('Tcp:')]
+        if len (tcp) == 2:
+            for field, value in zip (*tcp):
+                if field in TCP_FIELDS:
+                    counters['tcp.' + field] = int (value)
+        return counters
+
+    def read_loadavg (self):
+        words = (self.read ('loadavg') or [''])[0].split ()
+        return dict (('load.' + field, int (round (float (value) * 1000)))
+                     for field, value in zip (LOAD_FIELDS, words))
+
+    def read (self, name):
+        """
+        PURPOSE: Reads a procfs file from the start, opening it the first
+            time only
+
+        INPUTS: name: the file, relative to proc_dir
+
+        OUTPUTS: Returns its lines, none when it can't be read
+        """
+        try:
+            proc_file = self._files.get (name)
+            if proc_file is None:
+                proc_file = self._files[name] = open (os.path.join (self.proc_dir, name), 'r')
+            proc_file.seek (0)
+            return proc_file.read ().splitlines ()
+        except (IOError, OSError):
+            return []
+
+    def whole_disks (self):
+        # /sys/block lists the disks, not their partitions; without sysfs
+        # every device in diskstats is kept
+        try:
+            return set (name.replace ('!', '/') for name in os.listdir ('/sys/block')
+                        if not name.startswith (('ram', 'loop')))
+        except OSError:
+            return set (line.split ()[2] for line in self.read ('diskstats') if len (line.split ()) > 2)
+
+
+def mask_words (columns):
+    # The uint64 words of the presence mask of a record
+    return (columns + 63) // 64
+
+
+def utc_offset (when):
+    # Seconds to add to UTC to get the local time, as sar and iostat print it
+    if time.localtime (when).tm_isdst and time.daylight:
+        return -time.altzone
+    return -time.timezone
+
+
+def main (argv=None):
+    """
+    PURPOSE: The entry point: parses the arguments and collects until
+        stopped
+
+    INPUTS: argv - a list holding the command line user arguments
+
+    OUTPUTS: Exits 0 once stopped
+    """
+    parser = argparse.ArgumentParser (description='Collects procfs statistics into a binary stream')
+    parser.add_argument ("-o", "--output", required=True, help="The stream file")
+    parser.add_argument ("-i", "--interval", type=float, default=30,
+                         help="Seconds between samples, may be below 1. Default 30")
+    parser.add_argument ("-c", "--count", type=int, default=0,
+                         help="Stop after this many samples. Default 0: until stopped")
+    parser.add_argument ("--proc", default='/proc', help=argparse.SUPPRESS)
+    args = parser.parse_args (argv)
+    if args.interval <= 0:
+        parser.error ("-i must be above 0")
+
+    collector = ProcfsCollector (args.proc, args.output, args.interval)
+    for signum in (signal.SIGTERM, signal.SIGUSR1, signal.SIGINT, signal.SIGHUP):
+        signal.signal (signum, collector.stop)
+    collector.run (args.count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit (main ())
@@ -0,0 +1,376 @@
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    procfs_reader.py
+
+    PURPOSE: Reads the binary streams written by procfs_collector.py. The
+             records are memory-mapped as one numpy array and the values
+             the parser's metrics need are computed from the counters the
+             way sar and iostat compute them, so the stream can stand in for
+             the sar and iostat logs of a stage:
+                 sar -u    %user, %nice, %system, %iowait, %steal, %idle
+                 sar -b    tps, rtps, wtps, bread/s, bwrtn/s
+                 sar -r    kbmemfree, kbmemused, %memused, kbbuffers,
+                           kbcached, kbcommit, %commit
+                 sar -n DEV  rxpck/s, txpck/s, rxkB/s, txkB/s, a row per
+                           interface
+                 sar -n SOCK tcpsck, from the connections established
+                 sar -n TCP  active/s, passive/s, iseg/s, oseg/s
+                 sar -n ETCP atmptf/s, estres/s, retrans/s, isegerr/s,
+                           orsts/s
+                 iostat -x await, summed over the disks
+             and the streams of process_tree_collector.py, for the
+             workflow's own usage:
+                 -T        %cpu, rss_kb, read_bytes/s, write_bytes/s,
+                           minflt/s, majflt/s, procs
+
+             The timestamps are the local time of the collecting machine, to
+             the millisecond, so that samples taken less than a second apart
+             keep times of their own.
+"""
+
+from __future__ import division
+from collections import OrderedDict
+import json
+import numpy
+
+from procfs_collector import STREAM_MAGIC, STREAM_VERSION, STREAM_PREAMBLE, mask_words
+from sar_binary_reader import SarSection
+
+# Versions 1 and 2 differ only by the presence mask of the records
+READABLE_VERSIONS = (1, STREAM_VERSION)
+
+# The whole file ends with this, see InputOutput.get_log_file()
+PROCFS_SUFFIX = '.procfs'
+
+
+class ProcfsReader ():
+    """
+    PURPOSE: Decodes one procfs stream into SarSection objects, like
+        SarBinaryReader does for a sar file.
+        Usage example:
+            if ProcfsReader.can_read(stream_file):
+                with ProcfsReader(stream_file) as reader:
+                    for chunk in reader.sections('-b', 16384):
+                        ...
+
+    ATTRIBUTES:
+        filename: the stream file
+        header: the stream header, see procfs_collector.py
+        records: numpy.memmap of the records, one field per column, and
+            'present', the presence mask, in version 2 streams
+        times: datetime64[ms] array, the local time of each record
+    """
+
+    def __init__ (self, filename, resume=None):
+        self.filename = filename
+        with open (filename, 'rb') as stream:
+            magic, version, length = STREAM_PREAMBLE.unpack (stream.read (STREAM_PREAMBLE.size))
+            if magic != STREAM_MAGIC or version not in READABLE_VERSIONS:
+                raise Exception("{0}: not a version {1} procfs stream".format(filename, " or ".join (str (number) for number in READABLE_VERSIONS)))
+            self.header = json.loads (stream.read (length))
+            stream.seek (0, 2)
+            size = stream.tell ()
+        start = STREAM_PREAMBLE.size + length
+        start += -start % 8
+        mask = [('present', '<u8', (mask_words (len (self.header['columns'])),))] if version > 1 else []
+        dtype = numpy.dtype ([('time', '<f8')] + mask + [(str (name), '<u8') for name in self.header['columns']])
+        self.column_index = dict ((name, index) for index, name in enumerate (self.header['columns']))
+        # a record that is still being written is left out
+        count = max (size - start, 0) // dtype.itemsize
+        first = resume or 0
+        if count > first:
+            self.records = numpy.memmap (filename, dtype=dtype, mode='r',
+                                         offset=start + first * dtype.itemsize, shape=(count - first,))
+        else:
+            self.records = numpy.zeros (0, dtype=dtype)
+        self.first = first
+        local = numpy.round ((self.records['time'] + self.header['utc_offset']) * 1000).astype (numpy.int64)
+        self.times = local.astype ('datetime64[ms]')
+        self.disks = sorted (set (name.split ('.')[1] for name in self.header['columns']
+                                  if name.startswith ('disk.')))
+        # an interface's name may hold dots, its field does not
+        self.interfaces = sorted (set (name[len ('net.'):].rsplit ('.', 1)[0] for name in self.header['columns']
+                                       if name.startswith ('net.')))
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *exc_info):
+        self.close ()
+
+    def close (self):
+        self.records = None
+
+    @staticmethod
+    def can_read (filename):
+        """
+        PURPOSE: Checks whether a file is a procfs stream
+
+        INPUTS: filename: path to the file
+
+        OUTPUTS: True or False
+
+        CALLEES: LogScanSession.scan(), LiveTail.follow()
+        """
+        try:
+            with open (filename, 'rb') as stream:
+                head = stream.read (STREAM_PREAMBLE.size)
+        except IOError:
+            return False
+        if len (head) != STREAM_PREAMBLE.size:
+            return False
+        magic, version = STREAM_PREAMBLE.unpack (head)[:2]
+        return magic == STREAM_MAGIC and version in READABLE_VERSIONS
+
+    def section (self, flag, start=0, stop=None):
+        """
+        PURPOSE: Computes the values sar (or iostat) prints for one activity
+
+        INPUTS:
+            flag: '-u' (cpu, all cores), '-b' (io), '-r' (memory), '-d'
+                (iostat's await), '-n DEV', '-n SOCK', '-n TCP', '-n ETCP'
+                (network)
+                or '-T' (the workflow's process tree)
+            start, stop: the records to decode, all of them by default
+
+        OUTPUTS: Returns a SarSection
+
+        ALGORITHM: Each sample is the difference between two consecutive
+            records, so the first record only serves as a starting point.
+
+        CALLEES: ProcfsReader.sections()
+        """
+        records = self.records[start:stop]
+        seconds = numpy.diff (records['time'])
+        seconds[seconds <= 0] = 1
+        rows = None
+        if flag == '-u':
+            columns = self._cpu_columns (records)
+        elif flag == '-b':
+            columns = self._io_columns (records, seconds)
+        elif flag == '-r':
+            columns = self._memory_columns (records)
+        elif flag == '-d':
+            columns = self._await_columns (records)
+        elif flag == '-n DEV':
+            columns, rows = self._net_dev_columns (records, seconds)
+        elif flag == '-n SOCK' and 'tcp.CurrEstab' in self.header['columns']:
+            columns = self._sock_columns (records)
+        elif flag == '-n TCP' and 'tcp.ActiveOpens' in self.header['columns']:
+            columns = self._tcp_columns (records, seconds, [
+                ('active/s', 'ActiveOpens'), ('passive/s', 'PassiveOpens'),
+                ('iseg/s', 'InSegs'), ('oseg/s', 'OutSegs')])
+        elif flag == '-n ETCP' and 'tcp.RetransSegs' in self.header['columns']:
+            columns = self._tcp_columns (records, seconds, [
+                ('atmptf/s', 'AttemptFails'), ('estres/s', 'EstabResets'),
+                ('retrans/s', 'RetransSegs'), ('isegerr/s', 'InErrs'),
+                ('orsts/s', 'OutRsts')])
+        elif flag == '-T' and 'tree.procs' in self.header['columns']:
+            columns = self._tree_columns (records, seconds)
+        else:
+            raise Exception("sar {0} is not in procfs streams".format(flag))
+        return SarSection (flag, self.times[start:stop][1:], columns, rows)
+
+    def sections (self, flag, size):
+        """
+        PURPOSE: Decodes one activity a few records at a time
+
+        INPUTS:
+            flag: see section()
+            size: the number of samples in each SarSection
+
+        OUTPUTS: Yields SarSection objects, in time order
+
+        CALLEES: LogScanner.read_sections()
+        """
+        # consecutive chunks share one record, the starting point of the
+        # next chunk's first sample
+        for start in range (0, len (self.records) - 1, size):
+            yield self.section (flag, start, start + size + 1)
+
+    def resume_point (self):
+        """
+        PURPOSE: Where a later reader of the same, growing, stream starts
+
+        INPUTS: None
+
+        OUTPUTS: Returns the index of the last record, which is read again
+            as the starting point of the next sample, or None when there is
+            no record
+
+        CALLEES: LiveTail.follow()
+        """
+        if not len (self.records):
+            return None
+        return self.first + len (self.records) - 1
+
+    # Helpers -------
+    def _present (self, records, name):
+        # whether each record read the column
+        if 'present' not in records.dtype.names:
+            return numpy.ones (len (records), dtype=bool)
+        index = self.column_index[name]
+        return (records['present'][:, index // 64] >> numpy.uint64 (index % 64)) & numpy.uint64 (1) == 1
+
+    def _delta (self, records, name):
+        values = records[name].astype (numpy.int64)
+        delta = numpy.diff (values)
+        # A counter that went back is a 32 bit counter that wrapped, when it
+        # was in the top half of its range, else a counter that was reset
+        # (a device that came back), which counts nothing
+        wrapped = (delta < 0) & (values[:-1] >= 1 << 31) & (values[:-1] < 1 << 32)
+        delta[wrapped] += 1 << 32
+        delta[delta < 0] = 0
+        # nor does a sample with a record that did not read the counter
+        present = self._present (records, name)
+        delta[~(present[1:] & present[:-1])] = 0
+        return delta
+
+    def _cpu_columns (self, records):
+        delta = dict ((field, self._delta (records, 'cpu.' + field))
+                      for field in ('user', 'nice', 'system', 'idle', 'iowait',
+                                    'irq', 'softirq', 'steal', 'guest', 'guest_nice'))
+        # guest time is counted in user time too
+        total = sum (delta[field] for field in ('user', 'nice', 'system', 'idle',
+                                                 'iowait', 'irq', 'softirq', 'steal')).astype (float)
+        total[total == 0] = 1
+
+        def percent (ticks):
+            return numpy.round (numpy.clip (ticks, 0, None) / total * 100, 2)
+
+        return OrderedDict ([
+            ('%user', percent (delta['user'] - delta['guest'])),
+            ('%nice', percent (delta['nice'] - delta['guest_nice'])),
+            ('%system', percent (delta['system'] + delta['irq'] + delta['softirq'])),
+            ('%iowait', percent (delta['iowait'])),
+            ('%steal', percent (delta['steal'])),
+            ('%idle', percent (delta['idle'])),
+        ])
+
+    def _disk_delta (self, records, field):
+        total = numpy.zeros (max (len (records) - 1, 0), dtype=numpy.int64)
+        for disk in self.disks:
+            total += self._delta (records, 'disk.' + disk + '.' + field)
+        return total
+
+    def _io_columns (self, records, seconds):
+        def per_second (count):
+            return numpy.round (count / seconds, 2)
+
+        reads = self._disk_delta (records, 'reads')
+        writes = self._disk_delta (records, 'writes')
+        return OrderedDict ([
+            ('tps', per_second (reads + writes)),
+            ('rtps', per_second (reads)),
+            ('wtps', per_second (writes)),
+            ('bread/s', per_second (self._disk_delta (records, 'sectors_read'))),
+            ('bwrtn/s', per_second (self._disk_delta (records, 'sectors_written'))),
+        ])
+
+    def _memory_columns (self, records):
+        # memory is a level, not a counter: the sample is the later record
+        memory = dict ((field, records['mem.' + field][1:].astype (numpy.int64))
+                       for field in ('MemTotal', 'MemFree', 'Buffers', 'Cached',
+                                     'Committed_AS', 'SwapTotal'))
+        total = memory['MemTotal'].astype (float)
+        total[total == 0] = 1
+        commit_total = (memory['MemTotal'] + memory['SwapTotal']).astype (float)
+        commit_total[commit_total == 0] = 1
+        used = memory['MemTotal'] - memory['MemFree']
+
+        return OrderedDict ([
+            ('kbmemfree', memory['MemFree']),
+            ('kbmemused', used),
+            ('%memused', numpy.round (used / total * 100, 2)),
+            ('kbbuffers', memory['Buffers']),
+            ('kbcached', memory['Cached']),
+            ('kbcommit', memory['Committed_AS']),
+            ('%commit', numpy.round (memory['Committed_AS'] / commit_total * 100, 2)),
+        ])
+
+    def _await_columns (self, records):
+        # iostat's await of each disk: the time its requests took, in ms,
+        # over the number of requests; the sample is the sum over the disks
+        total = numpy.zeros (max (len (records) - 1, 0))
+        for disk in self.disks:
+            prefix = 'disk.' + disk + '.'
+            requests = (self._delta (records, prefix + 'reads') +
+                        self._delta (records, prefix + 'writes')).astype (float)
+            waited = self._delta (records, prefix + 'read_ms') + self._delta (records, prefix + 'write_ms')
+            total += numpy.where (requests > 0, waited / numpy.maximum (requests, 1), 0)
+        return OrderedDict ([('await', numpy.round (total, 2))])
+
+    def _net_dev_columns (self, records, seconds):
+        # a row per interface, in the same order in every sample
+        samples = max (len (records) - 1, 0)
+        names = numpy.empty ((samples, len (self.interfaces)), dtype='S16')
+        names[:] = self.interfaces
+
+        def per_second (field, scale=1):
+            rates = numpy.zeros ((samples, len (self.interfaces)))
+            for row, interface in enumerate (self.interfaces):
+                rates[:, row] = self._delta (records, 'net.' + interface + '.' + field) / seconds / scale
+            return numpy.round (rates, 2)
+
+        return OrderedDict ([
+            ('rxpck/s', per_second ('rx_packets')),
+            ('txpck/s', per_second ('tx_packets')),
+            ('rxkB/s', per_second ('rx_bytes', 1024)),
+            ('txkB/s', per_second ('tx_bytes', 1024)),
+        ]), OrderedDict ([('IFACE', names)])
+
+    def _sock_columns (self, records):
+        # sar's tcpsck counts the tcp sockets in use (/proc/net/sockstat),
+        # the stream has the connections established (CurrEstab). Like
+        # memory it is a level, the sample is the later record
+        return OrderedDict ([('tcpsck', records['tcp.CurrEstab'][1:].astype (numpy.int64))])
+
+    def _tcp_columns (self, records, seconds, printed):
+        return OrderedDict ((column, numpy.round (self._delta (records, 'tcp.' + counter) / seconds, 2))
+                            for column, counter in printed)
+
+    def _tree_columns (self, records, seconds):
+        # The sums over a process tree go down when a process leaves it with
+        # its counts, they don't wrap: no usage is counted for that sample
+        def delta (field):
+            return numpy.clip (numpy.diff (records['tree.' + field].astype (numpy.int64)), 0, None)
+
+        def per_second (field):
+            return numpy.round (delta (field) / seconds, 2)
+
+        # %cpu is of the whole machine, as sar's, not of one cpu as top's;
+        # the ticks of a sample are not taken at the same time as its
+        # timestamp, so the share may come out slightly above 100
+        ticks = seconds * self.header['clock_ticks'] * self.header.get ('cpus', 1)
+        return OrderedDict ([
+            ('%cpu', numpy.round (numpy.clip (delta ('cpu_ticks') / ticks * 100, 0, 100), 2)),
+            ('rss_kb', records['tree.rss_kb'][1:].astype (numpy.int64)),
+            ('read_bytes/s', per_second ('read_bytes')),
+            ('write_bytes/s', per_second ('write_bytes')),
+            ('minflt/s', per_second ('minflt')),
+            ('majflt/s', per_second ('majflt')),
+            ('procs', records['tree.procs'][1:].astype (numpy.int64)),
+        ])
@@ -0,0 +1,567 @@
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    sar_binary_reader.py
+
+    PURPOSE: Reads the binary data files written by 'sar -o' (collect_stats.ksh
+             runs 'sar -A -o ${SARDATA}') without calling the sar command.
+             The file is memory-mapped, the record headers are walked once and
+             the counters of the CPU, I/O and memory activities are gathered
+             into numpy arrays. The values are then computed the same way sar
+             computes them for 'sar -u', 'sar -b', 'sar -r' and 'sar -n
+             DEV,SOCK,TCP,ETCP', and rounded the way sar prints them, so the
+             metric classes get exactly the numbers they would have parsed
+             out of sar's text output.
+
+    SUPPORTED FILES:
+        sysstat 9.0.x data files (format magic 0x1170) written on a 64 bit
+        system. This is the version the profiler is tested with (9.0.4) and
+        the one the sample data was collected with. Other formats are
+        reported by SarBinaryReader.can_read() so that the caller can fall
+        back to decoding with sar.
+"""
+
+from __future__ import division
+from collections import OrderedDict
+from datetime import datetime
+import mmap
+import struct
+import numpy
+
+SYSSTAT_MAGIC = 0xd596
+FORMAT_MAGIC_9_0 = 0x1170
+
+# Sizes and offsets of the sysstat 9.0.x structures (64 bit, see sa.h)
+FILE_MAGIC_SIZE = 8
+FILE_HEADER_SIZE = 280
+FILE_ACTIVITY_SIZE = 12
+RECORD_HEADER_SIZE = 48
+MAX_COMMENT_LEN = 64
+
+# Record types
+R_STATS = 1
+R_RESTART = 2
+R_LAST_STATS = 3
+R_COMMENT = 4
+
+# Activity ids
+A_CPU = 1
+A_IO = 6
+A_MEMORY = 7
+A_NET_DEV = 12
+A_NET_SOCK = 16
+A_NET_TCP = 21
+A_NET_ETCP = 22
+
+# sar reports rates per second using the clock ticks of the kernel
+HZ = 100
+
+# The 9.0.x stats structures align every field on 16 bytes (cpu, io) or
+# 8 bytes (memory). Field name -> (byte offset in the structure, type)
+CPU_FIELDS = OrderedDict([
+    ('user', (0, '<u8')),
+    ('nice', (16, '<u8')),
+    ('sys', (32, '<u8')),
+    ('idle', (48, '<u8')),
+    ('iowait', (64, '<u8')),
+    ('steal', (80, '<u8')),
+    ('hardirq', (96, '<u8')),
+    ('softirq', (112, '<u8')),
+    ('guest', (128, '<u8')),
+])
+
+IO_FIELDS = OrderedDict([
+    ('dk_drive', (0, '<u4')),
+    ('dk_drive_rio', (16, '<u4')),
+    ('dk_drive_wio', (32, '<u4')),
+    ('dk_drive_rblk', (48, '<u4')),
+    ('dk_drive_wblk', (64, '<u4')),
+])
+
+MEMORY_FIELDS = OrderedDict([
+    ('frmkb', (0, '<u8')),
+    ('bufkb', (8, '<u8')),
+    ('camkb', (16, '<u8')),
+    ('tlmkb', (24, '<u8')),
+    ('frskb', (32, '<u8')),
+    ('tlskb', (40, '<u8')),
+    ('caskb', (48, '<u8')),
+    ('comkb', (56, '<u8')),
+])
+
+# One structure per network interface, the interface's name after the
+# counters
+NET_DEV_FIELDS = OrderedDict([
+    ('rx_packets', (0, '<u8')),
+    ('tx_packets', (8, '<u8')),
+    ('rx_bytes', (16, '<u8')),
+    ('tx_bytes', (24, '<u8')),
+    ('rx_compressed', (32, '<u8')),
+    ('tx_compressed', (40, '<u8')),
+    ('multicast', (48, '<u8')),
+])
+NET_DEV_NAME = (56, 16)
+
+# Socket counts are levels, not counters
+NET_SOCK_FIELDS = OrderedDict([
+    ('sock_inuse', (0, '<u4')),
+    ('tcp_inuse', (4, '<u4')),
+    ('tcp_tw', (8, '<u4')),
+    ('udp_inuse', (12, '<u4')),
+    ('raw_inuse', (16, '<u4')),
+    ('frag_inuse', (20, '<u4')),
+])
+
+NET_TCP_FIELDS = OrderedDict([
+    ('ActiveOpens', (0, '<u8')),
+    ('PassiveOpens', (8, '<u8')),
+    ('InSegs', (16, '<u8')),
+    ('OutSegs', (24, '<u8')),
+])
+
+NET_ETCP_FIELDS = OrderedDict([
+    ('AttemptFails', (0, '<u8')),
+    ('EstabResets', (8, '<u8')),
+    ('RetransSegs', (16, '<u8')),
+    ('InErrs', (24, '<u8')),
+    ('OutRsts', (32, '<u8')),
+])
+
+
+class SarSection ():
+    """
+    PURPOSE: The decoded samples of one sar activity, e.g. what 'sar -b'
+        would print for a file.
+
+    ATTRIBUTES:
+        flag: the sar flag of the activity ('-u', '-b', '-r', '-n DEV', ...)
+        times: a numpy datetime64 array, one timestamp per sample: [s] from
+            a sar file, [ms] from a procfs stream
+        columns: an OrderedDict of sar column name -> numpy array of values
+        rows: for an activity that prints several rows per sample (sar -n
+            DEV, a row per interface): an OrderedDict of the column naming
+            the rows -> numpy array of names, a row per sample and a column
+            per row printed, the shape of the arrays in columns. Empty for
+            the others
+    """
+
+    def __init__ (self, flag, times, columns, rows=None):
+        self.flag = flag
+        self.times = times
+        self.columns = columns
+        self.rows = rows or OrderedDict ()
+
+    def __len__ (self):
+        return len (self.times)
+
+    def column (self, name):
+        if name not in self.columns:
+            raise Exception("sar column '{0}' is not decoded for sar {1}".format(name, self.flag))
+        return self.columns[name]
+
+
+class SarBinaryReader ():
+    """
+    PURPOSE: Decodes one binary sar file into SarSection objects.
+        Usage example:
+            if SarBinaryReader.can_read(sar_file):
+                with SarBinaryReader(sar_file) as reader:
+                    cpu = reader.section('-u')
+                    for chunk in reader.sections('-b', 16384):
+                        ...
+        A file that is still being written can be read again from where
+        the last reader stopped:
+                    resume = reader.resume_point()
+                ...
+                with SarBinaryReader(sar_file, resume) as reader:
+                    ...  # only the records written since
+
+    ATTRIBUTES:
+        filename: the binary sar file
+        activities: activity id -> (offset in a record's stats, nr, size)
+        stats_size: number of bytes of statistics following a record header
+        offsets: numpy array, file offset of each statistics record
+        restarts: numpy bool array, True when the record follows a restart
+    """
+
+    def __init__ (self, filename, resume=None):
+        self.filename = filename
+        self._file = open (filename, 'rb')
+        self._map = mmap.mmap (self._file.fileno (), 0, access=mmap.ACCESS_READ)
+        self._raw = numpy.frombuffer (self._map, dtype=numpy.uint8)
+        self.activities = {}
+        self.stats_size = 0
+        self.start_date = None
+        self.nr_cpus = 0
+        self._read_file_header ()
+        self._index_records (resume)
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *exc_info):
+        self.close ()
+
+    def close (self):
+        self._raw = None
+        self._map.close ()
+        self._file.close ()
+
+    @staticmethod
+    def can_read (filename):
+        """
+        PURPOSE: Checks whether a file is a sar data file in a format this
+            reader understands
+
+        INPUTS: filename: path to the file
+
+        OUTPUTS: True or False
+
+        CALLEES: LogScanSession.scan()
+        """
+        try:
+            with open (filename, 'rb') as sar_file:
+                head = sar_file.read (FILE_MAGIC_SIZE + FILE_HEADER_SIZE)
+        except IOError:
+            return False
+        if len (head) < FILE_MAGIC_SIZE + FILE_HEADER_SIZE:
+            return False
+        sysstat_magic, format_magic = struct.unpack_from ('<HH', head, 0)
+        sizeof_long = struct.unpack_from ('<b', head, FILE_MAGIC_SIZE + 15)[0]
+        return (sysstat_magic == SYSSTAT_MAGIC and format_magic == FORMAT_MAGIC_9_0
+                and sizeof_long == 8)
+
+    def section (self, flag, start=0, stop=None):
+        """
+        PURPOSE: Computes the values sar prints for one activity
+
+        INPUTS: 
+            flag: '-u' (cpu, all cores), '-b' (io), '-r' (memory), '-n DEV'
+                (network interfaces), '-n SOCK' (sockets in use), '-n TCP'
+                or '-n ETCP' (tcp, errors)
+            start, stop: the records to decode, all of them by default
+
+        OUTPUTS: Returns a SarSection
+
+        ALGORITHM: Like sar, each sample is the difference between two
+            consecutive records, so the first record (and the first record
+            after a restart) only serves as a starting point.
+
+        CALLEES: SarBinaryReader.sections()
+        """
+        records = slice (start, stop)
+        # sample i is computed from records i-1 and i
+        valid = ~self.restarts[records][1:]
+        rows = None
+        if flag == '-u':
+            columns = self._cpu_columns (records, valid)
+        elif flag == '-b':
+            columns = self._io_columns (records, valid)
+        elif flag == '-r':
+            columns = self._memory_columns (records, valid)
+        elif flag == '-n DEV' and A_NET_DEV in self.activities:
+            columns, rows = self._net_dev_columns (records, valid)
+        elif flag == '-n SOCK' and A_NET_SOCK in self.activities:
+            columns = self._sock_columns (records, valid)
+        elif flag == '-n TCP' and A_NET_TCP in self.activities:
+            columns = self._counter_columns (A_NET_TCP, NET_TCP_FIELDS, [
+                ('active/s', 'ActiveOpens'), ('passive/s', 'PassiveOpens'),
+                ('iseg/s', 'InSegs'), ('oseg/s', 'OutSegs')], records, valid)
+        elif flag == '-n ETCP' and A_NET_ETCP in self.activities:
+            columns = self._counter_columns (A_NET_ETCP, NET_ETCP_FIELDS, [
+                ('atmptf/s', 'AttemptFails'), ('estres/s', 'EstabResets'),
+                ('retrans/s', 'RetransSegs'), ('isegerr/s', 'InErrs'),
+                ('orsts/s', 'OutRsts')], records, valid)
+        else:
+            raise Exception("sar {0} is not supported by the binary reader, or was not collected".format(flag))
+        times = self.times[records][1:][valid]
+        return SarSection (flag, times, columns, rows)
+
+    def sections (self, flag, size):
+        """
+        PURPOSE: Decodes one activity a few records at a time, so that a
+            long collection does not have to be decoded in one go
+
+        INPUTS: 
+            flag: see section()
+            size: the number of samples in each SarSection
+
+        OUTPUTS: Yields SarSection objects, in time order
+
+        CALLEES: LogScanner.extract()
+        """
+        # consecutive chunks share one record, the starting point of the
+        # next chunk's first sample
+        for start in range (0, len (self.offsets) - 1, size):
+            yield self.section (flag, start, start + size + 1)
+
+    def resume_point (self):
+        """
+        PURPOSE: Where a later reader of the same, growing, file starts
+
+        INPUTS: None
+
+        OUTPUTS: Returns [file offset, 'YYYY-MM-DD'] of the last record, or
+            None when there is no record. The record is read again, as the
+            starting point of the next sample.
+
+        CALLEES: LiveTail.follow()
+        """
+        if not len (self.offsets):
+            return None
+        return [int (self.offsets[-1]), str (self.times[-1].astype ('datetime64[D]'))]
+
+    # Helpers -------
+    def _read_file_header (self):
+        sysstat_magic, format_magic = struct.unpack_from ('<HH', self._map, 0)
+        if sysstat_magic != SYSSTAT_MAGIC or format_magic != FORMAT_MAGIC_9_0:
+            raise Exception("{0}: unsupported sar file format 0x{1:x}".format(self.filename, format_magic))
+
+        header = FILE_MAGIC_SIZE
+        activity_count = struct.unpack_from ('<I', self._map, header + 8)[0]
+        day, month, year = struct.unpack_from ('<BBB', self._map, header + 12)
+        self.start_date = datetime (1900 + year, month + 1, day)
+
+        position = header + FILE_HEADER_SIZE
+        offset_in_record = 0
+        for count in range (activity_count):
+            activity_id, nr, size = struct.unpack_from ('<iii', self._map, position)
+            self.activities[activity_id] = (offset_in_record, nr, size)
+            offset_in_record += nr * size
+            position += FILE_ACTIVITY_SIZE
+        self.stats_size = offset_in_record
+        self.first_record = position
+
+        for activity_id in (A_CPU, A_IO, A_MEMORY):
+            if activity_id not in self.activities:
+                raise Exception("{0}: activity {1} was not collected".format(self.filename, activity_id))
+        # the first cpu structure is 'all', the others are the cores
+        self.nr_cpus = max (self.activities[A_CPU][1] - 1, 1)
+
+    def _index_records (self, resume=None):
+        """
+        PURPOSE: Walks the record headers and remembers where the statistics
+            records are, when they were taken and whether a restart came
+            right before them. With a resume point (see resume_point()) the
+            walk starts at that record, whose date it gives.
+        """
+        offsets = []
+        restarts = []
+        clock = []
+        restarted = True
+        position = self.first_record
+        start_date = self.start_date.date ()
+        if resume is not None:
+            position, start_date = resume
+        end = len (self._map)
+
+        while position + RECORD_HEADER_SIZE <= end:
+            record_type, hour, minute, second = struct.unpack_from ('<BBBB', self._map, position + 40)
+            if record_type in (R_STATS, R_LAST_STATS):
+                if position + RECORD_HEADER_SIZE + self.stats_size > end:
+                    break  # the collector was stopped while writing
+                offsets.append (position)
+                restarts.append (restarted)
+                clock.append (hour * 3600 + minute * 60 + second)
+                restarted = False
+                position += RECORD_HEADER_SIZE + self.stats_size
+            elif record_type == R_RESTART:
+                restarted = True
+                position += RECORD_HEADER_SIZE
+            elif record_type == R_COMMENT:
+                position += RECORD_HEADER_SIZE + MAX_COMMENT_LEN
+            else:
+                raise Exception("{0}: unknown record type {1} at offset {2}".format(self.filename, record_type, position))
+
+        self.offsets = numpy.array (offsets, dtype=numpy.int64)
+        self.restarts = numpy.array (restarts, dtype=bool)
+
+        # The record headers hold the local time of the collecting machine;
+        # a step back in the time of day means we went past midnight
+        clock = numpy.array (clock, dtype=numpy.int64)
+        days = numpy.concatenate (([0], numpy.cumsum (numpy.diff (clock) < 0)))
+        start_day = numpy.datetime64 (start_date, 'D').astype (numpy.int64)
+        self.times = ((start_day + days) * 86400 + clock).astype ('datetime64[s]')
+
+    def _gather (self, offsets, dtype):
+        """
+        PURPOSE: Reads one fixed-size field at each of the given file offsets
+
+        INPUTS:
+            offsets: numpy array of file offsets
+            dtype: numpy type of the field, e.g. '<u8'
+
+        OUTPUTS: Returns a numpy array with one value per offset
+        """
+        width = numpy.dtype (dtype).itemsize
+        field_bytes = self._raw[offsets[:, None] + numpy.arange (width)]
+        return numpy.ascontiguousarray (field_bytes).view (dtype).ravel ().astype (numpy.int64)
+
+    def _fields (self, activity_id, fields, records):
+        activity_offset = self.activities[activity_id][0]
+        base = self.offsets[records] + RECORD_HEADER_SIZE + activity_offset
+        return dict ((name, self._gather (base + offset, dtype))
+                     for name, (offset, dtype) in fields.iteritems ())
+
+    def _header_field (self, offset, records):
+        return self._gather (self.offsets[records] + offset, '<u8')
+
+    def _seconds (self, records):
+        # The length of each sample. uptime0 is the uptime of a single
+        # processor; on a uniprocessor system sar only records uptime
+        if self.nr_cpus > 1:
+            uptime = self._header_field (16, records)
+        else:
+            uptime = self._header_field (0, records)
+        seconds = numpy.diff (uptime).astype (float) / HZ
+        seconds[seconds == 0] = 1
+        return seconds
+
+    def _cpu_columns (self, records, valid):
+        cpu = self._fields (A_CPU, CPU_FIELDS, records)
+        delta = dict ((name, numpy.diff (values)) for name, values in cpu.iteritems ())
+        # uptime is the sum of the 'all' cpu counters, in jiffies
+        interval = numpy.diff (self._header_field (0, records)).astype (float)
+        interval[interval == 0] = 1
+
+        def percent (ticks):
+            return numpy.round (numpy.clip (ticks, 0, None) / interval * 100, 2)[valid]
+
+        return OrderedDict ([
+            ('%user', percent (delta['user'] - delta['guest'])),
+            ('%nice', percent (delta['nice'])),
+            ('%system', percent (delta['sys'] + delta['hardirq'] + delta['softirq'])),
+            ('%iowait', percent (delta['iowait'])),
+            ('%steal', percent (delta['steal'])),
+            ('%idle', percent (delta['idle'])),
+        ])
+
+    def _io_columns (self, records, valid):
+        io = self._fields (A_IO, IO_FIELDS, records)
+        # the io counters are 32 bit and wrap around
+        delta = dict ((name, numpy.diff (values) % (1 << 32)) for name, values in io.iteritems ())
+        seconds = self._seconds (records)
+
+        def per_second (count):
+            return numpy.round (count / seconds, 2)[valid]
+
+        return OrderedDict ([
+            ('tps', per_second (delta['dk_drive'])),
+            ('rtps', per_second (delta['dk_drive_rio'])),
+            ('wtps', per_second (delta['dk_drive_wio'])),
+            ('bread/s', per_second (delta['dk_drive_rblk'])),
+            ('bwrtn/s', per_second (delta['dk_drive_wblk'])),
+        ])
+
+    def _memory_columns (self, records, valid):
+        # memory is a level, not a counter: the sample is the later record
+        memory = dict ((name, values[1:]) for name, values in
+                       self._fields (A_MEMORY, MEMORY_FIELDS, records).iteritems ())
+        total = memory['tlmkb'].astype (float)
+        total[total == 0] = 1
+        commit_total = (memory['tlmkb'] + memory['tlskb']).astype (float)
+        commit_total[commit_total == 0] = 1
+        used = memory['tlmkb'] - memory['frmkb']
+
+        return OrderedDict ([
+            ('kbmemfree', memory['frmkb'][valid]),
+            ('kbmemused', used[valid]),
+            ('%memused', numpy.round (used / total * 100, 2)[valid]),
+            ('kbbuffers', memory['bufkb'][valid]),
+            ('kbcached', memory['camkb'][valid]),
+            ('kbcommit', memory['comkb'][valid]),
+            ('%commit', numpy.round (memory['comkb'] / commit_total * 100, 2)[valid]),
+        ])
+
+    def _sock_columns (self, records, valid):
+        # like memory, the socket counts are levels of the later record
+        sock = dict ((name, values[1:]) for name, values in
+                     self._fields (A_NET_SOCK, NET_SOCK_FIELDS, records).iteritems ())
+        return OrderedDict ([
+            ('totsck', sock['sock_inuse'][valid]),
+            ('tcpsck', sock['tcp_inuse'][valid]),
+            ('udpsck', sock['udp_inuse'][valid]),
+            ('rawsck', sock['raw_inuse'][valid]),
+            ('ip-frag', sock['frag_inuse'][valid]),
+            ('tcp-tw', sock['tcp_tw'][valid]),
+        ])
+
+    def _counter_columns (self, activity_id, fields, printed, records, valid):
+        # sar column -> counter of a single-structure activity, per second
+        counters = self._fields (activity_id, fields, records)
+        seconds = self._seconds (records)
+        return OrderedDict ((column, numpy.round (numpy.diff (counters[counter]) / seconds, 2)[valid])
+                            for column, counter in printed)
+
+    def _net_dev_columns (self, records, valid):
+        """
+        PURPOSE: The rows of 'sar -n DEV', an interface per row
+
+        OUTPUTS: Returns (columns, rows), see SarSection. A slot that holds
+            no interface has an empty name.
+
+        ALGORITHM: Like sar, an interface is compared with the one of the
+            same name in the previous record, wherever it is: the slots
+            are only searched when the names of a slot differ. An interface
+            that was not there before, or whose counters went back, counts
+            nothing for that sample.
+        """
+        activity_offset, slots, size = self.activities[A_NET_DEV]
+        base = self.offsets[records] + RECORD_HEADER_SIZE + activity_offset
+        name_offset, name_length = NET_DEV_NAME
+        names = numpy.empty ((len (base), slots), dtype='S{0}'.format (name_length))
+        counters = dict ((field, numpy.zeros ((len (base), slots), dtype=numpy.int64))
+                         for field in NET_DEV_FIELDS)
+        for slot in range (slots):
+            slot_base = base + slot * size
+            name_bytes = self._raw[(slot_base + name_offset)[:, None] + numpy.arange (name_length)]
+            # the names end with a zero byte, which the 'S' type drops
+            names[:, slot] = numpy.ascontiguousarray (name_bytes).view (names.dtype).ravel ()
+            for field, (offset, dtype) in NET_DEV_FIELDS.iteritems ():
+                counters[field][:, slot] = self._gather (slot_base + offset, dtype)
+
+        # the previous record's slot of each interface
+        previous = numpy.tile (numpy.arange (slots), (max (len (base) - 1, 0), 1))
+        for sample, slot in zip (*numpy.nonzero (names[1:] != names[:-1])):
+            found = numpy.nonzero (names[sample] == names[sample + 1, slot])[0]
+            previous[sample, slot] = found[0] if len (found) else -1
+        samples = numpy.arange (len (previous))[:, None]
+        seconds = self._seconds (records)[:, None]
+
+        def per_second (field):
+            later = counters[field][1:]
+            earlier = counters[field][:-1][samples, numpy.maximum (previous, 0)]
+            delta = numpy.where ((previous >= 0) & (later >= earlier), later - earlier, 0)
+            return delta / seconds
+
+        return OrderedDict ([
+            ('rxpck/s', numpy.round (per_second ('rx_packets'), 2)[valid]),
+            ('txpck/s', numpy.round (per_second ('tx_packets'), 2)[valid]),
+            ('rxkB/s', numpy.round (per_second ('rx_bytes') / 1024, 2)[valid]),
+            ('txkB/s', numpy.round (per_second ('tx_bytes') / 1024, 2)[valid]),
+            ('rxcmp/s', numpy.round (per_second ('rx_compressed'), 2)[valid]),
+            ('txcmp/s', numpy.round (per_second ('tx_compressed'), 2)[valid]),
+            ('rxmcst/s', numpy.round (per_second ('multicast'), 2)[valid]),
+        ]), OrderedDict ([('IFACE', names[1:][valid])])
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    scaling_report.py
+
+    PURPOSE: The scaling report of a thread-count sweep: the same workflow
+             post-processed at several thread counts (see workflow_profiler.py
+             with a list of thread counts). For each stage and thread count,
+             the runtime, the speedup and the parallel efficiency against
+             the fewest threads, and the mean of each of RESOURCES in total
+             and per thread, in scaling.csv and on the screen. With
+             matplotlib, plots of the speedup, the efficiency and the
+             resources per thread against the thread count, a line per
+             stage.
+
+             A stage stops scaling where adding threads no longer shortens
+             it; its threads are wasted where the efficiency is below the
+             floor (-e).
+
+    USAGE:
+    scaling_report.py run [run ...] [-T threads] [-N workflow_name] [-o folder]
+                      [-e percent] [--no_plots]
+
+    run                   Output folders of the parser (which hold the
+                          'series' folder), or run folders that hold a
+                          post_processed_stats folder, one per thread count
+    -T, --threads         The thread counts of the runs, comma-separated, in
+                          the order of the runs. Default: read from the run
+                          folder names, e.g. sample_wgs_16t_30s_<date> or 16t
+    -N, --workflow_name   The workflow, for the order of the stages.
+                          Default: the order of the runs' stages
+    -o, --output          Where scaling.csv and the plots are written.
+                          Default: ./scaling_stats
+    -e, --efficiency      The efficiency floor, in percent. Default 50
+    --no_plots            Write scaling.csv only
+
+    The runtime of a stage is measured from its samples, so it is only
+    known to the sampling interval: sweep with an interval well below the
+    length of the stages.
+
+    OUTPUTS: Exits 0; 2 on an error.
+
+    REQUIREMENTS: numpy, as the parser. matplotlib for the plots.
+"""
+
+from __future__ import division
+import argparse
+import csv
+import os
+import re
+import sys
+from collections import namedtuple
+
+from workflow_stats_parser import TEMPLATE_DIR
+from compare_runs import RunStats, aligned_stages, format_value
+from plot_renderer import MatplotlibRenderer, matplotlib_available
+
+# The resources reported per thread:
+#   name   - its name in scaling.csv and in the plot file names
+#   metric - the series it is the mean of
+#   units  - its units
+Resource = namedtuple ('Resource', ['name', 'metric', 'units'])
+RESOURCES = [
+    Resource ('cpu', 'sar', '%'),
+    Resource ('workflow_cpu', 'workflow_cpu', '%'),
+    Resource ('committed_mem', 'active_mem', 'GB'),
+    Resource ('workflow_rss', 'workflow_rss', 'GB'),
+    Resource ('reads', 'sar_reads', 'MB/s'),
+    Resource ('writes', 'sar_writes', 'MB/s'),
+]
+
+SCALING_CSV = 'scaling.csv'
+DEFAULT_OUTPUT_DIR = './scaling_stats'
+DEFAULT_EFFICIENCY_FLOOR = 50
+# The thread count in a run folder name: <sample>_<workflow>_<N>t_..., or <N>t
+THREADS_REGEX = re.compile (r'(?:^|_)(\d+)t(?:_|$)')
+# The stage colours of the plots
+COLOUR_TEMPLATE = 'template_sar.plt'
+
+
+class ScalingReport ():
+    """
+    PURPOSE: The scaling of each stage over the runs of a sweep
+        Usage example:
+            report = ScalingReport ([(1, run1), (2, run2), (4, run4)], stages)
+            rows = report.rows ()
+
+    ATTRIBUTES:
+        runs: (thread count, RunStats), by increasing thread count
+        threads: the thread counts
+        stages: the stage names, in workflow order
+        resources: those of RESOURCES that any run has
+        floor: the efficiency floor, in percent
+    """
+    def __init__ (self, runs, stages, floor=DEFAULT_EFFICIENCY_FLOOR):
+        self.runs = sorted (runs)
+        self.threads = [threads for threads, run in self.runs]
+        self.stages = stages
+        self.resources = [resource for resource in RESOURCES
+                          if any (resource.metric in run.series for threads, run in self.runs)]
+        self.floor = floor
+
+    def columns (self):
+        columns = ['stage', 'threads', 'run', 'duration (s)', 'speedup', 'efficiency (%)']
+        for resource in self.resources:
+            columns += ['{0} ({1})'.format (resource.name, resource.units),
+                        '{0} per thread ({1})'.format (resource.name, resource.units)]
+        return columns
+
+    def scaling (self, stage):
+        """
+        PURPOSE: The runtime, speedup and efficiency of a stage at each
+            thread count
+
+        INPUTS: stage: the stage name
+
+        OUTPUTS: Returns a list of (duration, speedup, efficiency) per
+            thread count, None in place of those the run has no samples for
+
+        ALGORITHM: Against the fewest threads the stage ran with:
+            speedup = duration there / duration, and efficiency = speedup
+            over the ratio of the thread counts, in percent
+        """
+        durations = [run.duration (stage) for threads, run in self.runs]
+        measured = [(threads, duration) for threads, duration in zip (self.threads, durations) if duration]
+        scaling = []
+        for threads, duration in zip (self.threads, durations):
+            if not duration or not measured:
+                scaling.append ((duration, None, None))
+                continue
+            base_threads, base_duration = measured[0]
+            speedup = base_duration / duration
+            scaling.append ((duration, speedup, 100 * speedup * base_threads / threads))
+        return scaling
+
+    def resource (self, stage, resource):
+        # The mean of a resource at each thread count, None where there is
+        # no sample
+        means = []
+        for threads, run in self.runs:
+            samples = run.samples (resource.metric, stage)
+            means.append (None if samples is None else float (samples.mean ()))
+        return means
+
+    def rows (self):
+        """
+        PURPOSE: The rows of scaling.csv, see columns ()
+
+        INPUTS: None
+
+        OUTPUTS: Returns a list of rows, by stage and thread count
+        """
+        rows = []
+        for stage in self.stages:
+            resources = [self.resource (stage, resource) for resource in self.resources]
+            for index, (duration, speedup, efficiency) in enumerate (self.scaling (stage)):
+                threads, run = self.runs[index]
+                row = [stage, threads, run.name, format_value (duration),
+                       format_value (speedup), format_value (efficiency)]
+                for means in resources:
+                    mean = means[index]
+                    row += [format_value (mean), format_value (None if mean is None else mean / threads)]
+                rows.append (row)
+        return rows
+
+    def summary (self, stage):
+        """
+        PURPOSE: Where a stage stops scaling
+
+        INPUTS: stage: the stage name
+
+        OUTPUTS: Returns a line: the thread count it is fastest at, and the
+            fewest threads its efficiency is below the floor from
+        """
+        scaling = [(threads, speedup, efficiency) for threads, (duration, speedup, efficiency)
+                   in zip (self.threads, self.scaling (stage)) if speedup is not None]
+        if not scaling:
+            return "{0}: no samples".format (stage)
+        fastest, speedup, efficiency = max (scaling, key=lambda entry: (entry[1], -entry[0]))
+        line = "{0}: fastest at {1} threads, speedup {2:.2f}".format (stage, fastest, speedup)
+        wasted = [threads for threads, speedup, efficiency in scaling if efficiency < self.floor]
+        if wasted:
+            line += ", efficiency below {0}% from {1} threads".format (self.floor, wasted[0])
+        return line
+
+    def plot (self, output_dir):
+        """
+        PURPOSE: Draws the speedup, the efficiency and each resource per
+            thread against the thread count, a line per stage
+
+        INPUTS: output_dir: where the .png files are written
+
+        OUTPUTS: Returns the paths of the .png files
+        """
+        renderer = MatplotlibRenderer (output_dir, '')
+        template_file = os.path.join (os.path.dirname (os.path.abspath (__file__)), TEMPLATE_DIR, COLOUR_TEMPLATE)
+        scaling = [(stage, self.scaling (stage)) for stage in self.stages]
+        base = self.threads[0]
+        plots = [
+            renderer.scaling (template_file, 'Speedup by stage', 'Speedup', self.threads,
+                              [(stage, [speedup for duration, speedup, efficiency in values])
+                               for stage, values in scaling],
+                              'scaling_speedup.png', ideal=[threads / base for threads in self.threads]),
+            renderer.scaling (template_file, 'Parallel efficiency by stage', 'Efficiency (%)', self.threads,
+                              [(stage, [efficiency for duration, speedup, efficiency in values])
+                               for stage, values in scaling],
+                              'scaling_efficiency.png', ideal=[100] * len (self.threads)),
+        ]
+        for resource in self.resources:
+            lines = []
+            for stage in self.stages:
+                means = self.resource (stage, resource)
+                lines.append ((stage, [None if mean is None else mean / threads
+                                       for threads, mean in zip (self.threads, means)]))
+            plots.append (renderer.scaling (template_file, '{0} per thread by stage'.format (resource.name),
+                                            '{0} per thread ({1})'.format (resource.name, resource.units),
+                                            self.threads, lines, 'scaling_{0}_per_thread.png'.format (resource.name)))
+        return plots
+
+
+def run_threads (path):
+    """
+    PURPOSE: Reads the thread count of a run from its folder name
+
+    INPUTS: path: the run, as given to RunStats
+
+    OUTPUTS: Returns the thread count, from the deepest folder of the path
+        that names one. Raises ValueError when none does.
+    """
+    folder = os.path.abspath (path)
+    while os.path.basename (folder):
+        found = THREADS_REGEX.search (os.path.basename (folder))
+        if found:
+            return int (found.group (1))
+        folder = os.path.dirname (folder)
+    raise ValueError ("no thread count in the name of {0}, give them with -T".format (path))
+
+
+def write_report (runs, output_dir, workflow_name=None, floor=DEFAULT_EFFICIENCY_FLOOR, plot=True):
+    """
+    PURPOSE: Writes the scaling report of a sweep and prints it
+
+    INPUTS:
+        runs: (thread count, path of the post-processed run) per run
+        output_dir: where scaling.csv and the plots are written
+        workflow_name: the workflow, for the order of the stages, or None
+        floor: the efficiency floor, in percent
+        plot: whether to draw the plots
+
+    OUTPUTS: Returns the path of scaling.csv. Raises IOError when a run has
+        no series store and ValueError on an unknown workflow or a thread
+        count given twice.
+
+    CALLEES: main (), workflow_profiler.py
+    """
+    runs = [(threads, RunStats (path)) for threads, path in runs]
+    threads = [count for count, run in runs]
+    if len (set (threads)) < len (threads):
+        raise ValueError ("a thread count is given twice: {0}".format (','.join (str (count) for count in threads)))
+    report = ScalingReport (runs, aligned_stages ([run for count, run in sorted (runs)], workflow_name), floor)
+
+    if not os.path.isdir (output_dir):
+        os.makedirs (output_dir)
+    output_file = os.path.join (output_dir, SCALING_CSV)
+    rows = report.rows ()
+    with open (output_file, 'wb') as output:
+        writer = csv.writer (output)
+        writer.writerow (report.columns ())
+        writer.writerows (rows)
+
+    layout = "{0:<12} {1:>8} {2:>14} {3:>8} {4:>16}"
+    print (layout.format ('stage', 'threads', 'duration (s)', 'speedup', 'efficiency (%)'))
+    for row in rows:
+        print (layout.format (*row[:2] + row[3:6]))
+    for stage in report.stages:
+        print ("scaling: {0}".format (report.summary (stage)))
+    print ("scaling: written to {0}".format (output_file))
+
+    if plot:
+        if matplotlib_available ():
+            for path in report.plot (output_dir):
+                print ("scaling: {0}".format (path))
+        else:
+            print ("scaling: no plots, matplotlib is not installed")
+    return output_file
+
+
+def main (argv=None):
+    """
+    PURPOSE: The entry point: writes the scaling report of the runs
+
+    INPUTS: argv - a list holding the command line user arguments
+
+    OUTPUTS: Exits 0; 2 on an error
+    """
+    parser = argparse.ArgumentParser (description="Reports how each stage scales with the thread count over the runs of a sweep")
+    parser.add_argument ("runs", nargs='+', help="The post-processed runs, one per thread count")
+    parser.add_argument ("-T", "--threads", help="The thread counts of the runs, comma-separated. Default: from the folder names")
+    parser.add_argument ("-N", "--workflow_name", help="The workflow, for the order of the stages")
+    parser.add_argument ("-o", "--output", default=DEFAULT_OUTPUT_DIR,
+                         help="Where scaling.csv and the plots are written. Default: " + DEFAULT_OUTPUT_DIR)
+    parser.add_argument ("-e", "--efficiency", type=float, default=DEFAULT_EFFICIENCY_FLOOR,
+                         help="The efficiency floor, in percent. Default {0}".format (DEFAULT_EFFICIENCY_FLOOR))
+    parser.add_argument ("--no_plots", action='store_true', help="Write scaling.csv only")
+    args = parser.parse_args (argv)
+
+    try:
+        if args.threads:
+            threads = [int (count) for count in args.threads.split (',')]
+            if len (threads) != len (args.runs):
+                parser.error ("-T gives {0} thread counts for {1} runs".format (len (threads), len (args.runs)))
+        else:
+            threads = [run_threads (path) for path in args.runs]
+        write_report (zip (threads, args.runs), args.output, args.workflow_name, args.efficiency, not args.no_plots)
+    except (IOError, OSError, ValueError, KeyError), error:
+        print ("scaling: {0}".format (error))
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit (main ())
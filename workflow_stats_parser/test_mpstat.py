@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    test_mpstat.py
+
+    PURPOSE: Post-processes a small mpstat -P ALL log of 4 cores, as -m
+             does, and checks the matrix of the load of each core.
+
+    USAGE:
+    python -m unittest test_mpstat   (from workflow_stats_parser/)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+sys.path.insert (0, os.path.dirname (os.path.abspath (__file__)))
+from workflow_stats_parser import MPSTAT_METRICS, MULTITHREAD_PARSER_OUTPUT_DIR, post_process
+
+CORES = 4
+INTERVALS = 40
+INTERVAL = 30
+
+
+def idle (interval, core):
+    # A different load per core and interval, in whole hundredths
+    return (interval * 7 + core * 23) % 100 + 0.25 * core
+
+
+def write_mpstat_log (path):
+    start = datetime (2014, 4, 15, 22, 28, 29)
+    with open (path, 'w') as log:
+        log.write ("Linux 3.10.0 (host) \t04/15/2014 \t_x86_64_\t({0} CPU)\n\n".format (CORES))
+        for interval in xrange (INTERVALS):
+            clock = (start + timedelta (seconds=interval * INTERVAL)).strftime ('%I:%M:%S %p')
+            log.write ("{0}     CPU    %usr   %nice    %sys %iowait    %irq   %soft  %steal  %guest  %gnice   %idle\n".format (clock))
+            log.write ("{0}     all    1.00    0.00    1.00    0.00    0.00    0.00    0.00    0.00    0.00   98.00\n".format (clock))
+            for core in xrange (CORES):
+                log.write ("{0}     {1:>3}    1.00    0.00    1.00    0.00    0.00    0.00    0.00    0.00    0.00  {2:6.2f}\n".format (
+                    clock, core, idle (interval, core)))
+            log.write ("\n")
+
+
+class MpstatTest (unittest.TestCase):
+
+    def setUp (self):
+        self.root = tempfile.mkdtemp ()
+        stage = os.path.join (self.root, 'run..stage1.1u')
+        os.mkdir (stage)
+        write_mpstat_log (os.path.join (stage, 'run..stage1.1u.30s.mpstat'))
+
+    def tearDown (self):
+        shutil.rmtree (self.root)
+
+    def test_load_of_each_core (self):
+        run = post_process (self.root, OrderedDict ([('Stage1', 'stage1')]), MPSTAT_METRICS,
+                            output=os.path.join (self.root, 'out'))
+        self.assertEqual (run.returncode, 0)
+        load = run.series['mpstat']['Stage1'].values
+        self.assertEqual (load.shape, (INTERVALS, CORES))
+        expected = [[round (100.0 - idle (interval, core), 2) for core in xrange (CORES)] for interval in xrange (INTERVALS)]
+        self.assertEqual (load.tolist (), expected)
+        self.assertEqual (run.series['mpstat_total_core']['Stage1'].values.tolist (), [sum (row) for row in expected])
+        # the matrix is only written under multithreading_stats/
+        for folder, _, names in os.walk (run.output):
+            for name in names:
+                if name.endswith ('.csv'):
+                    self.assertGreater (os.path.getsize (os.path.join (folder, name)), 0, name)
+        self.assertEqual (len ([name for name in os.listdir (run.output) if name.endswith ('_mpstat.csv')]), 0)
+        self.assertEqual (len ([name for name in os.listdir (os.path.join (run.output, MULTITHREAD_PARSER_OUTPUT_DIR))
+                                if name.endswith ('_mpstat.csv')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main ()
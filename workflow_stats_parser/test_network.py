@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    test_network.py
+
+    PURPOSE: Scans a small sar -n DEV,SOCK text log, as -n does, and checks
+             the matrix of each physical interface against the totals and
+             the tcp sockets in use. The interfaces of the bundled sar file
+             are checked against its totals the same way.
+
+    USAGE:
+    python -m unittest test_network   (from workflow_stats_parser/)
+"""
+
+import logging
+import os
+import sys
+import unittest
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from glob import glob
+
+sys.path.insert (0, os.path.dirname (os.path.abspath (__file__)))
+from sar_binary_reader import SarBinaryReader
+from workflow_stats_parser import (LogScanner, METRIC_SPECS, NETWORK_METRICS,
+                                   NetworkReceiveInterfacesColumn, NetworkTransmitPacketsInterfacesColumn)
+
+INTERVALS = 6
+INTERVAL = 30
+# eth1 is down in this interval
+DOWN = 3
+SAMPLE_SAR = os.path.join (os.path.dirname (os.path.abspath (__file__)), 'sample_onestage_input')
+
+
+def received (interval, interface):
+    # kB/s, a whole number of MB/s so the totals are exact
+    return 1024.0 * ((interval * 3 + interface * 5) % 7 + 1)
+
+
+def write_sar_log (lines):
+    start = datetime (2014, 4, 15, 22, 28, 29)
+    lines.append ("Linux 3.10.0 (host) \t04/15/2014 \t_x86_64_\t(4 CPU)\n")
+    lines.append ("\n")
+    for interval in xrange (INTERVALS):
+        clock = (start + timedelta (seconds=interval * INTERVAL)).strftime ('%I:%M:%S %p')
+        lines.append ("{0}     IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s\n".format (clock))
+        # the loopback and a bridge are not counted
+        lines.append ("{0}        lo    500.00    500.00   9999.00   9999.00      0.00      0.00      0.00\n".format (clock))
+        for number, interface in enumerate (['eth0', 'eth1']):
+            if interface == 'eth1' and interval == DOWN:
+                continue
+            lines.append ("{0}      {1}   {2:7.2f}   {3:7.2f}  {4:8.2f}      1.00      0.00      0.00      0.00\n".format (
+                clock, interface, 10.0 * (number + 1), interval + number, received (interval, number)))
+        lines.append ("{0}    virbr0    100.00    100.00   4096.00   4096.00      0.00      0.00      0.00\n".format (clock))
+        lines.append ("\n")
+        lines.append ("{0}    totsck    tcpsck    udpsck    rawsck   ip-frag    tcp-tw\n".format (clock))
+        lines.append ("{0}       459        {1:>2}        16         1         0         0\n".format (clock, 16 + interval))
+        lines.append ("\n")
+
+
+class NetworkTest (unittest.TestCase):
+
+    def setUp (self):
+        self.logger = logging.getLogger ('test_network')
+        self.specs = OrderedDict ((metric, METRIC_SPECS[metric]) for metric in NETWORK_METRICS)
+
+    def test_each_interface (self):
+        lines = []
+        write_sar_log (lines)
+        samples = LogScanner (self.logger, self.specs).scan (lines)
+        self.assertEqual (samples['net_rx_iface'].labels.tolist (),
+                          [name for interval in xrange (INTERVALS) for name in
+                           (['eth0'] if interval == DOWN else ['eth0', 'eth1'])])
+
+        column = NetworkReceiveInterfacesColumn (self.logger)
+        matrix = column.get_useful_metrics (samples['net_rx_iface'])
+        self.assertEqual (matrix.columns, ['eth0', 'eth1'])
+        expected = [[received (interval, 0) / 1024,
+                     0.0 if interval == DOWN else received (interval, 1) / 1024] for interval in xrange (INTERVALS)]
+        self.assertEqual (matrix.values.tolist (), expected)
+        self.assertEqual (matrix.times.tolist (), samples['net_rx'].times.tolist ())
+        self.assertEqual (matrix.values.sum (axis=1).tolist (), samples['net_rx'].values.tolist ())
+
+        packets = NetworkTransmitPacketsInterfacesColumn (self.logger).get_useful_metrics (samples['net_tx_packets_iface'])
+        self.assertEqual (packets.values.sum (axis=1).tolist (), samples['net_tx_packets'].values.tolist ())
+
+    def test_tcp_connections (self):
+        lines = []
+        write_sar_log (lines)
+        samples = LogScanner (self.logger, self.specs).scan (lines)
+        self.assertEqual (samples['tcp_connections'].values.tolist (), [16 + interval for interval in xrange (INTERVALS)])
+
+    def test_each_interface_of_sar_file (self):
+        sar_file = sorted (glob (os.path.join (SAMPLE_SAR, '*', '*.sar.data')))[0]
+        with SarBinaryReader (sar_file) as reader:
+            samples = LogScanner (self.logger, self.specs).extract (reader)
+        matrix = NetworkReceiveInterfacesColumn (self.logger).get_useful_metrics (samples['net_rx_iface'])
+        self.assertNotIn ('lo', matrix.columns)
+        self.assertEqual (matrix.times.tolist (), samples['net_rx'].times.tolist ())
+        # each interface is rounded to 0.01 MB/s on its own
+        for row, total in zip (matrix.values.sum (axis=1), samples['net_rx'].values):
+            self.assertAlmostEqual (row, total, delta=0.005 * len (matrix.columns))
+        self.assertEqual (samples['tcp_connections'].values.tolist ()[:3], [16, 16, 16])
+
+
+if __name__ == '__main__':
+    unittest.main ()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    test_procfs_reader.py
+
+    PURPOSE: Writes a small version 1 and version 2 procfs stream, as
+             procfs_collector.py does, and checks the deltas of a 32 bit
+             counter that wrapped, of a 64 bit counter that was reset and
+             of a column that one record did not read.
+
+    USAGE:
+    python -m unittest test_procfs_reader   (from workflow_stats_parser/)
+"""
+
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert (0, os.path.dirname (os.path.abspath (__file__)))
+from procfs_collector import STREAM_MAGIC, STREAM_PREAMBLE, mask_words
+from procfs_reader import ProcfsReader
+
+START = 1397600909.0
+INTERVAL = 30
+# the column of a disk that went away is past the first word of the mask
+FILLER = ['stat.filler{0:02d}'.format (index) for index in xrange (64)]
+COLUMNS = FILLER + ['disk.sdb.reads', 'net.eth0.rx_bytes', 'net.eth1.rx_bytes']
+MISSING = 2
+VALUES = {
+    'disk.sdb.reads': [10, 20, 0, 40],
+    # a 32 bit counter that wraps between the second and third record
+    'net.eth0.rx_bytes': [(1 << 32) - 296, (1 << 32) - 96, 100, 400],
+    # a 64 bit counter, past 32 bits, of an interface that came back
+    'net.eth1.rx_bytes': [5000000000, 5000000500, 20, 70],
+}
+
+
+def write_stream (path, version):
+    header = json.dumps ({'interval': INTERVAL, 'host': 'host', 'clock_ticks': 100,
+                          'cpus': 1, 'utc_offset': 0, 'columns': COLUMNS})
+    preamble = STREAM_PREAMBLE.pack (STREAM_MAGIC, version, len (header))
+    words = mask_words (len (COLUMNS)) if version > 1 else 0
+    record = struct.Struct ('<d' + 'Q' * (words + len (COLUMNS)))
+    with open (path, 'wb') as stream:
+        stream.write (preamble + header + '\0' * (-(len (preamble) + len (header)) % 8))
+        for sample in xrange (len (VALUES['disk.sdb.reads'])):
+            mask = [0] * words
+            for index, name in enumerate (COLUMNS):
+                if words and not (name == 'disk.sdb.reads' and sample == MISSING):
+                    mask[index // 64] |= 1 << (index % 64)
+            values = [VALUES[name][sample] if name in VALUES else sample for name in COLUMNS]
+            stream.write (record.pack (START + sample * INTERVAL, *(mask + values)))
+
+
+class ProcfsReaderTest (unittest.TestCase):
+
+    def setUp (self):
+        self.root = tempfile.mkdtemp ()
+
+    def tearDown (self):
+        shutil.rmtree (self.root)
+
+    def read (self, version):
+        path = os.path.join (self.root, 'run.30s.procfs')
+        write_stream (path, version)
+        self.assertTrue (ProcfsReader.can_read (path))
+        reader = ProcfsReader (path)
+        self.assertEqual (len (reader.records), len (VALUES['disk.sdb.reads']))
+        return reader
+
+    def test_wrapped_counter (self):
+        for version in (1, 2):
+            reader = self.read (version)
+            self.assertEqual (reader._delta (reader.records, 'net.eth0.rx_bytes').tolist (), [200, 196, 300])
+
+    def test_reset_counter (self):
+        for version in (1, 2):
+            reader = self.read (version)
+            self.assertEqual (reader._delta (reader.records, 'net.eth1.rx_bytes').tolist (), [500, 0, 50])
+
+    def test_missing_column (self):
+        reader = self.read (2)
+        self.assertEqual (reader._delta (reader.records, 'disk.sdb.reads').tolist (), [10, 0, 0])
+        self.assertEqual (reader._delta (reader.records, FILLER[-1]).tolist (), [1, 1, 1])
+
+    def test_version_1_reads_every_column (self):
+        # without a mask the 0 of the missing column is a reset
+        reader = self.read (1)
+        self.assertEqual (reader._delta (reader.records, 'disk.sdb.reads').tolist (), [10, 0, 40])
+
+
+if __name__ == '__main__':
+    unittest.main ()
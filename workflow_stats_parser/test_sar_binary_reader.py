@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#################################################################################
+# The MIT License (MIT)                                                         #
+#                                                                               #
+# Copyright (c)  2014 Intel Corporation                                         #
+#                                                                               #
+# Permission is hereby granted, free of charge, to any person obtaining a copy  #
+# of this software and associated documentation files (the "Software"), to deal #
+# in the Software without restriction, including without limitation the rights  #
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell     #
+# copies of the Software, and to permit persons to whom the Software is         #
+# furnished to do so, subject to the following conditions:                      #
+#                                                                               #
+# The above copyright notice and this permission notice shall be included in    #
+# all copies or substantial portions of the Software.                           #
+#                                                                               #
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR    #
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,      #
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE   #
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER        #
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, #
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN     #
+# THE SOFTWARE.                                                                 #
+#################################################################################
+
+"""
+    FILE:    test_sar_binary_reader.py
+
+    PURPOSE: Decodes the sar files of sample_multistage_input/ with
+             SarBinaryReader and checks %user, bread/s, bwrtn/s and kbcommit
+             against the CSVs of sample_multistage_output/, which were
+             written from sar's own text output. The CSVs hold the values
+             converted to MB/s and GB but not rounded, so the same
+             conversions are done here.
+
+    USAGE:
+    python -m unittest test_sar_binary_reader   (from workflow_stats_parser/)
+"""
+
+import csv
+import os
+import sys
+import unittest
+from glob import glob
+
+sys.path.insert (0, os.path.dirname (os.path.abspath (__file__)))
+from sar_binary_reader import SarBinaryReader
+
+HERE = os.path.dirname (os.path.abspath (__file__))
+SAR_FILES = sorted (glob (os.path.join (HERE, 'sample_multistage_input', '*', '*.sar.data')))
+REFERENCE = os.path.join (HERE, 'sample_multistage_output', '2014-05-12_21.49.51_{0}.csv')
+
+
+def reference_samples (metric, stage):
+    # The CSV has a time and a value column per stage, after 3 header lines
+    with open (REFERENCE.format (metric), 'rb') as reference:
+        rows = list (csv.reader (reference))[3:]
+    return [(row[2 * stage], float (row[2 * stage + 1]))
+            for row in rows if len (row) > 2 * stage and row[2 * stage]]
+
+
+class SarBinaryReaderTest (unittest.TestCase):
+
+    def check (self, metric, flag, column, convert):
+        self.assertEqual (len (SAR_FILES), 3)
+        for stage, sar_file in enumerate (SAR_FILES):
+            with SarBinaryReader (sar_file) as reader:
+                section = reader.section (flag)
+                samples = [(str (time.astype ('datetime64[s]')).replace ('T', ' '), convert (value))
+                           for time, value in zip (section.times, section.column (column))]
+            self.assertEqual (samples, reference_samples (metric, stage))
+
+    def test_cpu_user (self):
+        self.check ('sar', '-u', '%user', float)
+
+    def test_blocks_read (self):
+        self.check ('sar_reads', '-b', 'bread/s', lambda value: float (value) / 2048)
+
+    def test_blocks_written (self):
+        self.check ('sar_writes', '-b', 'bwrtn/s', lambda value: float (value) / 2048)
+
+    def test_committed_memory (self):
+        self.check ('active_mem', '-r', 'kbcommit', lambda value: int (value) / 1048576.0)
+
+
+if __name__ == '__main__':
+    unittest.main ()
@@ -1,4 +1,4 @@
-#!/bin/bash
+#!/usr/bin/env python
 #################################################################################
 # The MIT License (MIT)                                                         #
 #                                                                               #
@@ -23,26 +23,40 @@
 # THE SOFTWARE.                                                                 #
 #################################################################################
 
-unset me
-unset iostat_PID
-
-export me=`whoami`
-
-#  Capture and record the PID of the correct emon 'counter' process:
-#ps -aef | grep ${me} | grep 'iostat ' | grep -v 'grep' | grep -v 'kill' | awk '{printf "%8d", $2}' > ./dum_PID_iostat
-ps -aef | grep ${me} | awk '{print $2,$8}' | grep 'iostat' | grep -v 'grep' | grep -v 'kill' | awk '{printf "%8d", $1}' > ./dum_PID_iostat
-sort ./dum_PID_iostat > ./dum_PID_iostat.sorted
-iostat_PID=`tail -1 ./dum_PID_iostat.sorted | awk '{printf "%8d", $1}'`
-echo "iostat_PID: "${iostat_PID}
-while read line; do    
-  #echo $line
-  kill -s SIGUSR1 ${line}
-done < dum_PID_iostat.sorted
-
-# Now kill that process
-#if [[ -z "${iostat_PID}" ]]; then 
-#  kill -s SIGUSR1 ${iostat_PID}
-#fi
-rm dum_PID_iostat*
-#    perl ./sar_parser.pl -f ${SARTSV} -o ${SAROUT}.csv &&
+"""
+    FILE:    test_sliding_average.py
 
+    PURPOSE: Checks that ColumnOfStatistics.make_sliding_average returns
+             the samples it was given, whatever the window (-w), even one
+             of 0 or shorter than the sampling interval: the samples are
+             written as logged.
+
+    USAGE:
+    python -m unittest test_sliding_average   (from workflow_stats_parser/)
+"""
+
+import logging
+import os
+import sys
+import unittest
+
+import numpy
+
+sys.path.insert (0, os.path.dirname (os.path.abspath (__file__)))
+from workflow_stats_parser import ColumnOfStatistics, TimeSeries
+
+
+class SlidingAverageTest (unittest.TestCase):
+
+    def setUp (self):
+        self.column = ColumnOfStatistics (logging.getLogger ('test_sliding_average'))
+
+    def test_samples_are_kept (self):
+        times = (numpy.arange (600) * 30 + 1397600879).astype ('datetime64[s]')
+        series = TimeSeries ('test', times, numpy.arange (600) % 2 * 100)
+        for window in (0, 1, 20, 100, 100000):
+            self.assertTrue (self.column.make_sliding_average (series, window) is series)
+
+
+if __name__ == '__main__':
+    unittest.main ()
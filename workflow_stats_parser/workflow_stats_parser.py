@@ -33,11 +33,20 @@
               See README file for more details
 
     USAGE:
-    workflow_stats_parser.py root [-N workflow_name] \
+    workflow_stats_parser.py root [root ...] [-N workflow_name] \
                             [-S substring] [-h] [-o pathToOuputFolder] \
-                            [-i | -s | -A] [-w size] [-t tag] [-p] [-l level] 
+                            [-i | -s | -A] [-m] [-W] [-w size] [-t tag] [-p] [-r reader]
+                            [-j jobs] [--plot_backend backend] 
+                            [--cache dir] [--cache_size mb] 
+                            [--live seconds [--follow_pid pid]] [-l level] 
      
-    root                  The path to the workflow output directory
+    root                  The path to the workflow output directory. With
+                          several, or a quoted glob, the batch mode
+                          post-processes them all with a pool of -j worker
+                          processes, each run into a folder of its own in
+                          the output folder, and writes batch_index.csv,
+                          the statistics of every run, metric and stage.
+                          A run that fails is listed there with its error.
 
     -h                    Prints out usage information
    
@@ -56,15 +65,56 @@
     -i, --iostat          Parse iostat metrics 
     -s, --sar             Parse sar metrics 
     -A, --all             Parse all metrics
-
-    -w, --window n        n is the size of the window, in seconds, to use for 
-                            smoothing graphs, default=100
+    -m, --mpstat          Parse the load of each core, from mpstat -P ALL
+                          (collect_stats.ksh --mpstat): the busiest core,
+                          the cores summed up, and a cores x time matrix
+                          in the multithreading_stats folder
+    -f, --free            Parse the memory in use, in the page cache and
+                          available, from free (collect_stats.ksh --free)
+    -n, --network         Parse the network throughput, summed up and of
+                          each interface, and the tcp health, from sar -n
+                          DEV,SOCK,TCP,ETCP or a procfs stream
+    -W, --workflow_tree   Parse the usage of the workflow's own processes,
+                          from the streams of process_tree_collector.py
+                          (collect_stats.ksh --proctree)
+
+    -w, --window n        n is the size of the window, in seconds, named in the
+                            time column titles, default=100. The samples
+                            are written as logged, not averaged over it
 
     -t  --tag tag         A name that is added to the plots which identifes the
                           data set.
     
     -p, --plot            Plot the data using gnuplot
 
+    -r, --sar_reader reader
+                          How to decode binary sar files: auto, native or sar.
+                          native reads sysstat 9.0.x files without the sar
+                          command. The default, auto, uses native when the
+                          file format is supported and sar otherwise.
+
+    -j, --jobs jobs       Number of worker processes that parse the workflow
+                          steps, or in the batch mode the runs. The output
+                          is the same for any number. Default is 1.
+
+    --plot_backend backend
+                          gnuplot (default) renders the .plt templates;
+                          matplotlib draws the plots from the parsed data.
+
+    --cache dir           Keep the samples parsed from each log in dir, so
+                          that post-processing a run again only redoes the
+                          output.
+
+    --cache_size mb       Size limit of the cache, least recently used logs
+                          are dropped first. Default is 2048.
+
+    --live seconds        Follow the logs of a workflow that is still running
+                          and refresh the output every 'seconds', parsing
+                          only what was added to the logs. Stops after a
+                          last refresh on SIGTERM or Ctrl-C.
+
+    --follow_pid pid      With --live, stop once process pid has exited.
+
     -l, --level           Enter log level.
                           Default is info.
   
@@ -77,30 +127,56 @@
     INPUT: one directory ('root') which contains sub-directories for each
            workflow stage to post-process
 
-    OUTPUT: a set of csv files and corresponding gnuplot plots (if -p option)
+    OUTPUT: a set of csv files and corresponding gnuplot plots (if -p option),
+            and the same series as .npy files in the 'series' folder, see
+            SeriesStore
+
+    EXIT STATUS: 0 on success. 1 when the arguments are invalid, the post-
+            processing failed, or a plot failed: -A plots as well as -p, so
+            on a machine without gnuplot either exits 1 (use --plot_backend
+            matplotlib there). The csv files and the series are written
+            all the same. 2 when argparse rejects an option.
+
+    LIBRARY USE: post_process(run_dir, stages, metrics, window, output) does
+            the same in the calling process and returns the parsed series,
+            see ParsedRun; post_process_batch() the batch mode
 
     REFERENCE:
         POSSIBLE_METRICS:
             iostat
             sar
+            iowait
             sar_reads
             sar_writes
+            active_mem
+            workflow_cpu, workflow_rss, workflow_reads, workflow_writes,
+            workflow_faults (-W)
+            mpstat_active_core, mpstat_total_core, mpstat (-m)
+            free_used, free_cache, free_available (-f)
+            net_rx, net_tx, net_rx_packets, net_tx_packets, net_rx_iface,
+            net_tx_iface, net_rx_packets_iface, net_tx_packets_iface,
+            tcp_retrans, tcp_active, tcp_connections (-n)
 """
 
 from __future__ import division
-from glob import glob
+from glob import glob, has_magic
 from datetime import datetime
 from sys import platform as _platform
 from datetime import timedelta
-from subprocess import call
+from subprocess import call, Popen, PIPE
 from shutil import rmtree
-from tempfile import mkdtemp, mkstemp
+from tempfile import mkdtemp, mkstemp, TemporaryFile
 from itertools import izip_longest
 from itertools import izip
+from itertools import imap
+from itertools import chain
+from itertools import islice
 from pprint import pprint
 from contextlib import contextmanager
 import multiprocessing
+import Queue
 import traceback
+import signal
 import sys
 import csv
 import re
@@ -109,13 +185,18 @@ import os
 import logging
 import time
 import json
+import hashlib
 import inspect  #  - introspection for debugging only! 
 import argparse 
 import numpy
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 
-# This will import all the workflow dictionaries
-from workflow_dictionaries import *
+# The workflow dictionaries, see get_workflow()
+import workflow_dictionaries
+from sar_binary_reader import SarBinaryReader
+from procfs_reader import ProcfsReader, PROCFS_SUFFIX
+from collector_overhead import read_overhead, overhead_rows, OVERHEAD_CSV, OVERHEAD_COLUMNS
+from plot_renderer import MatplotlibRenderer, matplotlib_available
 
 # Possible values:
 # warning - Important messages that aren't an error
@@ -134,14 +215,149 @@ LOG_LEVEL_MAP = {
 ##START DO NOT MODIFY LIST - these are globals, not intended to be modified
 MULTITHREAD_PARSER_OUTPUT_DIR = "multithreading_stats"  # rlk -only needed fo mpstat support
 OUTPUT_DEFAULT_DIR = "./post_processed_stats"  # the default output directory path
-OUTPUT_DIR_NAME = ''
 #MEASURE_INTERVAL = 30
-PL = ''  # to store the workflow name
-ARGS_NS = None
 
 # Folder that contains the .plt templates
 TEMPLATE_DIR = "plot_templates"
 
+# How binary sar files are decoded:
+#   auto   - read natively when the file format is supported, else use sar
+#   native - always read natively (sar does not have to be installed)
+#   sar    - always decode with the sar command
+SAR_READERS = ['auto', 'native', 'sar']
+
+# How the plots are drawn:
+#   gnuplot    - render the .plt templates with gnuplot, from the csv files
+#   matplotlib - draw with matplotlib (Agg) from the parsed series in memory
+PLOT_BACKENDS = ['gnuplot', 'matplotlib']
+
+# The sar activity flag that prints the section with the given header column
+SAR_SECTION_FLAGS = OrderedDict([
+    ('%user', '-u'),
+    ('bread/s', '-b'),
+    ('kbmemfree', '-r'),
+    ('rxpck/s', '-n DEV'),
+    ('totsck', '-n SOCK'),
+    ('active/s', '-n TCP'),
+    ('atmptf/s', '-n ETCP'),
+    # iostat's, only asked of a procfs stream (see ProcfsReader)
+    ('Device', '-d'),
+    # the workflow's process tree, only in a process_tree_collector.py stream
+    ('tree', '-T'),
+])
+
+# The plot template and the csv file of each metric, as regexes
+METRIC_PLOTS = OrderedDict([
+    ('iostat', (r'_iostat\.plt', r'_iostat\.csv')),
+    ('sar', (r'_sar\.plt', r'_sar\.csv')),
+    ('sar_reads', (r'_sar_reads\.plt', r'_sar_reads\.csv')),
+    ('iowait', (r'_iowait\.plt', r'_iowait\.csv')),
+    ('sar_writes', (r'_sar_writes\.plt', r'_sar_writes\.csv')),
+    ('active_mem', (r'committed_mem\.plt', r'active_mem\.csv')),
+    ('workflow_cpu', (r'_workflow_cpu\.plt', r'_workflow_cpu\.csv')),
+    ('workflow_rss', (r'_workflow_rss\.plt', r'_workflow_rss\.csv')),
+    ('workflow_reads', (r'_workflow_reads\.plt', r'_workflow_reads\.csv')),
+    ('workflow_writes', (r'_workflow_writes\.plt', r'_workflow_writes\.csv')),
+    ('workflow_faults', (r'_workflow_faults\.plt', r'_workflow_faults\.csv')),
+    ('mpstat_active_core', (r'active_core_mpstat\.plt', r'_mpstat_active_core\.csv')),
+    ('mpstat_total_core', (r'_total_core_mpstat\.plt', r'_mpstat_total_core\.csv')),
+    # one csv file for all the cores, in MULTITHREAD_PARSER_OUTPUT_DIR
+    ('mpstat', (r'many_cores\.plt', r'_mpstat\.csv')),
+    ('free_used', (r'_free_used\.plt', r'_free_used\.csv')),
+    ('free_cache', (r'_free_cache\.plt', r'_free_cache\.csv')),
+    ('free_available', (r'_free_available\.plt', r'_free_available\.csv')),
+    ('net_rx', (r'_net_rx\.plt', r'_net_rx\.csv')),
+    ('net_tx', (r'_net_tx\.plt', r'_net_tx\.csv')),
+    ('net_rx_packets', (r'_net_rx_packets\.plt', r'_net_rx_packets\.csv')),
+    ('net_tx_packets', (r'_net_tx_packets\.plt', r'_net_tx_packets\.csv')),
+    ('tcp_retrans', (r'_tcp_retrans\.plt', r'_tcp_retrans\.csv')),
+    ('tcp_active', (r'_tcp_active\.plt', r'_tcp_active\.csv')),
+    ('tcp_connections', (r'_tcp_connections\.plt', r'_tcp_connections\.csv')),
+    # one csv file for all the stages, a column per interface
+    ('net_rx_iface', (r'_net_rx_iface\.plt', r'_net_rx_iface\.csv')),
+    ('net_tx_iface', (r'_net_tx_iface\.plt', r'_net_tx_iface\.csv')),
+    ('net_rx_packets_iface', (r'_net_rx_packets_iface\.plt', r'_net_rx_packets_iface\.csv')),
+    ('net_tx_packets_iface', (r'_net_tx_packets_iface\.plt', r'_net_tx_packets_iface\.csv')),
+])
+
+# The metrics of the workflow's own processes (-W)
+WORKFLOW_METRICS = ['workflow_cpu', 'workflow_rss', 'workflow_reads',
+                    'workflow_writes', 'workflow_faults']
+
+# The metrics of -s, and of -A, which is also what post_process() parses
+# by default
+SAR_METRICS = ['sar', 'iowait', 'sar_reads', 'sar_writes', 'active_mem']
+DEFAULT_METRICS = ['iostat'] + SAR_METRICS
+
+# The metrics of -m: the busiest core, all the cores summed up, and each
+# core (a cores x time matrix per stage, see CpuSpecificsColumn)
+MPSTAT_METRICS = ['mpstat_active_core', 'mpstat_total_core', 'mpstat']
+
+# The metrics of -f: the memory in use, in the page cache and available,
+# from the timestamped free log of collect_stats.ksh --free
+FREE_METRICS = ['free_used', 'free_cache', 'free_available']
+
+# The metrics of -n: the throughput of the network interfaces, summed up
+# and of each interface (a time x interfaces matrix per stage, see 
+# NetworkInterfacesColumn), and the health of tcp, from the sar file 
+# (sar -A records them) or a procfs stream
+INTERFACE_METRICS = ['net_rx_iface', 'net_tx_iface', 'net_rx_packets_iface',
+                     'net_tx_packets_iface']
+NETWORK_METRICS = ['net_rx', 'net_tx', 'net_rx_packets', 'net_tx_packets'] + INTERFACE_METRICS + [
+                   'tcp_retrans', 'tcp_active', 'tcp_connections']
+
+# The metrics whose series are a matrix, a column per core or interface:
+# their plot draws the csv file of every stage at once
+MATRIX_METRICS = ['mpstat'] + INTERFACE_METRICS
+
+# What post_process() returns: the input dir, the output dir, the steps,
+# metric -> OrderedDict of step name -> TimeSeries (see SeriesStore.load()),
+# and 0, or 1 when a plot failed
+ParsedRun = namedtuple ('ParsedRun', ['root', 'output', 'steps', 'series', 'returncode'])
+
+# What post_process_batch() returns per run: the input dir, its output dir,
+# and the traceback when it failed, else None
+BatchRun = namedtuple ('BatchRun', ['root', 'output', 'error'])
+# The index of a batch, in its output folder
+BATCH_INDEX_CSV = 'batch_index.csv'
+BATCH_INDEX_COLUMNS = ['run', 'output', 'status', 'metric', 'units', 'stage', 'samples',
+                       'start', 'end', 'mean', 'median', 'stdev', 'max']
+
+# The outcome of one gnuplot run: the .plt file, gnuplot's exit status (None
+# when it could not be started), how long it took and its error output
+PlotResult = namedtuple ('PlotResult', ['plot', 'returncode', 'seconds', 'errors'])
+
+# Changed whenever the samples scanned from a log would change, so that the
+# ParseCache entries of an older parser are not used
+PARSER_VERSION = '0.3'
+
+# Default size limit of the parse cache (--cache_size), in megabytes
+DEFAULT_CACHE_SIZE = 2048
+
+# Samples are parsed and written this many at a time, so memory
+# use does not grow with the length of a run
+SPOOL_CHUNK_SIZE = 16384
+
+# The timestamps of a TimeSeries are datetime64[ms]: this many per second,
+# so the sub-second samples of a procfs stream keep their own times
+TICKS_PER_SECOND = 1000
+
+# The numpy type of the row names of a labelled metric (see is_labelled):
+# an interface name is at most 15 characters (IFNAMSIZ)
+LABEL_TYPE = 'S16'
+
+# The folder of the SeriesStore, inside the output folder, and the version
+# of its layout, changed whenever a reader of the store would have to change
+SERIES_STORE_DIR = "series"
+SERIES_STORE_FORMAT = 2
+
+# The folder of the LiveTail, inside the output folder
+LIVE_TAIL_DIR = "live"
+
+# How often, in seconds, make_metric_families() looks for a metric family
+# process that died without a result
+FAMILY_POLL_INTERVAL = 1
+
 ## For single step support - not used currently
 single_step_dict = OrderedDict([])
 
@@ -156,7 +372,8 @@ def main(argv=None):
     INPUTS:
        argv - a list holding the command line user arguments
         
-    OUTPUTS: Nothing on success. If non-recoverable error, exits program. 
+    OUTPUTS: Returns the exit status: 0 on success, 1 when a plot failed.
+             If non-recoverable error, exits program. 
     
     ALGORITHM (the steps):
         1. Capture arguments
@@ -182,6 +399,11 @@ def main(argv=None):
     logger.info("=== Starting parser at {0}".format(time.strftime("%Y-%m-%d %H:%M:%S")))
     logger.info("Logging level set to {0}".format(args.log))
 
+    # Several run directories, or a glob: the batch mode
+    if len(args.root) > 1 or has_magic(args.root[0]):
+        sys.exit(input.post_process_batch(args))
+    args.root = args.root[0]
+
     ## 3. validate arguments 
     check_list = input.check_args(args)
     if check_list[1] is None:
@@ -195,7 +417,10 @@ def main(argv=None):
 
     ## 4. do work
     try:
-        post_process_rc = input.post_process(args)
+        if args.live:
+            post_process_rc = input.follow_workflow(args)
+        else:
+            post_process_rc = input.post_process(args)
     # Catch all exceptions that aren't handled elsewhere
     except Exception, e:
         traceback.print_exc()
@@ -205,9 +430,234 @@ def main(argv=None):
         sys.exit(1)
 
     print ("main::All done! Exiting now")
+    return post_process_rc
 ##end main
 
 
+def post_process(run_dir, stages='sample', metrics=None, window=100, output=None, 
+                 plot=False, plot_backend='gnuplot', tag=None, jobs=1, sar_reader='auto', 
+                 cache=None, cache_size=2048, log_level='info', single_step=None):
+    """
+    PURPOSE: The library entry point: post-processes one run in the calling
+             process, as the command line would, and returns the parsed 
+             series. Calls share no module state, so several runs can be
+             post-processed at once, from threads or processes, as long as
+             their outputs differ.
+        Usage example:
+            run = post_process ('/data/run1', 'sample', ['iostat', 'sar'])
+            for stage, series in run.series['iostat'].iteritems ():
+                print stage, series.values.max ()
+        
+    INPUTS:
+       run_dir - the workflow output directory ('root')
+       stages - a workflow name of workflow_dictionaries (-N), or the steps
+           themselves: an OrderedDict of step name -> search string of its
+           folder
+       metrics - metric names of METRIC_SPECS. Default: those of -A
+       window - the smoothing window, in seconds (-w)
+       output - the output folder (-o). Default: post_processed_stats in
+           run_dir
+       plot, plot_backend, tag, jobs, sar_reader, cache, cache_size,
+       log_level, single_step - as -p, --plot_backend, -t, -j, -r, --cache,
+           --cache_size, -l and -S
+        
+    OUTPUTS: Returns a ParsedRun. Raises ValueError for invalid arguments,
+        and whatever post-processing raised.
+    
+    CALLEES: workflow_profiler.py, post_process_run()
+    """
+    if output is None:
+        output = os.path.join(run_dir, 'post_processed_stats')
+    argv = [run_dir, '-o', output, '-w', str(window), '-j', str(jobs), '-r', sar_reader,
+            '--plot_backend', plot_backend, '--cache_size', str(cache_size), '-l', log_level]
+    if plot:
+        argv.append('-p')
+    if tag:
+        argv += ['-t', tag]
+    if cache:
+        argv += ['--cache', cache]
+    if single_step:
+        argv += ['-S', single_step]
+
+    input = UserInput()
+    # A logger per output folder, so concurrent calls log to their own file
+    try:
+        args = input.parse_args(argv, 'workflow_stats_parser:' + os.path.abspath(output))
+    except SystemExit:
+        # argparse has printed what it could not parse
+        raise ValueError("post_process: invalid arguments: {0}".format(' '.join(argv)))
+    args.root = args.root[0]
+    try:
+        if isinstance(stages, basestring):
+            args.workflow_name = stages
+        else:
+            args.workflow_name = 'custom'
+            args.workflow = stages
+        args.metrics = list(metrics if metrics is not None else DEFAULT_METRICS)
+        rc, args = input.check_args(args)
+        if args is None:
+            raise ValueError("post_process: invalid arguments, error {0}, see {1}".format(
+                rc, os.path.join(output, 'parser.log')))
+
+        returncode = input.post_process(args)
+        store = SeriesStore(os.path.join(args.output, SERIES_STORE_DIR))
+        series = OrderedDict()
+        for metric in args.metrics:
+            try:
+                series[metric] = OrderedDict((part.stage, part) for part in store.load(metric))
+            except KeyError:
+                pass  # no step had samples of it
+        return ParsedRun(args.root, args.output, args.workflow.keys(), series, returncode)
+    finally:
+        close_logger(input.logger)
+
+
+def post_process_batch(run_dirs, stages='sample', metrics=None, window=100, 
+                       output=OUTPUT_DEFAULT_DIR, jobs=1, logger=None, **options):
+    """
+    PURPOSE: Post-processes many runs with one pool of worker processes,
+             which import the parser and read the plot templates once 
+             rather than once per run. A run that fails is recorded and the
+             others go on.
+        
+    INPUTS:
+       run_dirs - the workflow output directories
+       stages, metrics, window - as post_process(), for every run
+       output - the output folder of the batch: each run's output goes to a
+           folder named after the run in it, next to BATCH_INDEX_CSV
+       jobs - the number of worker processes, each post-processing one run
+           at a time
+       logger - where the progress is logged, or None
+       options - the other arguments of post_process()
+        
+    OUTPUTS: Returns a BatchRun per run, in the order of run_dirs. Writes
+        BATCH_INDEX_CSV: per run, metric and stage, the statistics of the
+        series (see series_stats()); a run that failed has one row, with
+        the error.
+    
+    CALLEES: UserInput.post_process_batch()
+    """
+    tasks = [(run_dir, run_output, stages, metrics, window, options)
+             for run_dir, run_output in izip(run_dirs, batch_output_dirs(run_dirs, output))]
+    pool = None
+    if jobs > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(min(jobs, len(tasks)))
+        results = pool.imap(post_process_run, tasks, chunksize=1)
+    else:
+        results = imap(post_process_run, tasks)
+
+    batch = []
+    rows = []
+    try:
+        for number, (run, run_rows) in enumerate(results, 1):
+            if logger:
+                logger.info("Batch\t {0}/{1} \tRun\t {2} \t{3}".format(
+                    number, len(tasks), run.root, 'failed:\n' + run.error if run.error else 'done'))
+            batch.append(run)
+            rows += run_rows
+        if pool:
+            pool.close()
+    except:
+        if pool:
+            pool.terminate()
+        raise
+    finally:
+        if pool:
+            pool.join()
+
+    output_file = os.path.join(output, BATCH_INDEX_CSV)
+    with open(output_file + '.tmp', 'wb') as index:
+        writer = csv.writer(index)
+        writer.writerow(BATCH_INDEX_COLUMNS)
+        writer.writerows(rows)
+    os.rename(output_file + '.tmp', output_file)
+    return batch
+
+
+def post_process_run(task):
+    """
+    PURPOSE: Post-processes one run of a batch, in a worker process
+    
+    INPUTS: task: (run_dir, output, stages, metrics, window, the other
+        arguments of post_process())
+    
+    OUTPUTS: Returns (a BatchRun, its rows of BATCH_INDEX_CSV). Only the
+        statistics come back, not the series.
+    
+    CALLEES: post_process_batch(), via multiprocessing.Pool when jobs > 1
+    """
+    run_dir, output, stages, metrics, window, options = task
+    try:
+        run = post_process(run_dir, stages, metrics, window, output, **options)
+    except Exception as error:
+        message = traceback.format_exc()
+        return BatchRun(run_dir, output, message), [[run_dir, output, 'error: ' + str(error).strip()]]
+
+    status = 'ok' if run.returncode == 0 else 'plot failed'
+    rows = []
+    for metric, stages in run.series.iteritems():
+        for stage, series in stages.iteritems():
+            row = [run.root, run.output, status, metric, METRIC_SPECS[metric].units, stage, len(series)]
+            stats = series_stats(series)
+            if stats:
+                unit = series.time_unit()
+                row += [series.time_strings(0, 1, unit)[0], series.time_strings(-1, None, unit)[0]]
+                row += ['{0:.2f}'.format(value) for value in stats]
+            rows.append(row)
+    if not rows:
+        rows.append([run.root, run.output, 'no samples'])
+    return BatchRun(run.root, run.output, None), rows
+
+
+def batch_output_dirs(run_dirs, output):
+    # A folder per run in output, named after the run; runs of the same
+    # name (in different folders) are numbered
+    names = {}
+    outputs = []
+    for run_dir in run_dirs:
+        name = os.path.basename(os.path.normpath(run_dir))
+        names[name] = names.get(name, 0) + 1
+        if names[name] > 1:
+            name = '{0}_{1}'.format(name, names[name])
+        outputs.append(os.path.join(output, name))
+    return outputs
+
+
+def get_workflow(workflow_name):
+    """
+    PURPOSE: Looks up the steps of a workflow in workflow_dictionaries
+    
+    INPUTS: workflow_name: a key of workflow_parse_dict (-N)
+    
+    OUTPUTS: Returns a copy of its OrderedDict of step name -> search string
+        of the step's folder, None for an unknown name
+    
+    CALLEES: UserInput.check_args()
+    """
+    dict_name = workflow_dictionaries.workflow_parse_dict.get(workflow_name)
+    if dict_name is None:
+        return None
+    return OrderedDict(getattr(workflow_dictionaries, dict_name))
+
+
+def process_exists(pid):
+    """
+    PURPOSE: Checks whether a process is running
+    
+    INPUTS: pid: its process id
+    
+    OUTPUTS: True or False
+    
+    CALLEES: UserInput.follow_workflow()
+    """
+    try:
+        os.kill(pid, 0)
+    except OSError as exception:
+        # EPERM: it runs, as another user
+        return exception.errno == errno.EPERM
+    return True
+
+
 def cleanup(args):
     """
     PURPOSE: Cleans up the output dir if there has been an error 
@@ -248,9 +698,9 @@ def who_called():
     #return caller
 
 
-def setup_logger(output_folder, log_level):
-    # create logger
-    logger = logging.getLogger(__file__)
+def setup_logger(output_folder, log_level, name=__file__):
+    # create logger; post_process() gives each call a logger of its own
+    logger = logging.getLogger(name)
     logger.setLevel(log_level)
 
     log_format = logging.Formatter('%(funcName)s:%(lineno)d - %(levelname)s - %(message)s')
@@ -281,6 +731,34 @@ def setup_logger(output_folder, log_level):
     return logger
 
 
+# The lines of the .plt templates, read once per process: a worker of a
+# batch plots every run it is given from them (see post_process_batch())
+TEMPLATE_LINES = {}
+
+def read_template(template_file):
+    """
+    PURPOSE: Reads a .plt template, from the disk the first time only
+    
+    INPUTS: template_file: its path
+    
+    OUTPUTS: Returns a list of its lines, which the caller may change
+    
+    CALLEES: CompleteDataFiles.fix_filename_in_plotfiles(), 
+        CompleteDataFiles.fix_plotfile_for_multicore()
+    """
+    if template_file not in TEMPLATE_LINES:
+        with open(template_file, 'r') as in_file:
+            TEMPLATE_LINES[template_file] = in_file.readlines()
+    return list(TEMPLATE_LINES[template_file])
+
+
+def close_logger(logger):
+    # Closes the log file of a logger made by setup_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
 #------------------------------
 # Data storage
 #------------------------------
@@ -298,13 +776,34 @@ class InputOutput ():
         
     """
 
-    def __init__(self, logger):
+    def __init__(self, logger, sar_reader='auto', metrics=None, output_dir=None, cache=None, tail=None, workflow=None, stamp=None):
         self.logger = logger
+        # The steps of the workflow: step name -> search string of its
+        # folder, see get_workflow()
+        self.workflow = workflow
+        # A ParseCache for the scanned samples, or None
+        self.cache = cache
+        # A LiveTail in the live mode, else None
+        self.tail = tail
+        # Where the csv files are written
+        self.output_dir = output_dir
+        # The time the csv files are named after, the same for every metric
+        # family of a run (see UserInput.make_metric_families()); None names
+        # each after the time it is made
+        self.stamp = stamp
+        # How binary sar files are decoded, see SAR_READERS
+        self.sar_reader = sar_reader
+        # The metrics being post-processed. Each log is scanned once for all
+        # of them. None means every metric in METRIC_SPECS.
+        self.metrics = metrics
+        # Scanned log files, keyed by file path, until every metric that
+        # needs them has been handed its samples
+        self.scan_sessions = {}
     
     # Get the data from a file!
     def get_data_for_one_step (self, step_path='path/to/step', metric=''):
         """
-        PURPOSE: Gets the text of the log file for one metric (iostat, sar, ...) 
+        PURPOSE: Gets the data of the log file for one metric (iostat, sar, ...) 
             and step in a workflow
         
         INPUTS:
@@ -314,52 +813,61 @@ class InputOutput ():
 
             metric: the metric we need to retrieve from the log files
 
-        OUTPUTS: Returns the log file text as a list of lines
+        OUTPUTS: Returns the metric's TimeSeries for metrics described in
+            METRIC_SPECS, otherwise the log file text as a list of lines
         
-        ALGORITHM: If it's sar data we must decode it first
+        ALGORITHM: Metrics with a spec are extracted by a LogScanSession,
+            which scans the log once for all the metrics that read it
         
         CALLEES: InputOutput.get_data_for_each_step()
             
+        """
+        target_file = self.get_log_file (step_path, metric)
+
+        if metric in METRIC_SPECS:
+            return self.get_metric_samples (target_file, metric)
+
+        with open (target_file, 'r') as old_data:
+            data = old_data.readlines ()
+        return data
+
+    def get_log_file (self, step_path, metric):
+        """
+        PURPOSE: Finds the log file of a step that a metric is read from
+        
+        INPUTS:
+            step_path: path to dir that holds the step's log files
+            metric: the metric we need to retrieve from the log files
+        
+        OUTPUTS: Returns the path of the log file
+        
+        CALLEES: InputOutput.get_data_for_one_step(), 
+            SetOfColumns.make_columns_in_parallel()
         """
         sub_dirlist = os.listdir (step_path)
 
         # We want specific output files for active_mem/active_core
-        if metric == 'active_mem' or "sar" in metric:
-            search_term = 'sar'
-        elif metric == 'mpstat_active_core' or metric == 'mpstat_total_core':
-            search_term = 'mpstat'
+        if metric in METRIC_SPECS:
+            search_term = METRIC_SPECS[metric].log
         else:
             search_term = metric
 
         target_file = None
-        data = None
         
         for filename in sub_dirlist:
             if search_term in filename and "decoded" not in filename:
                 target_file = filename
+        # A stage collected with procfs_collector.py has one stream for all
+        # the system-wide metrics, but not the per-core ones of mpstat or
+        # those of free
+        if not target_file and metric in METRIC_SPECS and metric not in WORKFLOW_METRICS + MPSTAT_METRICS + FREE_METRICS:
+            for filename in sub_dirlist:
+                if filename.endswith (PROCFS_SUFFIX):
+                    target_file = filename
         if not target_file:
             raise Exception("Can't find file for {0} in input data folder".format(search_term))
 
-        target_file = os.path.join (step_path, target_file)
-
-        # todo: implement reflection so I don't have to do all these checks
-        if metric == 'sar' and "linux" in _platform:
-            target_file = self.decode_data (target_file, step_path, "decoded_cpu_sr.txt")
-
-        if "sar_" in metric and "linux" in _platform:
-            target_file = self.decode_data (target_file, step_path, "decoded_io_sr.txt", '-b')
-
-        if metric == 'active_mem' and "linux" in _platform:
-            target_file = self.decode_data (target_file, step_path, "decoded_active_mem_sr.txt", "-r")
-
-        elif metric == 'active_mem':
-            return self.get_data_for_one_step (step_path, "active_mem")
-
-        with open (target_file, 'r') as old_data:
-            data = old_data.readlines ()
-        if "decoded" in target_file:
-            os.remove(target_file)
-        return data
+        return os.path.join (step_path, target_file)
 
     # Get data for all steps
     def get_data_for_each_step (self, root_name='', metric=""):
@@ -370,47 +878,107 @@ class InputOutput ():
             root_name: the input dir as specified by user
             metric: The metric to collect from each step
         
-        OUTPUTS: Returns a list that contains the log data for each step
+        OUTPUTS: Returns a generator that reads the log data of each step
+            when it is reached, so only one step is read at a time
         
         CALLEES: SetOfColumns.make_columns_for_step()
             
         """
-        # get list of dirs
-        all_data = []
-        dir_list = os.walk (os.path.join (root_name, '.')).next ()[1]
-        dir_list = self.folder_workflow_sort (dir_list)
-
         # for each dir, get data
-        for dirname in dir_list:
-            dirname = os.path.join (root_name, dirname)
-            step_data = self.get_data_for_one_step (dirname, metric)
-            all_data.append (step_data)
+        for dirname in self.get_step_dirs (root_name):
+            yield self.get_data_for_one_step (dirname, metric)
 
-        return all_data
+    def get_step_dirs (self, root_name=''):
+        """
+        PURPOSE: Lists the folders of the steps, in workflow order
+        
+        INPUTS: root_name: the input dir as specified by user
+        
+        OUTPUTS: Returns a list of paths
+        
+        CALLEES: InputOutput.get_data_for_each_step(), 
+            SetOfColumns.make_columns_in_parallel()
+        """
+        dir_list = os.walk (os.path.join (root_name, '.')).next ()[1]
+        # In the live mode the last steps may not have started yet
+        dir_list = self.folder_workflow_sort (dir_list, started_only=self.tail is not None)
+        return [os.path.join (root_name, dirname) for dirname in dir_list]
 
-    def decode_data (self, target_file, root_name, new_file_name, flag=""):
+    def get_metric_samples (self, target_file, metric):
         """
-        PURPOSE: decodes a sar file
+        PURPOSE: Returns the samples of one metric of a stage. The log file
+            is scanned by a LogScanSession the first time any metric asks
+            for it; the other metrics that read the same log reuse the scan.
+            With a ParseCache, the samples of a log scanned by an earlier 
+            run are loaded instead. In the live mode, the LiveTail scans 
+            what was added to the log since the last refresh.
         
         INPUTS:
-            target_file: A sar filename in binary form which needs to be decoded
- 
-            root_name: the folder containing the binary sar file
+            target_file: the stage's log file for the metric
+            metric: a metric in METRIC_SPECS
+        
+        OUTPUTS: Returns a TimeSeries
+        
+        CALLEES: InputOutput.get_data_for_one_step()
+        """
+        session = self.scan_sessions.get (target_file)
+        if session is None:
+            log = METRIC_SPECS[metric].log
+            metrics = [m for m in (self.metrics or METRIC_SPECS.keys ())
+                       if m in METRIC_SPECS and METRIC_SPECS[m].log == log]
+            if metric not in metrics:
+                metrics.append (metric)
+            session = LogScanSession (self.logger, target_file, metrics, self.sar_reader, self.output_dir)
+            if self.tail:
+                session.samples = self.tail.follow (target_file, metrics, self.sar_reader)
+                if session.samples is None:
+                    # a log the LiveTail cannot follow is scanned in full
+                    session.scan ()
+            else:
+                cached = self.cache.load (target_file, metrics, self.sar_reader) if self.cache else None
+                if cached is not None:
+                    session.samples = cached
+                else:
+                    session.scan ()
+                    if self.cache:
+                        self.cache.store (target_file, self.sar_reader, session.samples)
+            self.scan_sessions[target_file] = session
 
-            new_file_name: The output filename for the decoded file 
+        samples = session.take (metric)
+        if session.is_drained ():
+            del self.scan_sessions[target_file]
+        return samples
 
-            flag: a string of flags to pass to the sar command
+    def export_scans (self):
+        """
+        PURPOSE: Hands over the samples that were scanned for metrics which
+            have not asked for them yet, e.g. from a worker process
         
-        OUTPUTS: Return the full path to the decoded sar file
+        INPUTS: None
+        
+        OUTPUTS: Returns log file -> (metric -> TimeSeries), and forgets them
         
-        CALLEES: InputOutput.get_data_for_one_step()            
+        CALLEES: parse_stage()
         """
+        scans = dict ((target_file, session.samples) for target_file, session in self.scan_sessions.iteritems ())
+        self.scan_sessions = {}
+        return scans
 
-        new_target_file = os.path.join (OUTPUT_DIR_NAME, new_file_name)
-        sar_command = 'sar --legacy -f "{0}" {2} > "{1}"'.format (target_file, new_target_file, flag)
-        self.logger.info("Running sar:\n{0}".format(sar_command))
-        call ([sar_command], shell=True)
-        return new_target_file
+    def import_scans (self, scans):
+        """
+        PURPOSE: Keeps samples scanned elsewhere until their metrics ask for
+            them, see export_scans()
+        
+        INPUTS: scans: log file -> (metric -> TimeSeries)
+        
+        OUTPUTS: None
+        
+        CALLEES: SetOfColumns.make_columns_in_parallel()
+        """
+        for target_file, samples in scans.iteritems ():
+            session = LogScanSession (self.logger, target_file, samples.keys (), self.sar_reader)
+            session.samples = samples
+            self.scan_sessions[target_file] = session
 
     def get_files_in_dir (self, dir_to_read):
         """
@@ -428,20 +996,21 @@ class InputOutput ():
 
     def get_root_path (self):
         """
-        PURPOSE: Gets the root folder of where this script was called from
+        PURPOSE: Gets the folder of this module, which holds the plot 
+            templates
         
         INPUTS: None
         
         OUTPUTS: Returns the root folder path
         
-        ALGORITHM: Uses sys.argv[0] to determine the current folder
+        ALGORITHM: Uses __file__, so that it is the same when the module is
+            imported by another script (see post_process())
         
         CALLEES: 
             CompleteDataFiles.fix_filename_in_plotfiles()
             CompleteDataFiles.fix_plotfile_for_multicore
         """
-        #  - fix this to work with
-        return os.path.split (os.path.abspath (os.path.realpath (sys.argv[0])))[0]
+        return os.path.split (os.path.abspath (os.path.realpath (__file__)))[0]
 
     def check_root (self, root):
         """
@@ -478,9 +1047,6 @@ class InputOutput ():
 
         return output_dir
 
-    #2. OUTPUT_DIR_NAME
-    #def store_data_into_csv (self, data, output_file=0, output_dir=OUTPUT_DIR_NAME[0]):
-    #def store_data_into_csv (self, data, output_file=0, output_dir=OUTPUT_DIR_NAME):
     def store_data_into_csv (self, data, output_file=0, output_dir=None): 
         """
         PURPOSE: Writes data into a csv file
@@ -488,7 +1054,8 @@ class InputOutput ():
         INPUTS:
             data: The data to be written
             output_file: The output filename
-            output_dir: The folder the csv file will be created in
+            output_dir: The folder the csv file will be created in, 
+                self.output_dir by default
         
         OUTPUTS: Creates a file. Returns nothing
     
@@ -500,80 +1067,198 @@ class InputOutput ():
         #if (output_dir == 0) or not (os.path.isdir (output_dir)):
         #    output_dir = self.make_output_dir (output_dir)
         if output_dir is None:
-            output_dir = OUTPUT_DIR_NAME
+            output_dir = self.output_dir
 
         # make filename
         if (output_file == 0):
-            output_file = time.strftime("%Y-%m-%d_%H.%M.%S") + "_io_stats.csv"
+            output_file = self.reserve_output_file (output_dir, "_io_stats.csv")
 
         output_file = os.path.join (output_dir, output_file)
 
-        # write file
-        with open(output_file, 'wb') as output:
+        # write file, under a temporary name so that the live mode, which
+        # writes it again at each refresh, never leaves half a file
+        with open(output_file + '.tmp', 'wb') as output:
             writer = csv.writer (output)
             for count in data:
                 writer.writerow (count)
+        os.rename (output_file + '.tmp', output_file)
 
-    # Calls all the plot files
-    def make_plots (self, output_files=[]):
+    def reserve_output_file (self, output_dir, suffix):
+        """
+        PURPOSE: Picks an output file name that no other writer is using:
+            the time the file is made, a counter if that name is taken 
+            already, then the suffix. 
+            e.g. 2014-04-15_22.28.29_iostat.csv, 2014-04-15_22.28.29.1_iostat.csv
+        
+        INPUTS:
+            output_dir: The folder the file will be created in
+            suffix: the end of the file name, e.g. '_iostat.csv'
+        
+        OUTPUTS: Returns the file name. The file is created empty.
+        
+        ALGORITHM: The time is self.stamp when set. The file is created with O_EXCL, so that of two writers 
+            (threads or processes) trying the same name, one moves on to 
+            the next counter
+        
+        CALLEES:
+            InputOutput.store_data_into_csv()
+            ColumnOfStatistics.make_csv_from_data()
+            CpuSpecificsColumn.make_csv_from_data()
         """
-        PURPOSE: Repeatedly calls gnuplot to create the output images
+        stamp = self.stamp or time.strftime("%Y-%m-%d_%H.%M.%S")
+        count = 0
+        while True:
+            output_file = stamp + ('.{0}'.format (count) if count else '') + suffix
+            try:
+                os.close (os.open (os.path.join (output_dir, output_file), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0644))
+                return output_file
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    raise
+            count += 1
+
+    def store_series_into_csv (self, series_list, output_file=0, output_dir=None):
+        """
+        PURPOSE: Writes the series of one metric side by side into a csv
+            file, a time and a value column for each step. Shorter series 
+            are padded with blank cells.
         
-        INPUTS: output_files: The list of *.plt files
+        INPUTS:
+            series_list: the TimeSeries of the metric, one per step
+            output_file: The output filename
+            output_dir: The folder the csv file will be created in
         
-        OUTPUTS: Creates .png files if gpuplot runs successfully
+        OUTPUTS: Creates a file. Returns nothing
+    
+        CALLEES:
+            ColumnOfStatistics.make_csv_from_data()
+            CpuSpecificsColumn.make_csv_from_data()
+        """
+        self.store_data_into_csv (self.get_series_rows (series_list), output_file, output_dir)
 
-        CLASS:  InputOutput   
+    def get_series_rows (self, series_list):
+        """
+        PURPOSE: Lays the series out as csv rows: a title row, a row with
+            the step names, a row with the column titles, then the samples
         
-        CALLEES: CompleteDataFiles.make_plots()
+        INPUTS: series_list: TimeSeries, one per step
+        
+        OUTPUTS: Returns an iterator of rows
+        
+        CALLEES: InputOutput.store_series_into_csv()
         """
-        os.environ['GNUTERM'] = 'dumb'
-        for filename in output_files:
-            filename = filename.replace (' ', '\ ')
-            print filename
-            with open(os.devnull, "w") as fnull:
-                call (["gnuplot", filename], stdout=fnull, stderr=fnull)
-        return
+        if not series_list:
+            return
+        first = series_list[0]
+        yield [first.metric.upper () + ': ' + first.description]
+
+        columns = [chain ([[series.stage], [series.time_title, series.value_title]], series.rows ())
+                   for series in series_list]
+        for cells in izip_longest (*columns):
+            row = []
+            for cell in cells:
+                cell = cell or []
+                row += cell + [''] * (2 - len (cell))
+            while row and row[-1] == '':
+                row.pop ()
+            yield row
 
-    # The contextmanager decorators makes this function 
-    # usable with a 'with' statement
-    @contextmanager
-    def make_temp_files (self, root, cores=0):
+    # Calls all the plot files
+    def make_plots (self, output_files=[], jobs=None):
         """
-        PURPOSE: A context manager for creating then removing temp files
-            Usage example:
-                with make_temp_files(root_folder, 4) as temp_files:
-                    for file in temp_files: do_work(file)
-                # Once out of the block, the temp files have been deleted
-            Note: This is only used for multicore data runs for mpstat currently. 
+        PURPOSE: Calls gnuplot to create the output images, several at a time
         
-        INPUTS:
-            root: The folder to make the new temp files in.
-            cores: # of cores. One temp file per core.
+        INPUTS: 
+            output_files: The list of *.plt files
+            jobs: how many gnuplots may run at once, the number of cpus by
+                default
         
-        OUTPUTS: Yields a list of temp files. 
+        OUTPUTS: Creates .png files if gpuplot runs successfully. 
+            Returns a PlotResult for each file, in the order given
+
+        ALGORITHM: A plot that fails is logged with gnuplot's error output
+            and the others carry on
+
+        CLASS:  InputOutput   
         
         CALLEES: CompleteDataFiles.make_plots()
         """
-        list_of_files = []
-        temp_dir = mkdtemp ()
+        os.environ['GNUTERM'] = 'dumb'
+        if jobs is None:
+            jobs = multiprocessing.cpu_count ()
+        pending = list (enumerate (output_files))
+        running = []  # (index, filename, gnuplot process, stderr file, start time)
+        results = [None] * len (pending)
+        start_all = time.time ()
+
+        with open(os.devnull, "w") as fnull:
+            while pending or running:
+                while pending and len (running) < jobs:
+                    index, filename = pending.pop (0)
+                    filename = filename.replace (' ', '\ ')
+                    print filename
+                    # a file rather than a pipe, gnuplot never blocks on it
+                    errors = TemporaryFile ()
+                    try:
+                        gnuplot = Popen (["gnuplot", filename], stdout=fnull, stderr=errors)
+                    except OSError as exception:
+                        errors.close ()
+                        results[index] = PlotResult (filename, None, 0.0, str (exception))
+                        continue
+                    running.append ((index, filename, gnuplot, errors, time.time ()))
+
+                still_running = []
+                for index, filename, gnuplot, errors, start in running:
+                    if gnuplot.poll () is None:
+                        still_running.append ((index, filename, gnuplot, errors, start))
+                        continue
+                    errors.seek (0)
+                    results[index] = PlotResult (filename, gnuplot.returncode, time.time () - start, errors.read ().strip ())
+                    errors.close ()
+                running = still_running
+                if running:
+                    time.sleep (0.05)
+
+        self.report_plots (results, time.time () - start_all)
+        return results
+
+    def report_plots (self, results, seconds):
+        """
+        PURPOSE: Logs how long each plot took and whether it worked
+        
+        INPUTS: 
+            results: PlotResult list, see make_plots()
+            seconds: the wall clock time of all the plots
+        
+        OUTPUTS: None
 
-        for core in range (cores):
-            list_of_files.append (mkstemp (prefix=str (core), suffix='.csv', dir=temp_dir))
-        yield list_of_files
+        CALLEES: InputOutput.make_plots()
+        """
+        failed = [result for result in results if result.returncode != 0]
+        for result in results:
+            if result.returncode == 0:
+                self.logger.info("gnuplot {0}: done in {1:.2f} s".format(result.plot, result.seconds))
+            elif result.returncode is None:
+                self.logger.error("gnuplot {0}: could not be run: {1}".format(result.plot, result.errors))
+            else:
+                self.logger.error("gnuplot {0}: exit status {1} after {2:.2f} s\n{3}".format(
+                                  result.plot, result.returncode, result.seconds, result.errors))
 
-        for file in list_of_files:
-            os.close (file[0])
-            os.remove (file[1])
-        rmtree (temp_dir)
+        print "Plotted {0} of {1} files in {2:.2f} s".format(len (results) - len (failed), len (results), seconds)
+        for result in failed:
+            print "  FAILED: {0} ({1})".format(result.plot, result.errors.splitlines ()[-1] if result.errors else 
+                                                "exit status {0}".format(result.returncode))
 
     # Helpers -------
     # sort folder list (in workflow order)
-    def folder_workflow_sort (self, folder_list):
+    def folder_workflow_sort (self, folder_list, started_only=False):
         """
         PURPOSE: Orders folder_list to match ordering of workflow 
         
-        INPUTS: folder_list: Folder names to sort
+        INPUTS: 
+            folder_list: Folder names to sort
+            started_only: stop at the first step without a folder, instead
+                of raising an Exception
         
         OUTPUTS: Returns a sorted list
         
@@ -584,7 +1269,7 @@ class InputOutput ():
         new_folder_list = []
         not_found_folders = []
 
-        pl_search_strings = (eval(PL)).values()
+        pl_search_strings = self.workflow.values()
        
         #for folder_name in ORDERED_WORKFLOW_STAT_DIRS:
         for search_str in pl_search_strings:
@@ -599,13 +1284,15 @@ class InputOutput ():
                     break
 
             if not found:
+                if started_only:
+                    break
                 not_found_folders.append(search_str)
 
         if not new_folder_list:
-            raise Exception("folder_workflow_sort(): Couldn't find any folders using the workflow search strings for '%s'." % (PL))
+            raise Exception("folder_workflow_sort(): Couldn't find any folders using the workflow search strings %s." % (', '.join(pl_search_strings)))
 
         if not_found_folders:
-            raise Exception("Didn't find matches for all search strings in workflow '%s' for: \n%s" % (PL, '\n'.join(not_found_folders)))
+            raise Exception("Didn't find matches for all search strings in the workflow for: \n%s" % ('\n'.join(not_found_folders)))
         return new_folder_list
 
     def read_lines(self, filename):
@@ -639,6 +1326,117 @@ class InputOutput ():
     def function():
             pass
 
+class LogScanSession ():
+    """
+    PURPOSE: Extracts all the requested metrics of one stage's log file in a
+        single pass and hands each metric its samples.
+
+        A procfs stream (see procfs_collector.py) is read by ProcfsReader.
+        sar files are binary. They are read natively by SarBinaryReader when
+        the format is supported. Otherwise sar is called a single time for
+        every activity the metrics need and its output is scanned straight
+        from the pipe. The samples are spooled to a temporary folder, see
+        SampleSpool.
+
+    ATTRIBUTES:
+        target_file: the log file
+        specs: metric -> MetricSpec for the metrics read from this log
+        reader: one of SAR_READERS
+        spool_root: where the temporary spool folder is made, None for the
+            system's temporary folder
+        samples: metric -> TimeSeries, once scanned
+        pending: the metrics that have not been handed their samples yet
+    """
+
+    def __init__ (self, logger, target_file, metrics, reader='auto', spool_root=None):
+        self.logger = logger
+        self.target_file = target_file
+        self.specs = OrderedDict ((metric, METRIC_SPECS[metric]) for metric in metrics)
+        self.reader = reader
+        self.spool_root = spool_root
+        self.samples = OrderedDict ()
+        self.pending = list (metrics)
+
+    def scan (self):
+        """
+        PURPOSE: Extracts the samples of all the pending metrics
+        
+        INPUTS: None
+        
+        OUTPUTS: Fills self.samples
+        
+        CALLEES: InputOutput.get_metric_samples()
+        """
+        spool_dir = mkdtemp (prefix='.spool_', dir=self.spool_root)
+        scanner = LogScanner (self.logger, self.specs, spool_dir)
+        is_sar = all (spec.log == 'sar' for spec in self.specs.itervalues ())
+
+        try:
+            if ProcfsReader.can_read (self.target_file):
+                self.logger.info("Reading the procfs stream:\n{0}".format(self.target_file))
+                with ProcfsReader (self.target_file) as reader:
+                    self.samples = scanner.extract (reader)
+            elif is_sar and self.reader != 'sar' and SarBinaryReader.can_read (self.target_file):
+                self.logger.info("Reading sar data natively from:\n{0}".format(self.target_file))
+                with SarBinaryReader (self.target_file) as reader:
+                    self.samples = scanner.extract (reader)
+            elif is_sar and self.reader == 'native':
+                raise Exception("The native sar reader does not support the format of {0}".format(self.target_file))
+            elif is_sar and "linux" in _platform:
+                self.samples = self.scan_with_sar (scanner)
+            else:
+                with open (self.target_file, 'r') as log_file:
+                    self.samples = scanner.scan (log_file)
+        finally:
+            # The series are mapped already, see SampleSpool.series()
+            rmtree (spool_dir, ignore_errors=True)
+
+    def sar_flags (self):
+        flags = []
+        for spec in self.specs.itervalues ():
+            flag = SAR_SECTION_FLAGS[spec.section]
+            if flag not in flags:
+                flags.append (flag)
+        return flags
+
+    def scan_with_sar (self, scanner):
+        """
+        PURPOSE: Runs sar once for all the pending metrics' activities and
+            scans its output as it streams out of the pipe
+        
+        INPUTS: scanner: the LogScanner for this log
+        
+        OUTPUTS: Returns metric -> TimeSeries
+        
+        CALLEES: LogScanSession.scan()
+        """
+        # a flag may be two words, e.g. '-n DEV'
+        sar_command = ['sar', '--legacy', '-f', self.target_file] + ' '.join (self.sar_flags ()).split ()
+        self.logger.info("Running sar:\n{0}".format(' '.join (sar_command)))
+        sar = Popen (sar_command, stdout=PIPE)
+        samples = scanner.scan (sar.stdout)
+        if sar.wait () != 0:
+            self.logger.error("sar returned {0} while decoding {1}".format(sar.returncode, self.target_file))
+        return samples
+
+    def take (self, metric):
+        """
+        PURPOSE: Hands a metric its samples and forgets them
+        
+        INPUTS: metric: one of the pending metrics
+        
+        OUTPUTS: Returns a TimeSeries
+        
+        CALLEES: InputOutput.get_metric_samples()
+        """
+        if metric in self.pending:
+            self.pending.remove (metric)
+        return self.samples.pop (metric)
+
+    def is_drained (self):
+        return not self.pending
+
+
 #------------------------------
 # User interaction
 #------------------------------
@@ -661,7 +1459,7 @@ class UserInput:
         # List of steps that did not contain enough data to process
         self.skipped_steps = []
        
-    def parse_args (self, argv):
+    def parse_args (self, argv, logger_name=__file__):
         """
         PURPOSE: validates user arguments
             
@@ -695,14 +1493,17 @@ class UserInput:
                                           description="Generates readable CSVs and plots which describe resource utilization for a given workflow")
         
         ## Positional Parameters
-        parser.add_argument ("root", help="Directory containing workflow's profile data")
+        parser.add_argument ("root", nargs='+', 
+                             help="Directory containing workflow's profile data. Several\n" + \
+                                  "directories, or a quoted glob of them, are post-processed\n" + \
+                                  "in one batch, by -j worker processes")
 
 
         ## Optional Parameters
         # workflow
         pl_help = "Specify the workflow"
 
-        pl_choices = workflow_parse_dict.keys()  # a list of acceptable workflow names
+        pl_choices = workflow_dictionaries.workflow_parse_dict.keys()  # a list of acceptable workflow names
 
         parser.add_argument ("-N", "--workflow_name",
                              choices=pl_choices,
@@ -726,9 +1527,13 @@ class UserInput:
 
         # Plots
         parser.add_argument ("-p", "--plot", help="Plot the data using gnuplot", action='store_true')
+        parser.add_argument ("--plot_backend", choices=PLOT_BACKENDS, default='gnuplot',
+                             help="How the plots are drawn. 'gnuplot' renders the .plt files,\n" + \
+                                  "'matplotlib' draws from the parsed data without reading\n" + \
+                                  "the csv files back. Default is 'gnuplot'")
 
         # Smoothing window size
-        parser.add_argument ("-w", "--window", help="Window size for smoothing plots", default=100, type=int)
+        parser.add_argument ("-w", "--window", help="Window size named in the time column titles, in seconds. The samples are not averaged over it", default=100, type=int)
 
         parser.add_argument ("-t", "--tag", help="A tag name to uniquely identify the data set (Will be displayed in plots)")
         
@@ -737,19 +1542,54 @@ class UserInput:
         stats = parser.add_argument_group('metrics', 'metrics options')
         stats.add_argument ("-A", "--all", help="Parse all metrics", action='store_true')
         stats.add_argument ("-i", "--iostat", help="Parse iostat information", action='store_true')
-        #stats.add_argument ("-m", "--mpstat", help="Parse mpstat info (cpu)", action='store_true')
+        stats.add_argument ("-m", "--mpstat", help="Parse mpstat information (the load of each core)", action='store_true')
         stats.add_argument ("-s", "--sar", help="Parse sar information", action='store_true')
-        #stats.add_argument ("-f", "--free", help="Parse free information", action='store_true')
+        stats.add_argument ("-f", "--free", help="Parse free information (used, cached and available memory)", action='store_true')
+        stats.add_argument ("-n", "--network", help="Parse the network throughput, summed up and of each interface, and tcp health (sar -n DEV,SOCK,TCP,ETCP)", action='store_true')
+        stats.add_argument ("-W", "--workflow_tree", action='store_true',
+                            help="Parse the usage of the workflow's own processes (collect_stats.ksh --proctree)")
+
+        # sar decoding
+        parser.add_argument ("-r", "--sar_reader", choices=SAR_READERS, default='auto',
+                             help="How to decode binary sar files. 'native' reads them without\n" + \
+                                  "the sar command, 'sar' always calls sar. Default is 'auto':\n" + \
+                                  "native when the file format is supported, else sar")
+
+        # parse cache
+        parser.add_argument ("--cache", metavar="DIR",
+                             help="Keep the samples parsed from each log in DIR, so that runs\n" + \
+                                  "post-processed again (e.g. with another -w) skip the parsing")
+        parser.add_argument ("--cache_size", metavar="MB", type=int, default=DEFAULT_CACHE_SIZE,
+                             help="Size limit of the --cache folder; the least recently used\n" + \
+                                  "logs are dropped first. Default is %d" % DEFAULT_CACHE_SIZE)
+
+        # parallel parsing
+        parser.add_argument ("-j", "--jobs", type=int, default=1,
+                             help="Number of worker processes that parse the workflow steps.\n" + \
+                                  "The output is the same for any number. Default is 1")
+
+        # live mode
+        parser.add_argument ("--live", metavar="SECONDS", type=int,
+                             help="Post-process a workflow that is still running: follow its\n" + \
+                                  "logs and refresh the csv files and plots every SECONDS.\n" + \
+                                  "Stops after a last refresh on SIGTERM or Ctrl-C")
+        parser.add_argument ("--follow_pid", metavar="PID", type=int,
+                             help="With --live, stop after a last refresh once process PID\n" + \
+                                  "(the workflow) has exited")
 
         # logger
         parser.add_argument ("-l", "--log", help="Specify the logging level", choices=LOG_LEVEL_MAP.keys(), default="info")
 
 
+        # Set by post_process(), the library entry point, only: the steps
+        # themselves, in place of -N, and the metrics, in place of -i/-s/-A/-W
+        parser.set_defaults (workflow=None, metrics=None)
+
         args = parser.parse_args (args=argv)  # returns namespace object containin args
 
         
         # For outputting debug and error messages
-        self.logger = setup_logger(args.output, LOG_LEVEL_MAP[args.log])
+        self.logger = setup_logger(args.output, LOG_LEVEL_MAP[args.log], logger_name)
 
         ## Sampling Interval
         #global MEASURE_INTERVAL
@@ -759,8 +1599,6 @@ class UserInput:
         return args
 
     def check_args (self, args_ns):
-        global PL
-        global ARGS_NS
         ## return codes
         success = 0
         root_err = 1                # input dir error
@@ -768,6 +1606,9 @@ class UserInput:
         single_step_err = 3         # single step error
         out_err = 4                 # output dir error
         pl_err = 5                  # workflow error 
+        jobs_err = 6                # worker count error
+        plot_err = 7                # plot backend error
+        live_err = 8                # live mode error
         rlist = [success, args_ns]  # return on success
         err_list = [-1, None]       # return on error    
 
@@ -805,30 +1646,33 @@ class UserInput:
         logger.debug("check_args::Validating workflow parameter")
         logger.debug("   passed in workflow arg is: \'%s\'" % (args_ns.workflow_name))
 
-        if args_ns.workflow_name in workflow_parse_dict:
-            PL = workflow_parse_dict[args_ns.workflow_name]  # sets PL to the dictionary
-        logger.debug("check_args::The global var PL has been set to workflow \'%s\'" % (PL))
-        logger.debug("   The workflow steps for \'%s\' are:" % (PL))
-        pl = PL
-        steps = (eval(pl)).keys()
-        step_dict = (eval(pl))
+        # The library entry point, post_process(), may pass the steps
+        # themselves instead of a name
+        pl = args_ns.workflow_name
+        step_dict = args_ns.workflow or get_workflow(pl)
+        if step_dict is None:
+            logger.error("ERROR: check_args: Unknown workflow \'%s\'" % (pl))
+            err_list[0] = pl_err
+            return err_list
+        # A copy: -S must not change the workflow's dictionary
+        step_dict = OrderedDict(step_dict)
+        steps = step_dict.keys()
+        logger.debug("   The workflow steps for \'%s\' are:" % (pl))
         if args_ns.single_step:
             if not args_ns.single_step in step_dict.itervalues():
-                raise Exception("single_step: "+args_ns.single_step+" not in step options for "+args_ns.workflow_name)
+                raise Exception("single_step: "+args_ns.single_step+" not in step options for "+pl)
             for key, value in step_dict.iteritems():
                 if value == args_ns.single_step:
-                    step_dict.clear()
-                    step_dict.update(OrderedDict ([(key, value)]))
+                    step_dict = OrderedDict ([(key, value)])
                     steps = step_dict.keys()
                     break
+        args_ns.workflow = step_dict
         logger.debug(steps)
-        logger.debug("   The workflow dir seach strings for \'%s\' are:" % (pl))
-        search_dir_strs = (eval(pl).values())
-        logger.debug(search_dir_strs)
+        search_dir_strs = step_dict.values()
         logger.debug("   The workflow dir search strings for \'%s\' are:" % (pl)) 
         logger.debug("     Step   Search Str")
         for s in steps:
-            logger.debug("     %s  --> %s" % (s, (eval(pl)[s])))
+            logger.debug("     %s  --> %s" % (s, step_dict[s]))
 
         #Validate dir search strings to ensure that each pattern exists in a sub-dir of the root input dir 
         len_steps = len(steps)
@@ -861,21 +1705,46 @@ class UserInput:
 
         all_args = args_ns.all
         iostat = args_ns.iostat
-        #mpstat = args_ns.mpstat
+        mpstat = args_ns.mpstat
         sar = args_ns.sar
-        #free = args_ns.free
+        free = args_ns.free
+        network = args_ns.network
 
-        stats_error_msg = "A|--all, -i|--iostat,  -s|--sar"
+        stats_error_msg = "A|--all, -i|--iostat,  -s|--sar, -m|--mpstat, -f|--free, -n|--network, -W|--workflow_tree"
 
-        #if not any([args.all, args.iostat, args.mpstat, args.sar, args.free]):
-        if not any([all_args, iostat, sar]):
+        if not any([all_args, iostat, sar, mpstat, free, network, args_ns.workflow_tree, args_ns.metrics]):
             #rc = 3 
             err_list[0] = stats_err
             logger.debug("ERROR:check_args: At least one metric argument is required: \'%s\'" % stats_error_msg)
             print ("ERROR:check_args: At least one metric argument is required: \'%s\'" % stats_error_msg)
             return err_list
+        unknown_metrics = [metric for metric in args_ns.metrics or [] if metric not in METRIC_SPECS]
+        if unknown_metrics:
+            err_list[0] = stats_err
+            logger.error("ERROR: check_args: Unknown metrics: %s" % (', '.join(unknown_metrics)))
+            return err_list
         logger.debug("check_args::Metric choice is valid.")
 
+        if args_ns.jobs < 1:
+            err_list[0] = jobs_err
+            logger.error("ERROR: check_args: -j|--jobs must be at least 1, got %d" % (args_ns.jobs))
+            return err_list
+
+        if args_ns.plot_backend == 'matplotlib' and not matplotlib_available ():
+            err_list[0] = plot_err
+            logger.error("ERROR: check_args: --plot_backend matplotlib needs the matplotlib package")
+            print ("ERROR: check_args: --plot_backend matplotlib needs the matplotlib package")
+            return err_list
+
+        if args_ns.live is not None and args_ns.live < 1:
+            err_list[0] = live_err
+            logger.error("ERROR: check_args: --live must be at least 1 second, got %d" % (args_ns.live))
+            return err_list
+        if args_ns.follow_pid is not None and not args_ns.live:
+            err_list[0] = live_err
+            logger.error("ERROR: check_args: --follow_pid needs --live")
+            return err_list
+
         ##4. Check Output dir
         """
         Check that output is a valid directory. 
@@ -925,141 +1794,339 @@ class UserInput:
         args_ns.output = abs_output
  
         rlist[1] = args_ns  # update the return list before returning
-        ARGS_NS = args_ns   # update the global args namespace object
         return rlist
 
-    def post_process (self, args):
+    def post_process (self, args, tail=None):
         """
         PURPOSE: 
             does the work: 
                Parses the metrics and creates output files
         
-        INPUTS: the argument namespace as updated by check_args 
+        INPUTS: 
+            args: the argument namespace as updated by check_args 
+            tail: in the live mode, the LiveTail that follows the logs
         
-        OUTPUTS:
+        OUTPUTS: Returns 0, or 1 when a plot failed
 
-        CALLEES: main()
+        CALLEES: main(), UserInput.follow_workflow()
         """
-        global OUTPUT_DIR_NAME
-        columns = SetOfColumns (self.logger)
-        finished_data = CompleteDataFiles (self.logger)
-        time_holder = ['go']
-        average_time_holder = ['go']
-        core_data = []
-        iostat_columns = []
-        sar_columns = [] 
-        active_mem_columns = []
-        mpstat_active_columns = []
-        mpstat_total_columns = []
+        metrics = self.get_metrics (args)
+        finished_data = CompleteDataFiles (self.logger, args.workflow)
         list_of_plot_regexes = []
         list_of_file_regexes = []
-        list_of_multicore_plot_regexes = [] #used by mpstat
-        #window = args.window  ## change to use args.window instead
+        list_of_multicore_plot_regexes = [] #used by mpstat and the interfaces
         rc = 0  # success return code
         ret_early = 1  # reurn early code
 
-        if args.output:
-            #3. OUTPUT_DIR_NAME
-            #OUTPUT_DIR_NAME[:] = [args.output]
-            OUTPUT_DIR_NAME = args.output
-
         """ #rlk - commenting this out for now
         if args.no_multistep:
             ORDERED_WORKFLOW_STEPS[:] = ['process']
             ORDERED_WORKFLOW_STAT_DIRS[:] = ['.*run\..*']
         """
-        #workflow_steps = sample_dict.keys()
-        workflow_steps = (eval(PL)).keys()
+        workflow_steps = args.workflow.keys()
+
+        # The metrics read from the same log are one family: the log is
+        # scanned once for all of them. The families run concurrently.
+        families = OrderedDict ()
+        for metric in metrics:
+            families.setdefault (METRIC_SPECS[metric].log, []).append (metric)
+            if metric in MATRIX_METRICS:
+                # the matrix of the cores or interfaces has a plot file of its own
+                list_of_multicore_plot_regexes.append (METRIC_PLOTS[metric][0])
+                continue
+            list_of_plot_regexes.append (METRIC_PLOTS[metric][0])
+            list_of_file_regexes.append (METRIC_PLOTS[metric][1])
+        tag = self.get_plot_tag (args)
+        renderer = None
+        if (args.plot or args.all) and args.plot_backend == 'matplotlib':
+            # The plots are drawn as each metric is parsed
+            renderer = MatplotlibRenderer (args.output, tag)
+        store = SeriesStore (os.path.join (args.output, SERIES_STORE_DIR))
+        average_time, plot_results = self.make_metric_families (args, families.values (), 
+                                                               workflow_steps, renderer, store, tail)
+        store.write_index (metrics, args.root, args.window)
+        self.write_overhead_summary (args, workflow_steps, tail)
+
+        if (args.plot or args.all) and args.plot_backend == 'gnuplot':
+            #list_of_multicore_plot_regexes is only used with MATRIX_METRICS
+
+            plot_results = finished_data.make_plots (args.root, args.output, tag, 
+              list_of_multicore_plot_regexes, list_of_file_regexes, 
+              list_of_plot_regexes, average_time)
+        if any (result.returncode != 0 for result in plot_results):
+            rc = 1
 
-        if args.iostat or args.all:
-            iostat_columns = columns.make_columns_for_step (args.root, 
-                             'iostat', steps=workflow_steps, window=args.window)
-            columns.make_csv_from_set (iostat_columns, 'iostat')
-            list_of_plot_regexes.append (r'_iostat\.plt')
-            list_of_file_regexes.append (r'_iostat\.csv')
+        self._remove_logger_if_empty()
+                
+        return rc
 
+    def post_process_batch (self, args):
+        """
+        PURPOSE: The batch mode: post-processes every run directory given,
+            or matched by a glob, see post_process_batch()
+        
+        INPUTS: args: the argument namespace, as parsed; args.root is the 
+            list of run directories and globs
+        
+        OUTPUTS: Returns 0, or 1 when a run failed or the arguments are
+            invalid
+        
+        CALLEES: main()
+        """
+        logger = self.logger
+        metrics = self.get_metrics (args)
+        if not metrics:
+            logger.error("ERROR: batch: At least one metric argument is required: -A, -i, -s, -m, -f, -n or -W")
+            return 1
+        if args.jobs < 1 or args.live:
+            logger.error("ERROR: batch: -j must be at least 1, and --live follows a single run")
+            return 1
+        if args.plot_backend == 'matplotlib' and not matplotlib_available ():
+            logger.error("ERROR: batch: --plot_backend matplotlib needs the matplotlib package")
+            return 1
+
+        output = os.path.abspath (args.output.rstrip ('/'))
+        run_dirs = []
+        for root in args.root:
+            # A glob only matches the run directories, not the batch's output
+            matches = [os.path.abspath (match) for match in sorted (glob (root)) if os.path.isdir (match)] \
+                if has_magic (root) else [os.path.abspath (root)]
+            run_dirs += [match for match in matches if match not in run_dirs and match != output]
+        if not run_dirs:
+            logger.error("ERROR: batch: No run directories match {0}".format (' '.join (args.root)))
+            print ("ERROR: batch: No run directories match {0}".format (' '.join (args.root)))
+            return 1
+
+        logger.info("Batch of {0} runs, {1} at a time".format (len (run_dirs), min (args.jobs, len (run_dirs))))
+        batch = post_process_batch (run_dirs, args.workflow_name, metrics, args.window, output, args.jobs, logger,
+                                    plot=args.plot or args.all, plot_backend=args.plot_backend, tag=args.tag, 
+                                    sar_reader=args.sar_reader, cache=args.cache, cache_size=args.cache_size, 
+                                    log_level=args.log, single_step=args.single_step)
+        failed = [run for run in batch if run.error]
+        for run in failed:
+            print ("batch: {0} failed: {1}".format (run.root, run.error.strip ().splitlines ()[-1]))
+        print ("batch: {0} of {1} runs post-processed, see {2}".format (
+            len (batch) - len (failed), len (batch), os.path.join (output, BATCH_INDEX_CSV)))
+        return 1 if failed else 0
+
+    def get_metrics (self, args):
+        """
+        PURPOSE: The metrics to post-process
+        
+        INPUTS: args: the argument namespace
+        
+        OUTPUTS: Returns a list of metric names: those given to 
+            post_process(), then those of -i, -s, -A, -m, -f, -n and -W
+        
+        CALLEES: UserInput.post_process(), UserInput.post_process_batch()
+        """
+        metrics = list (args.metrics or [])
+        if args.iostat or args.all:
+            metrics.append ('iostat')
         if args.sar or args.all:
-            sar_columns = columns.make_columns_for_step (args.root, 'sar', 
-                          steps=workflow_steps, time_holder=time_holder, 
-                          window=args.window)
-            columns.make_csv_from_set (sar_columns, 'sar')
-            list_of_plot_regexes.append (r'_sar\.plt')
-            list_of_file_regexes.append (r'_sar\.csv')
-
-            sar_columns_reads = columns.make_columns_for_step (args.root, 
-                                'sar_reads', steps=workflow_steps, 
-                                time_holder=time_holder, window=args.window)
-            columns.make_csv_from_set (sar_columns_reads, 'sar_reads')
-            list_of_plot_regexes.append (r'_sar_reads\.plt')
-            list_of_file_regexes.append (r'_sar_reads\.csv')
-
-            sar_columns_writes = columns.make_columns_for_step (args.root, 
-                                 'sar_writes', steps=workflow_steps, 
-                                 time_holder=time_holder, window=args.window)
-            columns.make_csv_from_set (sar_columns_writes, 'sar_writes')
-            list_of_plot_regexes.append (r'_sar_writes\.plt')
-            list_of_file_regexes.append (r'_sar_writes\.csv')
-
-            active_mem_columns = columns.make_columns_for_step (args.root, 
-                                 'active_mem', steps=workflow_steps, 
-                                 window=args.window)
-            columns.make_csv_from_set (active_mem_columns, 'active_mem')
-            list_of_plot_regexes.append (r'committed_mem\.plt')
-            list_of_file_regexes.append (r'active_mem\.csv')
-
-        """
-        #commenting this out - mpstat stuff
-        if args.mpstat or args.all:
-            # Active core data
-            mpstat_active_columns = columns.make_columns_for_step (args.root, 
-                                    'mpstat_active_core', steps=workflow_steps,
-                                    window=args.window)
-            columns.make_csv_from_set (mpstat_active_columns, 
-                                       'mpstat_active_core')
-            list_of_plot_regexes.append (r'active_core_mpstat\.plt')
-            list_of_file_regexes.append (r'_mpstat_active_core\.csv')
-
-            # Total core data
-            mpstat_total_columns = columns.make_columns_for_step (args.root, 
-                                   'mpstat_total_core', steps=workflow_steps, 
-                                   window=args.window)
-            columns.make_csv_from_set (mpstat_total_columns, 
-                                       'mpstat_total_core')
-            list_of_file_regexes.append (r'_mpstat_total_core\.csv')
-            list_of_plot_regexes.append (r'_total_core_mpstat\.plt')
-
-            # Multicore data
-            core_data = columns.make_sets_for_cores (args.root, 'mpstat')
-            columns.make_csv_from_set (core_data, 'mpstat')
-            list_of_multicore_plot_regexes.append (r'many_cores\.plt')
-        """
-        if args.plot or args.all:
-            if not args.tag:
-                # set tag to the basename of the input dir
-                tag = os.path.basename(os.path.normpath(args.root))
-
-                """          
-                # Split the basename of root dir by '_' chars
-                root_bnSplit = os.path.basename(os.path.normpath(args.root)).split('_')
-                if len(root_bnSplit) >= 3:
-                    sname = root_bnSplit[0]
-                    thread = root_bnSplit[1]
-                    tag = sname + ', # Threads: ' + root_bnSplit[1]
-                else:
-                    tag = root_bnSplit[0] 
-                """
+            metrics += SAR_METRICS
+        # not part of -A: only a stage collected with --mpstat has them
+        if args.mpstat:
+            metrics += MPSTAT_METRICS
+        # not part of -A: only a stage collected with --free has them
+        if args.free:
+            metrics += FREE_METRICS
+        # not part of -A, which keeps to the cpu, storage and memory
+        if args.network:
+            metrics += NETWORK_METRICS
+        # not part of -A: only a stage collected with --proctree has them
+        if args.workflow_tree:
+            metrics += WORKFLOW_METRICS
+        return metrics
+
+    def write_overhead_summary (self, args, workflow_steps, tail=None):
+        """
+        PURPOSE: Writes OVERHEAD_CSV, what the collectors cost each step, 
+            from the file that 'collect_stats.ksh --kill-all' left in the
+            step's folder (see collector_overhead.py)
+        
+        INPUTS: 
+            args: the argument namespace as updated by check_args 
+            workflow_steps: the steps being post-processed
+            tail: in the live mode, the LiveTail that follows the logs
+        
+        OUTPUTS: None. Steps without the file are left out; no csv file is
+            written when none has it.
+        
+        CALLEES: UserInput.post_process()
+        """
+        step_dirs = InputOutput (self.logger, tail=tail, workflow=args.workflow).get_step_dirs (args.root)
+        rows = []
+        for step, step_dir in izip (workflow_steps, step_dirs):
+            processes = read_overhead (step_dir)
+            if not processes:
+                continue
+            step_rows = overhead_rows (step, processes)
+            total = step_rows[-1]
+            self.logger.info("Collector overhead\t Step\t {0} \tcpu time (s)\t {1} \tpeak rss (MB)\t {2} \tlog written (MB)\t {3}".format(
+                step, total[4], total[6], total[7]))
+            rows += step_rows
+        if not rows:
+            self.logger.info("No collector overhead was recorded for {0}".format(args.root))
+            return
+
+        output_file = os.path.join (args.output, OVERHEAD_CSV)
+        with open (output_file + '.tmp', 'wb') as output:
+            writer = csv.writer (output)
+            writer.writerow (OVERHEAD_COLUMNS)
+            writer.writerows (rows)
+        os.rename (output_file + '.tmp', output_file)
+
+    def follow_workflow (self, args):
+        """
+        PURPOSE: The live mode: post-processes a workflow that is still
+            running every args.live seconds, until it is done
+        
+        INPUTS: the argument namespace as updated by check_args 
+        
+        OUTPUTS: Returns what the last post_process() returned
+        
+        ALGORITHM: 
+            Each refresh only scans what the workflow added to its logs 
+            since the one before (see LiveTail), then writes the csv files,
+            the series and the plots of the whole run so far, under the
+            same names each time. The steps that have not started are left
+            out. A refresh that fails, e.g. on a step whose logs are not
+            created yet, is logged and the next one tries again.
+
+            The last refresh comes after the workflow process (--follow_pid)
+            has exited, or after SIGTERM or Ctrl-C. It also takes the last
+            block of each log, and its errors are not caught.
+        
+        CALLEES: main()
+        """
+        tail = LiveTail (self.logger, os.path.join (args.output, LIVE_TAIL_DIR))
+        stop = []
+        signal.signal (signal.SIGTERM, lambda signum, frame: stop.append (signum))
+        while True:
+            # Checked before the refresh, so that the last one reads all of
+            # the workflow's output
+            tail.final = bool (stop) or (args.follow_pid is not None and not process_exists (args.follow_pid))
+            if tail.final:
+                self.logger.info("Live mode: last refresh")
+                return self.post_process (args, tail)
+            try:
+                self.post_process (args, tail)
+            except Exception:
+                self.logger.warning("Live mode: refresh failed, trying again in {0}s:\n{1}".format(args.live, traceback.format_exc ()))
+            try:
+                deadline = time.time () + args.live
+                while not stop and time.time () < deadline:
+                    time.sleep (min (1, deadline - time.time ()))
+            except KeyboardInterrupt:
+                stop.append (signal.SIGINT)
+
+    def get_plot_tag (self, args):
+        """
+        PURPOSE: The tag shown in the subtitle of the plots
+        
+        INPUTS: args: the argument namespace as updated by check_args 
+        
+        OUTPUTS: Returns --tag, or the name of the input dir
+        
+        CALLEES: UserInput.post_process()
+        """
+        if not args.tag:
+            # set tag to the basename of the input dir
+            tag = os.path.basename(os.path.normpath(args.root))
+
+            """          
+            # Split the basename of root dir by '_' chars
+            root_bnSplit = os.path.basename(os.path.normpath(args.root)).split('_')
+            if len(root_bnSplit) >= 3:
+                sname = root_bnSplit[0]
+                thread = root_bnSplit[1]
+                tag = sname + ', # Threads: ' + root_bnSplit[1]
             else:
-                tag = args.tag
+                tag = root_bnSplit[0] 
+            """
+        else:
+            tag = args.tag
+        return tag
 
-            #list_of_multicore_plot_regexes is only used with mpstat
+    def make_metric_families (self, args, families, steps, renderer=None, store=None, tail=None):
+        """
+        PURPOSE: 
+            Makes the csv files of the metric families, each family in its
+            own process when there are several
+        
+        INPUTS: 
+            args: the argument namespace as updated by check_args 
+            families: lists of metrics, see post_process()
+            steps: the workflow steps
+            renderer: a MatplotlibRenderer to draw the plots with, or None
+            store: the SeriesStore the series are written to, or None
+            tail: in the live mode, the LiveTail that follows the logs
+        
+        OUTPUTS: Returns (the average sampling time for the plots: the one
+            found first, with the families in the order given;
+            the PlotResult of each plot drawn by the renderer)
 
-            finished_data.make_plots (args.root, OUTPUT_DIR_NAME, tag, 0, 
-              core_data, list_of_multicore_plot_regexes, list_of_file_regexes, 
-              list_of_plot_regexes, columns.average_time[0])
+        ALGORITHM:
+            The families share no state: each has its own SetOfColumns and
+            writes its own csv files, and the folders of its own metrics in
+            the SeriesStore. The csv files are all named after one time, 
+            taken here, their names reserved so that two families never 
+            collide (see InputOutput.reserve_output_file()). Only the 
+            average sampling time and the plot results come back, through
+            a queue. A family process that dies without posting them (e.g.
+            killed when out of memory) is an error, not a wait forever.
+
+        CALLEES: UserInput.post_process()
+        """
+        cache = None
+        if args.cache:
+            cache = ParseCache (self.logger, args.cache, args.cache_size * 1024 * 1024)
+        stamp = time.strftime("%Y-%m-%d_%H.%M.%S")
+        tasks = [(SetOfColumns (self.logger, args.sar_reader, family, args.jobs, args.output, cache, tail, args.workflow, stamp), 
+                  args.root, family, steps, args.window, renderer, store) for family in families]
+        if len (tasks) == 1:
+            return tasks[0][0].make_csvs_for_metrics (*tasks[0][1:])
+        if multiprocessing.current_process ().daemon:
+            # A worker of a batch (see post_process_batch()) can't start
+            # processes: the families run one after the other
+            results = [task[0].make_csvs_for_metrics (*task[1:]) for task in tasks]
+            return (next ((average for average, plots in results if average), 0),
+                    list (chain (*[plots for average, plots in results])))
+
+        results = multiprocessing.Queue ()
+        # Not daemons, so that the families can have a pool of their own (-j)
+        workers = [multiprocessing.Process (target=make_metric_family, args=(index, task, results))
+                   for index, task in enumerate (tasks)]
+        for worker in workers:
+            worker.start ()
+        average_times = [0] * len (workers)
+        plot_results = [[]] * len (workers)
+        errors = []
+        pending = set (xrange (len (workers)))
+        gone = set ()
+        while pending:
+            try:
+                index, (average_times[index], plot_results[index]), error = results.get (timeout=FAMILY_POLL_INTERVAL)
+            except Queue.Empty:
+                # A family posts its result before it exits, so one already
+                # gone at the last look and still without a result died
+                for index in sorted (pending & gone):
+                    errors.append ("The process of metric family {0} exited with code {1} without a result".format (
+                        ','.join (families[index]), workers[index].exitcode))
+                pending -= gone
+                gone = set (index for index in pending if not workers[index].is_alive ())
+                continue
+            pending.discard (index)
+            if error:
+                errors.append (error)
+        for worker in workers:
+            worker.join ()
 
-        self._remove_logger_if_empty()
-                
-        return rc
+        if errors:
+            raise Exception("Error in a metric family:\n" + '\n'.join (errors))
+        return (next ((average for average in average_times if average), 0), 
+                list (chain (*plot_results)))
 
     def _remove_logger_if_empty(self):
         empty = False
@@ -1074,6 +2141,1353 @@ class UserInput:
             pass
 
 
+#------------------------------
+# Metric extraction
+#------------------------------
+# Describes where a metric is read from:
+#   log     - the search term of the stage's log file (see get_data_for_one_step)
+#   section - a header column that identifies the section holding the metric
+#   column  - the header column holding the metric, or for a text log, a tuple
+#             of alternatives for the versions of a tool: the first one the 
+#             header has is read. An alternative that is a tuple of columns 
+#             is their sum, a column named '-name' being subtracted
+#   row     - (header column, value) that a row must match, or None for all rows.
+#             The value is a string, or a compiled regex the cell must match
+#   combine - folds all the rows of one block into one sample, or None for
+#             one sample per row. Called as combine (values, carry) and
+#             returns (sample, carry), where carry is kept between blocks.
+#             A sample per row of a row column in LABELLED_ROWS keeps the
+#             name of its row, see TimeSeries.labels
+#   convert - converts one column value to the units the metric is reported in
+#   units   - those units, as written in the SeriesStore index
+MetricSpec = namedtuple ('MetricSpec', ['log', 'section', 'column', 'row', 'combine', 'convert', 'units'])
+
+# The rows of mpstat -P ALL that are one core, not the 'all' row
+CORE_ROWS = re.compile (r'^\d+$')
+
+# The rows of sar -n DEV that carry the machine's traffic once: those of the
+# physical interfaces, by name. The loopback and the virtual devices are left
+# out, since their traffic also goes through a physical one: bond and team
+# masters (their slaves are counted), bridges (virbr0, and its virbr0-nic),
+# the veth, tap and vnet ends of containers and virtual machines, tunnels,
+# and VLANs (eth0.10 or eth0@10, counted with eth0)
+NET_INTERFACES = re.compile (r'^(?!(lo|bond\d|team\d|br|virbr|veth|docker|vnet|tap|tun|vxlan|flannel|cni|cali|weave|dummy|ifb|gre|ipip|tunl|ip6?tnl|sit|wg)'
+                             r'|\S*[.@])\S+$')
+
+# The row columns whose rows are told apart by name rather than by their
+# place in the block: an interface may come and go, a core keeps its row
+LABELLED_ROWS = ('IFACE',)
+
+def is_labelled (spec):
+    # whether the samples of a metric keep the name of their row
+    return spec.combine is None and spec.row is not None and spec.row[0] in LABELLED_ROWS
+
+def blocks_to_mb (value):
+    #1,048,576 bytes per megabyte, 512 bytes per data block
+    #1,048,576 / 512 = 2,048
+    #so divide each data block by 2048 to get size in MB
+    return round (float (value) / 2048, 2)
+
+def kb_to_mb (value):
+    return round (float (value) / 1024, 2)
+
+def kb_to_gb (value):
+    return round (int (float (value)) / 1048576, 2)
+
+def bytes_to_mb (value):
+    return round (float (value) / 1048576, 2)
+
+def mb_to_gb (value):
+    return round (float (value) / 1024, 2)
+
+def idle_to_busy (value):
+    # mpstat's %idle -> the core's utilization
+    return round (100.0 - float (value), 2)
+
+def most_active_core (values, carry=0):
+    return max (values), carry
+
+def sum_rows (values, carry=0):
+    # The total of a block's rows: the cores of mpstat, the interfaces of sar -n DEV
+    return sum (values), carry
+
+def sum_devices (values, prev_value=0):
+    # Sums one iostat block over all the devices. A value above 1000000000 
+    # is a counter that wrapped, it is replaced by the previous device's value
+    total = 0
+    for value in values:
+        if value > 1000000000:
+            value = prev_value
+        total += value
+        prev_value = value
+    return total, prev_value
+
+METRIC_SPECS = OrderedDict([
+    ('iostat',     MetricSpec ('iostat', 'Device', 'await', None, sum_devices, lambda value: int (float (value)), 'ms')),
+    ('sar',        MetricSpec ('sar', '%user', '%user', ('CPU', 'all'), None, float, '%')),
+    ('iowait',     MetricSpec ('sar', '%user', '%iowait', ('CPU', 'all'), None, float, '%')),
+    ('sar_reads',  MetricSpec ('sar', 'bread/s', 'bread/s', None, None, blocks_to_mb, 'MB/s')),
+    ('sar_writes', MetricSpec ('sar', 'bread/s', 'bwrtn/s', None, None, blocks_to_mb, 'MB/s')),
+    ('active_mem', MetricSpec ('sar', 'kbmemfree', 'kbcommit', None, None, kb_to_gb, 'GB')),
+    ('workflow_cpu',    MetricSpec ('proctree', 'tree', '%cpu', None, None, float, '%')),
+    ('workflow_rss',    MetricSpec ('proctree', 'tree', 'rss_kb', None, None, kb_to_gb, 'GB')),
+    ('workflow_reads',  MetricSpec ('proctree', 'tree', 'read_bytes/s', None, None, bytes_to_mb, 'MB/s')),
+    ('workflow_writes', MetricSpec ('proctree', 'tree', 'write_bytes/s', None, None, bytes_to_mb, 'MB/s')),
+    ('workflow_faults', MetricSpec ('proctree', 'tree', 'majflt/s', None, None, float, '/s')),
+    ('mpstat_active_core', MetricSpec ('mpstat', '%idle', '%idle', ('CPU', CORE_ROWS), most_active_core, idle_to_busy, '%')),
+    ('mpstat_total_core',  MetricSpec ('mpstat', '%idle', '%idle', ('CPU', CORE_ROWS), sum_rows, idle_to_busy, '%')),
+    # a sample per core and interval, core after core, see CpuSpecificsColumn
+    ('mpstat',             MetricSpec ('mpstat', '%idle', '%idle', ('CPU', CORE_ROWS), None, idle_to_busy, '%')),
+    # free -m, its header named 'memory' for the row labels by collect_stats.ksh.
+    # Before procps-ng 3.3.10, free has buffers and cached columns instead of
+    # buff/cache and available, and its used counts them
+    ('free_used',      MetricSpec ('free', 'total', (('used', '-buffers', '-cached'), 'used'),
+                                   ('memory', 'Mem:'), None, mb_to_gb, 'GB')),
+    ('free_cache',     MetricSpec ('free', 'total', ('buff/cache', ('buffers', 'cached')),
+                                   ('memory', 'Mem:'), None, mb_to_gb, 'GB')),
+    ('free_available', MetricSpec ('free', 'total', ('available', ('free', 'buffers', 'cached')),
+                                   ('memory', 'Mem:'), None, mb_to_gb, 'GB')),
+    # summed over the physical interfaces, see NET_INTERFACES
+    ('net_rx',         MetricSpec ('sar', 'rxpck/s', 'rxkB/s', ('IFACE', NET_INTERFACES), sum_rows, kb_to_mb, 'MB/s')),
+    ('net_tx',         MetricSpec ('sar', 'rxpck/s', 'txkB/s', ('IFACE', NET_INTERFACES), sum_rows, kb_to_mb, 'MB/s')),
+    ('net_rx_packets', MetricSpec ('sar', 'rxpck/s', 'rxpck/s', ('IFACE', NET_INTERFACES), sum_rows, float, '/s')),
+    ('net_tx_packets', MetricSpec ('sar', 'rxpck/s', 'txpck/s', ('IFACE', NET_INTERFACES), sum_rows, float, '/s')),
+    ('tcp_retrans',    MetricSpec ('sar', 'atmptf/s', 'retrans/s', None, None, float, '/s')),
+    ('tcp_active',     MetricSpec ('sar', 'active/s', 'active/s', None, None, float, '/s')),
+    # the tcp sockets in use, a level, not a rate
+    ('tcp_connections', MetricSpec ('sar', 'totsck', 'tcpsck', None, None, int, 'sockets')),
+    # a sample per physical interface and interval, see NetworkInterfacesColumn
+    ('net_rx_iface',         MetricSpec ('sar', 'rxpck/s', 'rxkB/s', ('IFACE', NET_INTERFACES), None, kb_to_mb, 'MB/s')),
+    ('net_tx_iface',         MetricSpec ('sar', 'rxpck/s', 'txkB/s', ('IFACE', NET_INTERFACES), None, kb_to_mb, 'MB/s')),
+    ('net_rx_packets_iface', MetricSpec ('sar', 'rxpck/s', 'rxpck/s', ('IFACE', NET_INTERFACES), None, float, '/s')),
+    ('net_tx_packets_iface', MetricSpec ('sar', 'rxpck/s', 'txpck/s', ('IFACE', NET_INTERFACES), None, float, '/s')),
+])
+
+
+class TimeSeries (object):
+    """
+    PURPOSE: The samples of one metric for one stage. The timestamps and 
+        values are kept in numpy arrays, 16 bytes per sample, from the log
+        scan through the statistics to the csv file.
+
+    ATTRIBUTES:
+        metric: the metric name, e.g. 'iostat'
+        stage: the workflow step the samples belong to, None until known
+        times: int64 array of timestamps, in milliseconds since the epoch
+            (TICKS_PER_SECOND)
+        values: float64 array of the metric's values, int64 for metrics
+            that are whole numbers (e.g. iostat's await in ms)
+        description: what the values are, see ColumnOfStatistics.data_type()
+        time_title: the title of the time column in the csv file
+        value_title: the title of the value column in the csv file
+        labels: for a metric with a sample per named row (see is_labelled),
+            a LABEL_TYPE array of the row of each sample, e.g. 'eth0'; else None
+        columns: for values that are a matrix, the title of each of its
+            columns (e.g. the interfaces), None for a column per core
+    """
+    __slots__ = ('metric', 'stage', 'times', 'values', 'description', 
+                 'time_title', 'value_title', 'labels', 'columns')
+
+    def __init__ (self, metric, times, values, stage=None):
+        self.metric = metric
+        self.stage = stage
+        # No copies are made of int64/float64 arrays, e.g. a numpy.memmap
+        times = numpy.asarray (times)
+        if times.dtype.kind == 'M' or not len (times):
+            times = times.astype ('datetime64[ms]', copy=False).view (numpy.int64)
+        self.times = times.astype (numpy.int64, copy=False)
+        self.values = numpy.asarray (values)
+        if self.values.dtype.kind not in 'iu':
+            self.values = self.values.astype (numpy.float64, copy=False)
+        self.description = ''
+        self.time_title = ''
+        self.value_title = ''
+        self.labels = None
+        self.columns = None
+
+    def __len__ (self):
+        return len (self.times)
+
+    def datetime_at (self, index):
+        return numpy.datetime64 (int (self.times[index]), 'ms').tolist ()
+
+    def time_unit (self):
+        # 's' when every timestamp is on a whole second, as in the sar and
+        # iostat logs, else 'ms'
+        return 'ms' if (self.times % TICKS_PER_SECOND).any () else 's'
+
+    def time_strings (self, start=0, stop=None, unit=None):
+        """
+        PURPOSE: Formats a range of the timestamps at once
+        
+        INPUTS: 
+            start, stop: the range of samples
+            unit: 's' or 'ms', see time_unit(); by default that of the range
+        
+        OUTPUTS: Returns an array of 'YYYY-MM-DD hh:mm:ss' strings, 
+            'YYYY-MM-DD hh:mm:ss.sss' in ms
+        
+        CALLEES: TimeSeries.rows()
+        """
+        times = self.times[start:stop]
+        if unit is None:
+            unit = 'ms' if (times % TICKS_PER_SECOND).any () else 's'
+        stamps = numpy.datetime_as_string (times.astype ('datetime64[ms]').astype ('datetime64[{0}]'.format (unit)))
+        return numpy.char.replace (stamps, 'T', ' ').astype (str)
+
+    def rows (self):
+        """
+        PURPOSE: The series as csv cells, one [time, value] list per sample.
+            The cells are made SPOOL_CHUNK_SIZE samples at a time.
+        
+        INPUTS: None
+        
+        OUTPUTS: Returns an iterator of [time, value]
+        
+        CALLEES: InputOutput.store_series_into_csv()
+        """
+        unit = self.time_unit ()
+        for start in xrange (0, len (self), SPOOL_CHUNK_SIZE):
+            stop = start + SPOOL_CHUNK_SIZE
+            for stamp, value in izip (self.time_strings (start, stop, unit), self.values[start:stop].tolist ()):
+                yield [stamp, value]
+
+    def chunks (self):
+        """
+        PURPOSE: Walks the values SPOOL_CHUNK_SIZE samples at a time
+        
+        INPUTS: None
+        
+        OUTPUTS: Returns an iterator of float64 arrays
+        
+        CALLEES: series_stats(), streaming_median()
+        """
+        for start in xrange (0, len (self), SPOOL_CHUNK_SIZE):
+            yield self.values[start:start + SPOOL_CHUNK_SIZE].astype (numpy.float64)
+
+
+class SampleSpool ():
+    """
+    PURPOSE: Collects the samples of one metric chunk by chunk in two binary
+        files, one for the timestamps and one for the values, so that a
+        long log never has to be held in memory. The finished series is a
+        numpy.memmap of the files. The samples of a labelled metric have a
+        third file, the name of each sample's row (LABEL_TYPE).
+
+        Without a spool directory the chunks are kept in memory.
+
+    ATTRIBUTES:
+        spool_dir: the folder of the files, or None
+        name: the base name of the files
+        count: the number of samples so far
+        value_type: numpy type of the values, set by the first chunk
+        last_time: the timestamp of the last sample, as datetime64[ms]
+        labelled: whether the samples have labels, see is_labelled()
+    """
+    def __init__ (self, spool_dir, name, labelled=False):
+        self.spool_dir = spool_dir
+        self.name = name
+        self.labelled = labelled
+        self.count = 0
+        self.value_type = None
+        self.last_time = None
+        self.chunks = []
+
+    def append (self, times, values, labels=None):
+        """
+        PURPOSE: Adds a chunk of samples
+        
+        INPUTS: 
+            times: datetime64 array, of any unit down to ms
+            values: the values, one per timestamp
+            labels: the row names, one per timestamp, for a labelled spool
+        
+        OUTPUTS: None
+        
+        CALLEES: LogScanner.spool(), LogScanner.read_sections()
+        """
+        if not len (times):
+            return
+        values = numpy.asarray (values)
+        if self.value_type is None:
+            self.value_type = numpy.int64 if values.dtype.kind in 'iu' else numpy.float64
+        times = numpy.asarray (times).astype ('datetime64[ms]')
+        values = values.astype (self.value_type)
+        parts = [('.times', times.view (numpy.int64)), ('.values', values)]
+        if self.labelled:
+            parts.append (('.labels', numpy.asarray (labels, dtype=LABEL_TYPE)))
+        self.count += len (times)
+        self.last_time = times[-1]
+
+        if self.spool_dir is None:
+            self.chunks.append ([chunk for _, chunk in parts])
+            return
+        for suffix, chunk in parts:
+            with open (os.path.join (self.spool_dir, self.name + suffix), 'ab') as spool_file:
+                chunk.tofile (spool_file)
+
+    def resume (self, value_type, count):
+        """
+        PURPOSE: Carries on with the spool files left by an earlier scan
+        
+        INPUTS: 
+            value_type: the name of the values' numpy type, None when no
+                sample was spooled
+            count: the number of samples in the files. Samples past it were
+                spooled by a scan that did not finish, they are dropped.
+        
+        OUTPUTS: None
+        
+        CALLEES: LogScanner.start()
+        """
+        if value_type is None or not count:
+            return
+        self.value_type = numpy.dtype (value_type).type
+        self.count = count
+        sizes = [('.times', 8), ('.values', 8)]
+        if self.labelled:
+            sizes.append (('.labels', numpy.dtype (LABEL_TYPE).itemsize))
+        for suffix, size in sizes:
+            with open (os.path.join (self.spool_dir, self.name + suffix), 'r+b') as spool_file:
+                spool_file.truncate (count * size)
+        times = numpy.memmap (os.path.join (self.spool_dir, self.name + '.times'), dtype=numpy.int64, mode='r')
+        self.last_time = numpy.datetime64 (int (times[-1]), 'ms')
+
+    def series (self, metric, keep=False):
+        """
+        PURPOSE: Returns all the samples
+        
+        INPUTS: 
+            metric: the metric name
+            keep: keep the spool files, for samples that will be added to
+                them later; by default they are removed
+        
+        OUTPUTS: Returns a TimeSeries, backed by the spool files
+        
+        CALLEES: LogScanner.finish(), LiveTail.follow()
+        """
+        if not self.count:
+            series = TimeSeries (metric, [], [])
+            if self.labelled:
+                series.labels = numpy.array ([], dtype=LABEL_TYPE)
+            return series
+        if self.spool_dir is None:
+            parts = [numpy.concatenate (chunks) for chunks in zip (*self.chunks)]
+            series = TimeSeries (metric, parts[0], parts[1])
+            if self.labelled:
+                series.labels = parts[2]
+            return series
+
+        paths = [os.path.join (self.spool_dir, self.name + suffix) for suffix in ('.times', '.values', '.labels')]
+        series = TimeSeries (metric, numpy.memmap (paths[0], dtype=numpy.int64, mode='r'),
+                             numpy.memmap (paths[1], dtype=self.value_type, mode='r'))
+        if self.labelled:
+            series.labels = numpy.memmap (paths[2], dtype=LABEL_TYPE, mode='r')
+        else:
+            paths.pop ()
+        if not keep:
+            # The mapping stays valid once the files are unlinked, and the disk
+            # space is given back when the series is no longer used
+            for path in paths:
+                os.remove (path)
+        return series
+
+
+class ParseCache ():
+    """
+    PURPOSE: Keeps the samples scanned from each log file on disk, so that
+        running the parser again on the same run (e.g. with another window
+        or tag) only redoes the output.
+
+        An entry is a folder named after a hash of the log file's path, 
+        size and modification time, the sar reader and PARSER_VERSION; a 
+        log that changes gets a new entry. The entry holds two .npy files
+        per metric, the times and the values, which are memory mapped when
+        they are loaded. When the cache grows past its size limit, the 
+        entries used least recently are removed. A labelled metric (see
+        is_labelled()) has a third file, the row names.
+
+    ATTRIBUTES:
+        cache_dir: the folder of the entries
+        max_bytes: the size limit
+    """
+    def __init__ (self, logger, cache_dir, max_bytes):
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.isdir (cache_dir):
+            os.makedirs (cache_dir)
+        # the limit may be lower than on the last run
+        self.evict ()
+
+    def entry_dir (self, target_file, reader):
+        status = os.stat (target_file)
+        key = '\0'.join ([PARSER_VERSION, os.path.realpath (target_file), 
+                          str (status.st_size), repr (status.st_mtime), reader])
+        return os.path.join (self.cache_dir, hashlib.sha1 (key).hexdigest ())
+
+    def load (self, target_file, metrics, reader):
+        """
+        PURPOSE: Looks up the samples of a log file
+        
+        INPUTS: 
+            target_file: the log file
+            metrics: the metrics that are needed
+            reader: one of SAR_READERS
+        
+        OUTPUTS: Returns metric -> TimeSeries, or None unless all the 
+            metrics are in the cache
+        
+        CALLEES: InputOutput.get_metric_samples()
+        """
+        entry = self.entry_dir (target_file, reader)
+        samples = OrderedDict ()
+        try:
+            for metric in metrics:
+                times, values = [load_array (os.path.join (entry, metric + part))
+                                  for part in ('.times.npy', '.values.npy')]
+                samples[metric] = TimeSeries (metric, times, values)
+                if is_labelled (METRIC_SPECS[metric]):
+                    samples[metric].labels = load_array (os.path.join (entry, metric + '.labels.npy'))
+            # the entry was used: it moves to the back of the eviction queue
+            os.utime (entry, None)
+        except (IOError, OSError):
+            return None
+        self.logger.info("Using the cached samples of:\n{0}".format(target_file))
+        return samples
+
+    def store (self, target_file, reader, samples):
+        """
+        PURPOSE: Adds the samples of a log file, then evicts entries if the
+            cache is too big
+        
+        INPUTS: 
+            target_file: the log file
+            reader: one of SAR_READERS
+            samples: metric -> TimeSeries
+        
+        OUTPUTS: None
+        
+        ALGORITHM: Each file is written under a temporary name and renamed,
+            so that a parser running at the same time never loads half a
+            file
+        
+        CALLEES: InputOutput.get_metric_samples()
+        """
+        entry = self.entry_dir (target_file, reader)
+        try:
+            os.makedirs (entry)
+        except OSError as exception:
+            if exception.errno != errno.EEXIST:
+                raise
+        for metric, series in samples.iteritems ():
+            parts = [('.times.npy', series.times), ('.values.npy', series.values)]
+            if series.labels is not None:
+                parts.append (('.labels.npy', series.labels))
+            for part, array in parts:
+                handle, temp_name = mkstemp (dir=entry)
+                with os.fdopen (handle, 'wb') as temp_file:
+                    numpy.save (temp_file, array)
+                os.rename (temp_name, os.path.join (entry, metric + part))
+        self.evict ()
+
+    def evict (self):
+        """
+        PURPOSE: Removes the least recently used entries until the cache is
+            no bigger than max_bytes
+        
+        INPUTS: None
+        
+        OUTPUTS: None
+        
+        CALLEES: ParseCache.__init__(), ParseCache.store()
+        """
+        entries = []
+        for name in os.listdir (self.cache_dir):
+            entry = os.path.join (self.cache_dir, name)
+            try:
+                size = sum (os.path.getsize (os.path.join (entry, part)) for part in os.listdir (entry))
+                entries.append ((os.path.getmtime (entry), size, entry))
+            except OSError:
+                continue  # removed by another parser
+        total = sum (size for _, size, _ in entries)
+        for _, size, entry in sorted (entries):
+            if total <= self.max_bytes:
+                break
+            self.logger.info("Evicting parse cache entry {0}".format(entry))
+            rmtree (entry, ignore_errors=True)
+            total -= size
+
+
+def load_array (path):
+    """
+    PURPOSE: Memory maps a .npy file
+    
+    INPUTS: path: the file
+    
+    OUTPUTS: Returns the array, read only
+    
+    CALLEES: ParseCache.load(), SeriesStore.load()
+    """
+    try:
+        return numpy.load (path, mmap_mode='r')
+    except ValueError:
+        # an empty array cannot be mapped
+        return numpy.load (path)
+
+
+class SeriesStore ():
+    """
+    PURPOSE: A binary copy of the series in the csv files of a run, for
+        tools that analyse them further without parsing the csv text.
+        Each series is two .npy files, so one metric, or one stage of it,
+        can be memory mapped without reading the rest:
+
+            series/index.json               metrics, stages, units, time ranges
+            series/<metric>/index.json      the part of the index of one metric
+            series/<metric>/<NN>.times.npy  datetime64[ms], the NN'th stage
+            series/<metric>/<NN>.values.npy int64 or float64, as in the csv
+
+        The values of a matrix metric (see MATRIX_METRICS) have a row per
+        sample; the titles of its columns, when they are not the cores,
+        are the stage's 'columns' in the index.
+
+        Usage example:
+            store = SeriesStore (os.path.join (output_dir, SERIES_STORE_DIR))
+            for series in store.load ('iostat'):
+                print series.stage, series.values.max ()
+        or, without this module, numpy.load (path, mmap_mode='r') of the
+        files listed in index.json.
+
+    ATTRIBUTES:
+        store_dir: the folder of the store
+    """
+    INDEX_FILE = 'index.json'
+
+    def __init__ (self, store_dir):
+        self.store_dir = store_dir
+        # Made here, before the metric families share it
+        if not os.path.isdir (store_dir):
+            os.makedirs (store_dir)
+
+    def write_metric (self, metric, series_list):
+        """
+        PURPOSE: Writes the series of one metric and its part of the index,
+            replacing those of an earlier run in the same folder
+        
+        INPUTS: 
+            metric: the metric name
+            series_list: the TimeSeries of the metric, one per stage
+        
+        OUTPUTS: None
+        
+        CALLEES: SetOfColumns.make_csvs_for_metrics()
+        """
+        metric_dir = os.path.join (self.store_dir, metric)
+        rmtree (metric_dir, ignore_errors=True)
+        os.makedirs (metric_dir)
+        stages = []
+        for number, series in enumerate (series_list):
+            name = '{0:02d}'.format (number)
+            stage = OrderedDict ([('stage', series.stage), ('count', len (series)),
+                                  ('start', None), ('end', None),
+                                  ('times', metric + '/' + name + '.times.npy'),
+                                  ('values', metric + '/' + name + '.values.npy'),
+                                  ('dtype', series.values.dtype.name)])
+            if series.columns is not None:
+                stage['columns'] = list (series.columns)
+            if len (series):
+                unit = series.time_unit ()
+                stage['start'] = series.time_strings (0, 1, unit)[0]
+                stage['end'] = series.time_strings (-1, None, unit)[0]
+            numpy.save (os.path.join (self.store_dir, stage['times']), series.times.view ('datetime64[ms]'))
+            numpy.save (os.path.join (self.store_dir, stage['values']), series.values)
+            stages.append (stage)
+
+        spec = METRIC_SPECS.get (metric)
+        first = series_list[0] if series_list else TimeSeries (metric, [], [])
+        index = OrderedDict ([('metric', metric), ('units', spec.units if spec else ''),
+                              ('description', first.description), ('time_title', first.time_title),
+                              ('value_title', first.value_title), ('stages', stages)])
+        self._write_json (os.path.join (metric_dir, self.INDEX_FILE), index)
+
+    def write_index (self, metrics, root, window):
+        """
+        PURPOSE: Writes index.json from the parts written by write_metric()
+        
+        INPUTS: 
+            metrics: the metric names, in order
+            root: the input dir as given by user
+            window: sliding average window as specified with --window
+        
+        OUTPUTS: None
+        
+        CALLEES: UserInput.post_process()
+        """
+        index = OrderedDict ([('format', SERIES_STORE_FORMAT), ('parser_version', PARSER_VERSION),
+                              ('root', os.path.abspath (root)), ('window', window),
+                              ('stages', []), ('metrics', OrderedDict ())])
+        for metric in metrics:
+            part = os.path.join (self.store_dir, metric, self.INDEX_FILE)
+            if not os.path.isfile (part):
+                continue
+            with open (part, 'r') as part_file:
+                index['metrics'][metric] = json.load (part_file, object_pairs_hook=OrderedDict)
+            for stage in index['metrics'][metric]['stages']:
+                if stage['stage'] not in index['stages']:
+                    index['stages'].append (stage['stage'])
+        self._write_json (os.path.join (self.store_dir, self.INDEX_FILE), index)
+
+    def index (self):
+        """
+        PURPOSE: Reads index.json
+        
+        INPUTS: None
+        
+        OUTPUTS: Returns the index, see write_index()
+        """
+        with open (os.path.join (self.store_dir, self.INDEX_FILE), 'r') as index_file:
+            return json.load (index_file, object_pairs_hook=OrderedDict)
+
+    def load (self, metric, stage=None):
+        """
+        PURPOSE: Memory maps the series of one metric; no other metric's
+            files are opened
+        
+        INPUTS: 
+            metric: the metric name
+            stage: the name of one stage, or None for all of them
+        
+        OUTPUTS: Returns a list of TimeSeries, with the titles of the csv
+            file. Raises KeyError for a metric or stage that is not stored.
+        """
+        index = self.index ()
+        entry = index['metrics'][metric]
+        stages = [part for part in entry['stages'] if stage is None or part['stage'] == stage]
+        if not stages:
+            raise KeyError (stage)
+        series_list = []
+        for part in stages:
+            series = TimeSeries (metric, load_array (os.path.join (self.store_dir, part['times'])),
+                                 load_array (os.path.join (self.store_dir, part['values'])), part['stage'])
+            series.description = entry['description']
+            series.time_title = entry['time_title']
+            series.value_title = entry['value_title']
+            series.columns = part.get ('columns')
+            series_list.append (series)
+        return series_list
+
+    def _write_json (self, path, data):
+        # Written under a temporary name and renamed, so a reader never
+        # sees half an index
+        handle, temp_name = mkstemp (dir=os.path.dirname (path))
+        with os.fdopen (handle, 'w') as temp_file:
+            json.dump (data, temp_file, indent=2)
+        os.rename (temp_name, path)
+
+
+class LiveTail ():
+    """
+    PURPOSE: Follows the logs of a workflow that is still running, for the
+        live mode (--live). Each time a log is followed, only what was 
+        added to it since the last time is scanned; the samples are added
+        to spool files that are kept from one refresh to the next.
+
+        A text log (iostat) is read from the byte offset where the last 
+        refresh stopped, up to its last complete line. A sar file is read
+        natively from its last record (see SarBinaryReader.resume_point());
+        one that can only be decoded with the sar command is scanned in 
+        full by each refresh, see InputOutput.get_metric_samples(). A procfs
+        stream is read from its last record too.
+
+        Each log has an entry: a folder named after a hash of its path and
+        metrics, with the spool files and state.json, which holds the 
+        offsets and the state of the LogScanner (see LogScanner.save()). The state is
+        written under a temporary name and renamed, after the samples, so
+        a refresh that is stopped part way is redone by the next one.
+
+    ATTRIBUTES:
+        tail_dir: the folder of the entries
+        stamp: the time the live mode started; the csv files are named 
+            after it so each refresh rewrites the same files
+        final: True for the last refresh, once the workflow is done: the 
+            block being read at the end of a text log is then taken as 
+            complete
+    """
+    STATE_FILE = 'state.json'
+
+    def __init__ (self, logger, tail_dir):
+        self.logger = logger
+        self.tail_dir = tail_dir
+        self.stamp = time.strftime("%Y-%m-%d_%H.%M.%S")
+        self.final = False
+        if not os.path.isdir (tail_dir):
+            os.makedirs (tail_dir)
+
+    def entry_dir (self, target_file, metrics):
+        # A procfs stream is followed by each metric family, one entry each
+        key = os.path.realpath (target_file) + '\0' + ','.join (metrics)
+        return os.path.join (self.tail_dir, hashlib.sha1 (key).hexdigest ())
+
+    def csv_name (self, metric):
+        return self.stamp + '_' + metric + '.csv'
+
+    def follow (self, target_file, metrics, reader):
+        """
+        PURPOSE: Scans what was added to a log since the last refresh
+        
+        INPUTS: 
+            target_file: the log file
+            metrics: the metrics read from it
+            reader: one of SAR_READERS
+        
+        OUTPUTS: Returns metric -> TimeSeries, all the samples so far, or
+            None for a sar file that has to be decoded by the sar command
+        
+        CALLEES: InputOutput.get_metric_samples()
+        """
+        specs = OrderedDict ((metric, METRIC_SPECS[metric]) for metric in metrics)
+        is_procfs = ProcfsReader.can_read (target_file)
+        is_sar = all (spec.log == 'sar' for spec in specs.itervalues ())
+        if is_sar and not is_procfs and (reader == 'sar' or not SarBinaryReader.can_read (target_file)):
+            return None
+
+        entry = self.entry_dir (target_file, metrics)
+        state = self.load_state (entry, target_file, metrics)
+        scanner = LogScanner (self.logger, specs, entry)
+        scanner.start (state['scanner'])
+        if is_procfs:
+            with ProcfsReader (target_file, state['resume']) as procfs_reader:
+                scanner.read_sections (procfs_reader)
+                state['resume'] = procfs_reader.resume_point () or state['resume']
+        elif is_sar:
+            with SarBinaryReader (target_file, state['resume']) as sar_reader:
+                scanner.read_sections (sar_reader)
+                state['resume'] = sar_reader.resume_point () or state['resume']
+        else:
+            with open (target_file, 'r') as log_file:
+                log_file.seek (state['offset'])
+                scanner.feed (self.complete_lines (log_file, state))
+            if self.final:
+                scanner.end_block ()
+        state['size'] = os.path.getsize (target_file)
+        state['scanner'] = scanner.save ()
+        self.save_state (entry, state)
+
+        samples = OrderedDict ()
+        for metric in specs:
+            samples[metric] = scanner.spools[metric].series (metric, keep=True)
+        return samples
+
+    def complete_lines (self, log_file, state):
+        # A line that is still being written is left for the next refresh
+        for line in iter (log_file.readline, ''):
+            if not line.endswith ('\n'):
+                break
+            state['offset'] += len (line)
+            yield line
+
+    def load_state (self, entry, target_file, metrics):
+        """
+        PURPOSE: Reads the state of a log's entry. A log that is new, that
+            is now read for other metrics, or that got smaller (it was 
+            written again from the start) gets an empty entry.
+        
+        INPUTS: 
+            entry: the entry's folder
+            target_file: the log file
+            metrics: the metrics read from it
+        
+        OUTPUTS: Returns the state
+        
+        CALLEES: LiveTail.follow()
+        """
+        try:
+            with open (os.path.join (entry, self.STATE_FILE), 'r') as state_file:
+                state = json.load (state_file)
+            if state['metrics'] == metrics and state['size'] <= os.path.getsize (target_file):
+                return state
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+        rmtree (entry, ignore_errors=True)
+        os.makedirs (entry)
+        return {'file': os.path.realpath (target_file), 'metrics': metrics, 'size': 0,
+                'offset': 0, 'resume': None, 'scanner': None}
+
+    def save_state (self, entry, state):
+        handle, temp_name = mkstemp (dir=entry)
+        with os.fdopen (handle, 'w') as temp_file:
+            json.dump (state, temp_file)
+        os.rename (temp_name, os.path.join (entry, self.STATE_FILE))
+
+
+def series_stats (series):
+    """
+    PURPOSE: The statistics the parser reports for the column of a step
+    
+    INPUTS: series: a TimeSeries
+    
+    OUTPUTS: Returns (mean, median, stdev, max), None for an empty series
+    
+    CALLEES: SetOfColumns.compute_stats(), post_process_run()
+    """
+    count = len (series)
+    if not count:
+        return None
+    if series.values.ndim > 1 and series.metric in INTERFACE_METRICS:
+        # The time x interfaces matrix of NetworkInterfacesColumn: the
+        # statistics of the traffic of all the interfaces, as net_rx's
+        series = TimeSeries (series.metric, series.times, series.values.sum (axis=1), series.stage)
+    elif series.values.ndim > 1:
+        # The cores x time matrix of CpuSpecificsColumn: the statistics of
+        # the load averaged over the cores
+        series = TimeSeries (series.metric, series.times, series.values.mean (axis=1), series.stage)
+    # Two passes over the chunks, so the series is never copied whole
+    meanval = sum (numpy.sum (chunk) for chunk in series.chunks ()) / count
+    stdev = numpy.sqrt (sum (numpy.sum ((chunk - meanval) ** 2) for chunk in series.chunks ()) / count)
+    medianval = streaming_median (series)
+    maxval = max (chunk.max () for chunk in series.chunks ())
+    return meanval, medianval, stdev, maxval
+
+
+def streaming_median (series):
+    """
+    PURPOSE: The exact median of a TimeSeries' values, reading them 
+        SPOOL_CHUNK_SIZE at a time so the series never has to be copied
+    
+    INPUTS: series: a TimeSeries with at least one sample
+    
+    OUTPUTS: Returns the median, as numpy.median would
+    
+    ALGORITHM: The range that holds the middle value is narrowed with a 
+        histogram over the chunks until few enough values are left in it
+        to be sorted
+    
+    CALLEES: series_stats()
+    """
+    bin_count = 256
+
+    def select (rank):
+        # the value that would be at position rank if the values were sorted
+        low = min (chunk.min () for chunk in series.chunks ())
+        high = max (chunk.max () for chunk in series.chunks ())
+        below = 0  # how many values are smaller than low
+        while low != high:
+            inside = [chunk[(chunk >= low) & (chunk <= high)] for chunk in series.chunks ()]
+            if sum (len (chunk) for chunk in inside) <= SPOOL_CHUNK_SIZE:
+                return numpy.sort (numpy.concatenate (inside))[rank - below]
+            del inside
+
+            edges = numpy.linspace (low, high, bin_count + 1)
+            counts = numpy.zeros (bin_count, dtype=numpy.int64)
+            for chunk in series.chunks ():
+                chunk = chunk[(chunk >= low) & (chunk <= high)]
+                bins = numpy.clip (numpy.searchsorted (edges, chunk, side='right') - 1, 0, bin_count - 1)
+                counts += numpy.bincount (bins, minlength=bin_count)
+            cumulative = below + numpy.cumsum (counts)
+            index = numpy.searchsorted (cumulative, rank, side='right')
+            if edges[index] == low and edges[index + 1] == high:
+                # low and high are neighbouring floats, the bin only holds low
+                return low
+            if index > 0:
+                below = cumulative[index - 1]
+            low, high = edges[index], edges[index + 1]
+        return low
+
+    count = len (series)
+    if count % 2:
+        return select (count // 2)
+    return (select (count // 2 - 1) + select (count // 2)) / 2
+
+
+class LogScanner ():
+    """
+    PURPOSE: Extracts every metric described by a set of MetricSpecs from the
+        text output of sar, iostat or mpstat in a single pass over its lines.
+
+        Sections are found by their header lines: a header is a line whose
+        columns hold no numbers. The metric's column is looked up by name in
+        the header, so the position of a column may change between sysstat
+        versions. The rows that follow a header are read until a blank line
+        or the next header.
+
+        The samples are decoded and handed to a SampleSpool every 
+        SPOOL_CHUNK_SIZE samples, so only one chunk of text timestamps is
+        held in memory per metric.
+
+        A scan can stop part way through a log and carry on later, in 
+        another run of the parser, with the date, the header, the block
+        being read and the spool files of where it stopped: see save() and
+        start(). This is how the live mode follows a growing log, see 
+        LiveTail.
+
+    ATTRIBUTES:
+        specs: metric -> MetricSpec
+        spool_dir: the folder for the SampleSpool files, None to keep the
+            samples in memory
+    """
+    DATE_REGEX = re.compile (r'^(?:\d+/\d+/\d+|\d{4}-\d+-\d+)$')
+    CLOCK_REGEX = re.compile (r'^\d+:\d\d:\d\d$')
+    ISO_REGEX = re.compile (r'^(\d{4}-\d+-\d+)T(\d+:\d\d:\d\d)')
+    NUMBER_REGEX = re.compile (r'^[-+]?\d+(?:[.,]\d+)?$')
+
+    def __init__ (self, logger, specs, spool_dir=None):
+        self.logger = logger
+        self.specs = specs
+        self.spool_dir = spool_dir
+        # the metrics whose samples keep the name of their row
+        self.labelled = set (metric for metric, spec in specs.iteritems () if is_labelled (spec))
+
+    def scan (self, lines):
+        """
+        PURPOSE: Extracts the samples of all the metrics from the log text
+        
+        INPUTS: lines: an iterable over the lines of the log, e.g. an open
+            file or the stdout of sar
+        
+        OUTPUTS: Returns metric -> TimeSeries
+        
+        CALLEES: LogScanSession.scan()
+        """
+        self.start ()
+        self.feed (lines)
+        return self.finish ()
+
+    def start (self, state=None):
+        """
+        PURPOSE: Gets ready to scan a log from its beginning, or from where
+            an earlier scan of it stopped
+        
+        INPUTS: state: what save() returned when that scan stopped, or None
+        
+        OUTPUTS: None
+        
+        CALLEES: LogScanner.scan(), LogScanner.extract(), LiveTail.follow()
+        """
+        self.log_date = None
+        self.block_stamp = None  # the timestamp line of an iostat block
+        self.header = None  # the columns of the current section's header
+        self.active = []  # (metric, spec, column index, row index) for the current section
+        self.stamps = dict ((metric, []) for metric in self.specs)
+        self.values = dict ((metric, []) for metric in self.specs)
+        self.labels = dict ((metric, []) for metric in self.specs)
+        self.blocks = dict ((metric, []) for metric in self.specs)
+        self.carry = dict ((metric, 0) for metric in self.specs)
+        self.spools = dict ((metric, SampleSpool (self.spool_dir, metric, metric in self.labelled)) for metric in self.specs)
+        if state is None:
+            return
+
+        if state['log_date'] is not None:
+            self.log_date = numpy.datetime64 (state['log_date'], 'D')
+        if state['block_stamp'] is not None:
+            self.block_stamp = tuple (state['block_stamp'])
+        if state['header'] is not None:
+            self.header = state['header']
+            self.active = self.resolve_header (self.header)
+        for metric in self.specs:
+            self.stamps[metric] = [tuple (stamp) for stamp in state['stamps'][metric]]
+            self.blocks[metric] = state['blocks'][metric]
+            self.carry[metric] = state['carry'][metric]
+            self.spools[metric].resume (state['value_types'][metric], state['counts'][metric])
+
+    def feed (self, lines):
+        """
+        PURPOSE: Scans lines of the log. The samples of a block that has
+            not ended yet are kept until a later call, or end_block().
+        
+        INPUTS: lines: an iterable over the lines
+        
+        OUTPUTS: None
+        
+        CALLEES: LogScanner.scan(), LiveTail.follow()
+        """
+        for line in lines:
+            tokens = line.split ()
+            if not tokens:
+                self.end_block ()
+                continue
+            if tokens[0] == 'Average:':
+                continue
+
+            date, clock, am_pm, columns = self.split_stamp (tokens)
+            if self.log_date is None and clock is None:
+                # The banner: Linux 2.6.32 (host)   04/15/2014   _x86_64_
+                dates = [token for token in tokens if self.DATE_REGEX.match (token)]
+                if dates:
+                    self.log_date = parse_log_date (dates[0])
+                    continue
+            if clock is not None and not columns:
+                # The timestamp line that starts an iostat block
+                self.end_block ()
+                self.block_stamp = (date, clock, am_pm)
+                continue
+            if 'RESTART' in columns:
+                continue
+
+            if not any (self.NUMBER_REGEX.match (column) for column in columns):
+                self.end_block ()
+                self.header = columns
+                self.active = self.resolve_header (columns)
+                continue
+
+            stamp = (date, clock, am_pm) if clock is not None else self.block_stamp
+            if stamp is None:
+                continue
+            for metric, spec, index, row_index in self.active:
+                try:
+                    if row_index is not None and columns[row_index] != spec.row[1]:
+                        expected = spec.row[1]
+                        if isinstance (expected, basestring) or not expected.match (columns[row_index]):
+                            continue
+                    if isinstance (index, tuple):
+                        value = spec.convert (sum (sign * float (columns[part]) for part, sign in index))
+                    else:
+                        value = spec.convert (columns[index])
+                except (IndexError, ValueError):
+                    continue
+                if spec.combine:
+                    if not self.blocks[metric]:
+                        self.stamps[metric].append (stamp)
+                    self.blocks[metric].append (value)
+                else:
+                    self.stamps[metric].append (stamp)
+                    self.values[metric].append (value)
+                    if metric in self.labelled:
+                        self.labels[metric].append (columns[row_index])
+                    if len (self.values[metric]) >= SPOOL_CHUNK_SIZE:
+                        self.spool (metric)
+
+    def end_block (self):
+        """
+        PURPOSE: Combines the rows of the block being read into one sample,
+            for the metrics that have a combine function
+        
+        INPUTS: None
+        
+        OUTPUTS: None
+        
+        CALLEES: LogScanner.feed(), LogScanner.finish(), LiveTail.follow()
+        """
+        for metric, spec, _, _ in self.active:
+            if self.blocks[metric]:
+                value, self.carry[metric] = spec.combine (self.blocks[metric], self.carry[metric])
+                self.values[metric].append (value)
+                self.blocks[metric] = []
+                if len (self.values[metric]) >= SPOOL_CHUNK_SIZE:
+                    self.spool (metric)
+
+    def spool (self, metric):
+        # A combined block's timestamp is kept until its value is known
+        count = len (self.values[metric])
+        dates, clocks, am_pm = zip (*self.stamps[metric][:count]) or ([], [], [])
+        times = decode_timestamps (self.log_date, dates, clocks, am_pm, self.spools[metric].last_time)
+        self.spools[metric].append (times, self.values[metric], self.labels[metric])
+        del self.stamps[metric][:count]
+        self.values[metric] = []
+        self.labels[metric] = []
+
+    def save (self):
+        """
+        PURPOSE: Spools the samples read so far and describes where the 
+            scan stopped, so that start() can carry on from there in 
+            another run of the parser
+        
+        INPUTS: None
+        
+        OUTPUTS: Returns the state, made of lists, strings and numbers so
+            that it can be stored as JSON
+        
+        CALLEES: LiveTail.follow()
+        """
+        for metric in self.specs:
+            self.spool (metric)
+        return {
+            'log_date': str (self.log_date) if self.log_date is not None else None,
+            'block_stamp': self.block_stamp,
+            'header': self.header,
+            'stamps': self.stamps,
+            'blocks': self.blocks,
+            'carry': self.carry,
+            'counts': dict ((metric, spool.count) for metric, spool in self.spools.iteritems ()),
+            'value_types': dict ((metric, spool.value_type and numpy.dtype (spool.value_type).name)
+                                 for metric, spool in self.spools.iteritems ()),
+        }
+
+    def finish (self):
+        """
+        PURPOSE: Ends the scan
+        
+        INPUTS: None
+        
+        OUTPUTS: Returns metric -> TimeSeries
+        
+        CALLEES: LogScanner.scan(), LogScanner.extract()
+        """
+        self.end_block ()
+        samples = OrderedDict ()
+        for metric in self.specs:
+            self.spool (metric)
+            samples[metric] = self.spools[metric].series (metric)
+        return samples
+
+    def extract (self, reader):
+        """
+        PURPOSE: Takes the samples of all the metrics from a sar file with
+            SarBinaryReader, or from a procfs stream with ProcfsReader
+        
+        INPUTS: reader: an open SarBinaryReader or ProcfsReader
+        
+        OUTPUTS: Returns metric -> TimeSeries
+        
+        CALLEES: LogScanSession.scan()
+        """
+        self.start ()
+        self.read_sections (reader)
+        return self.finish ()
+
+    def read_sections (self, reader):
+        """
+        PURPOSE: Spools the samples of all the metrics from a sar file,
+            SPOOL_CHUNK_SIZE records at a time
+        
+        INPUTS: reader: an open SarBinaryReader or ProcfsReader
+        
+        OUTPUTS: None
+        
+        CALLEES: LogScanner.extract(), LiveTail.follow()
+        """
+        flags = OrderedDict ()
+        for metric, spec in self.specs.iteritems ():
+            flags.setdefault (SAR_SECTION_FLAGS[spec.section], []).append (metric)
+
+        for flag, metrics in flags.iteritems ():
+            for section in reader.sections (flag, SPOOL_CHUNK_SIZE):
+                for metric in metrics:
+                    spec = self.specs[metric]
+                    labels = None
+                    if spec.row and spec.row[0] in section.rows and spec.combine is None:
+                        times, values, labels = self.label_rows (spec, section)
+                    elif spec.row and spec.row[0] in section.rows:
+                        times, values = self.combine_rows (metric, spec, section)
+                    else:
+                        times = section.times
+                        values = [spec.convert (value) for value in section.column (spec.column)]
+                    self.spools[metric].append (times, values, labels)
+
+    def combine_rows (self, metric, spec, section):
+        """
+        PURPOSE: Folds the rows of each sample of a section that prints
+            several (sar -n DEV) into one sample, as end_block() does for
+            a block of text
+        
+        INPUTS: 
+            metric: the metric name
+            spec: its MetricSpec, which has a row and a combine function
+            section: a SarSection with rows
+        
+        OUTPUTS: Returns (times, values). A sample none of whose rows
+            match the spec's row is left out, as in the text.
+        
+        CALLEES: LogScanner.read_sections()
+        """
+        expected = spec.row[1]
+        kept = []
+        values = []
+        for sample, (row_values, names) in enumerate (izip (section.column (spec.column), section.rows[spec.row[0]])):
+            block = [spec.convert (value) for value, name in izip (row_values, names)
+                     if name == expected or (not isinstance (expected, basestring) and expected.match (name))]
+            if block:
+                value, self.carry[metric] = spec.combine (block, self.carry[metric])
+                kept.append (sample)
+                values.append (value)
+        return section.times[kept], values
+
+    def label_rows (self, spec, section):
+        """
+        PURPOSE: Takes a sample per matching row of each sample of a 
+            section that prints several (sar -n DEV), as feed() does for
+            the rows of a block of text
+        
+        INPUTS: 
+            spec: a MetricSpec with a row and no combine function
+            section: a SarSection with rows
+        
+        OUTPUTS: Returns (times, values, labels): the rows of each sample 
+            in the order they are printed, and the name of each row
+        
+        CALLEES: LogScanner.read_sections()
+        """
+        expected = spec.row[1]
+        names = section.rows[spec.row[0]]
+        if isinstance (expected, basestring):
+            matches = names == expected
+        else:
+            matches = numpy.vectorize (lambda name: bool (expected.match (name)), otypes=[bool]) (names)
+        samples, rows = numpy.nonzero (matches)
+        values = [spec.convert (value) for value in section.column (spec.column)[samples, rows]]
+        return section.times[samples], values, names[samples, rows]
+
+    # Helpers -------
+    def split_stamp (self, tokens):
+        """
+        PURPOSE: Splits the timestamp off the front of a line, e.g.
+            '04/15/2014 10:28:29 PM sda 0.00 ...', '22:28:29 all 13.31 ...' or
+            '2014-04-15T22:28:29+0000 sda 0.00 ...'
+        
+        INPUTS: tokens: the words of the line
+        
+        OUTPUTS: Returns (date, clock, AM/PM, columns). date and AM/PM are ''
+            when missing, clock is None for a line without a timestamp
+        
+        CALLEES: LogScanner.scan()
+        """
+        date = ''
+        clock = None
+        am_pm = ''
+        position = 0
+        iso_stamp = self.ISO_REGEX.match (tokens[0])
+        if iso_stamp:
+            date, clock = iso_stamp.group (1, 2)
+            position = 1
+        else:
+            if self.DATE_REGEX.match (tokens[0]):
+                date = tokens[0]
+                position = 1
+            if position < len (tokens) and self.CLOCK_REGEX.match (tokens[position]):
+                clock = tokens[position]
+                position += 1
+                if position < len (tokens) and tokens[position] in ('AM', 'PM'):
+                    am_pm = tokens[position]
+                    position += 1
+        return date, clock, am_pm, tokens[position:]
+
+    def resolve_header (self, columns):
+        """
+        PURPOSE: Finds the metrics that are read from the section of a header
+            and the position of their columns
+        
+        INPUTS: columns: the header's column names
+        
+        OUTPUTS: Returns a list of (metric, spec, column index, row index).
+            The column index of a sum of columns is a tuple of (index, 1 or
+            -1), see MetricSpec.
+        
+        CALLEES: LogScanner.scan()
+        """
+        names = [column.rstrip (':') for column in columns]
+        active = []
+        for metric, spec in self.specs.iteritems ():
+            if spec.section not in names:
+                continue
+            index = self.column_index (names, spec.column)
+            if index is None:
+                self.logger.warning("No {0} column for {1} in header: {2}".format(spec.column, metric, ' '.join (columns)))
+                continue
+            row_index = None
+            if spec.row:
+                row_index = names.index (spec.row[0])
+            active.append ((metric, spec, index, row_index))
+        return active
+
+    def column_index (self, names, column):
+        # The index of a spec's column in a header, None when it has none
+        if not isinstance (column, tuple):
+            return names.index (column) if column in names else None
+        for alternative in column:
+            if not isinstance (alternative, tuple):
+                if alternative in names:
+                    return names.index (alternative)
+                continue
+            parts = [(part[1:], -1) if part.startswith ('-') else (part, 1) for part in alternative]
+            if all (part in names for part, _ in parts):
+                return tuple ((names.index (part), sign) for part, sign in parts)
+        return None
+
+
+def parse_log_date (token):
+    """
+    PURPOSE: Reads a date as printed by sysstat: MM/DD/YYYY, MM/DD/YY or 
+        YYYY-MM-DD
+    
+    INPUTS: token: the date text
+    
+    OUTPUTS: Returns a numpy datetime64 day
+    
+    CALLEES: LogScanner.scan(), decode_timestamps()
+    """
+    if '/' in token:
+        month, day, year = [int (num) for num in token.split ('/')]
+        if year < 100:
+            year += 2000
+    else:
+        year, month, day = [int (num) for num in token.split ('-')]
+    return numpy.datetime64 ('{0:04d}-{1:02d}-{2:02d}'.format (year, month, day), 'D')
+
+
+def decode_timestamps (log_date, dates, clocks, am_pm, previous=None):
+    """
+    PURPOSE: Turns the timestamps read from a log into a datetime64 array, 
+        all at once. 12 hour clocks are converted to 24 hours. Timestamps
+        without a date take the date of the last timestamp that had one, or
+        the log's date, moved on by a day each time the clock goes backwards
+        (past midnight).
+    
+    INPUTS: 
+        log_date: datetime64 day from the log's banner, or None
+        dates: the date text of each timestamp, '' when it has none
+        clocks: the time of day text of each timestamp, e.g. '10:28:29'
+        am_pm: 'AM', 'PM' or '' (24 hour clock) for each timestamp
+        previous: the datetime64 of the timestamp right before these ones,
+            when a log is decoded in chunks
+    
+    OUTPUTS: Returns a numpy datetime64[s] array
+    
+    CALLEES: LogScanner.scan(), ColumnOfStatistics.get_datetime_given_regex()
+    """
+    if previous is not None and len (clocks):
+        # Start from the previous chunk's last date and clock
+        previous = str (previous.astype ('datetime64[s]'))
+        times = decode_timestamps (log_date, [previous[:10]] + list (dates), 
+                                   [previous[11:19]] + list (clocks), [''] + list (am_pm))
+        return times[1:]
+
+    count = len (clocks)
+    if not count:
+        return numpy.array ([], dtype='datetime64[s]')
+
+    # 'h:mm:ss' -> 'hh:mm:ss', then read the digits straight from the bytes
+    clock_text = numpy.char.rjust (numpy.array (clocks, dtype='S8'), 8, '0')
+    digits = clock_text.view (numpy.uint8).reshape (count, 8).astype (numpy.int64) - ord ('0')
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    markers = numpy.array (am_pm, dtype='S2')
+    hours = numpy.where (markers == 'PM', hours % 12 + 12, 
+                         numpy.where (markers == 'AM', hours % 12, hours))
+    seconds = hours * 3600 + (digits[:, 3] * 10 + digits[:, 4]) * 60 + digits[:, 6] * 10 + digits[:, 7]
+
+    # Only a few distinct dates appear in a log, parse each one once
+    unique_dates, date_index = numpy.unique (numpy.array (dates, dtype='S10'), return_inverse=True)
+    no_date = numpy.iinfo (numpy.int64).min
+    unique_days = numpy.array ([parse_log_date (date).astype (numpy.int64) if date else no_date
+                                for date in unique_dates], dtype=numpy.int64)
+    days = unique_days[date_index]
+    has_date = days != no_date
+
+    # Count the steps back in time since the last dated timestamp
+    positions = numpy.arange (count)
+    back_steps = numpy.concatenate (([False], numpy.diff (seconds) < 0)) & ~has_date
+    rollovers = numpy.cumsum (back_steps)
+    last_dated = numpy.maximum.accumulate (numpy.where (has_date, positions, -1))
+    if log_date is None:
+        if not has_date[0]:
+            raise Exception("Can't find the date of the log's timestamps")
+        log_date = numpy.datetime64 ('1970-01-01', 'D')
+    start_day = numpy.where (last_dated >= 0, days[last_dated], log_date.astype (numpy.int64))
+    start_rollovers = numpy.where (last_dated >= 0, rollovers[last_dated], 0)
+    days = start_day + rollovers - start_rollovers
+
+    return (days * 86400 + seconds).astype ('datetime64[s]')
+
+
 #------------------------------
 # Parsing
 #------------------------------
@@ -1095,13 +3509,11 @@ class ColumnOfStatistics ():
  
         CURRENT VERSION: 0.1 
     """
-
     def __init__ (self, logger):
         self.logger = logger
         self.io = InputOutput(logger)
         self.column_type = None
         self.max_sampling_interval = 3600 # 1 hour
-
         
     def get_useful_metrics (self, log_data, core=0, times=[], date_holder=['skip']):
         """
@@ -1109,20 +3521,25 @@ class ColumnOfStatistics ():
                  log file
 
         INPUTS:
-            log_data: The raw log text for this metric
+            log_data: The raw log text for this metric, or its TimeSeries
+                for metrics described in METRIC_SPECS
             core: core # for multithreading stats (default: 0)
             times: a list used for multicore support, not used currently 
             date_holder: list used for multicore support, not used currently 
 
 
         OUTPUTS:
-            Returns a list of [timestamp, metric_value] pairs for this metric
+            Returns a TimeSeries for this metric
 
         EXCEPTIONS: none
 
         CALLEE(S): 
             ColumnOfStatistics.make_column_from_metrics()
         """
+        if isinstance (log_data, TimeSeries):
+            # Already extracted by a LogScanSession
+            return log_data
+
         if date_holder[0] is not 'skip':
             if date_holder[0] == 'go':
                 date_holder.pop ()
@@ -1131,8 +3548,9 @@ class ColumnOfStatistics ():
         else:
             time_list = self.get_datetime_from_log (log_data, core, times)
         data_list = self.get_data_from_log (log_data, core)
+        count = min (len (time_list), len (data_list))
 
-        return [list (pair) for pair in izip (time_list, data_list)]
+        return TimeSeries (None, time_list[:count], data_list[:count])
 
     # Makes one data column from log data (one step in workflow)
     def make_column_from_metrics (self, log_data, core=0, date_data=[], date_holder=[], window=None, average_time_holder=None):
@@ -1148,15 +3566,11 @@ class ColumnOfStatistics ():
                 window: sliding average window as specified with --window
                 average_time_holder
             OUTPUT:
-                A list of lists in format (value, timestamp) containing 
-                cleaned data suitable for saving in csv and for use in 
-                generating plots.  For example:
-                [['value in x interval', 'time in x interval'], 
-                    ['432432', '1-2-12 3:40 pm'],
-                    ['432432', '1-2-12 3:50 pm']]
+                A TimeSeries containing cleaned data suitable for saving 
+                in csv and for use in generating plots, with the titles
+                of its csv columns filled in.
             CALLEES:
         """ 
-        window = ARGS_NS.window 
         #-- check for special case
         if not log_data or len (log_data) is 0:
             # print "error, no data in 'make_column_from_metrics'"
@@ -1234,8 +3648,7 @@ class ColumnOfStatistics ():
               have missed a collection point.  
     
             INPUT:
-              data:  list of data 
-                e.g., [['4324', '1-12-2013 3:30pm'], ...]
+              data:  a TimeSeries
 
               window: integer, specifying the collection interval in seconds. 
                       default is 30 seconds
@@ -1244,31 +3657,28 @@ class ColumnOfStatistics ():
             CALLEES:
               make_sliding_average 
         """
-        average_time_deltas = []
-        average_time_delta = 0
-        time_end = prev_end = datetime (1, 1, 1, 1, 1, 1)
-        if not data:
+        if not len (data):
             print("warning, data is empty while finding time averages")
             return 0
-            
-        miss_counter = 0  # for catching bad windows
 
-        for line, i in izip (data, range(200)):
-            time_end = datetime(*line[0])
-            diff_since_last = time_end - prev_end
-            if diff_since_last.seconds < window and diff_since_last.seconds > 0:
-                average_time_deltas.append (diff_since_last.seconds)
-            else:
-                miss_counter += 1
-                if miss_counter == 10:
-                    window = self.max_sampling_interval
-            prev_end = time_end
+        # Only the first 200 samples are looked at. The first sample is
+        # measured from 0001-01-01 01:01:01, as timedelta.seconds (down to
+        # the ms of a procfs stream)
+        times = data.times[:200]
+        first_diff = data.datetime_at (0) - datetime (1, 1, 1, 1, 1, 1)
+        diffs = numpy.concatenate (([first_diff.seconds + first_diff.microseconds // 1000 / TICKS_PER_SECOND],
+                                    numpy.diff (times) % (86400 * TICKS_PER_SECOND) / TICKS_PER_SECOND))
+
+        # for catching bad windows: after 10 misses, the window grows to
+        # max_sampling_interval
+        in_window = (diffs < window) & (diffs > 0)
+        misses = numpy.cumsum (~in_window)
+        after_tenth_miss = numpy.concatenate (([False], misses[:-1] >= 10))
+        in_window = numpy.where (after_tenth_miss, (diffs < self.max_sampling_interval) & (diffs > 0), in_window)
 
-        if len(average_time_deltas) > 0:
-            prev_end = time_end
-
-        if len(average_time_deltas) > 0:
-            average_time_delta = sum (average_time_deltas) / float (len (average_time_deltas))
+        average_time_delta = 0
+        if in_window.any ():
+            average_time_delta = float (diffs[in_window].sum ()) / in_window.sum ()
         return average_time_delta
 
     # For make_sliding_average's error handling
@@ -1282,107 +3692,37 @@ class ColumnOfStatistics ():
                 simply remove the datapoint
                 and the associated timestamp.
             INPUT:
-                data = eg: [['4324', '1-12-2013 3:30pm'], ...]
+                data = a TimeSeries
                 line_number = 5 #where error is
                 average_time_delta = 30 #average timestamp difference
             OUTPUT:
+                the corrected time, as a datetime
             CALLEES:
         """
         corrected_datapoint = 0
         if line_number == 0:
-            if (datetime (*data[2][0]) - datetime (*data[1][0])).seconds > 3 * average_time_delta:
-                raise Exception("Vital datapoint error, cannot continue repair. Please search datafile for: %s" % data[line_number][0])
-            corrected_datapoint = datetime (*data[1][0]) - timedelta (seconds=average_time_delta)
+            if (data.datetime_at (2) - data.datetime_at (1)).seconds > 3 * average_time_delta:
+                raise Exception("Vital datapoint error, cannot continue repair. Please search datafile for: %s" % data.datetime_at (line_number))
+            corrected_datapoint = data.datetime_at (1) - timedelta (seconds=average_time_delta)
         else:
-            corrected_datapoint = datetime (*data[line_number - 1][0]) + timedelta (seconds=average_time_delta)
+            corrected_datapoint = data.datetime_at (line_number - 1) + timedelta (seconds=average_time_delta)
         return corrected_datapoint
 
     def make_sliding_average (self, data=[], window=60):
         """
             PURPOSE: 
-                This will take data in the form of [[data, time], ...] 
-                and perform a sliding average on it. This is so that
-                our graphed data is prettier. 
+                Returns the samples as they were logged. The window is 
+                only named in the title of the time column, see 
+                insert_headers(): the parser has never averaged the 
+                samples over it, and the bundled sample outputs are not.
             INPUT:
-                data = eg: [['4324', '1-12-2013 3:30pm'], ...]
+                data = a TimeSeries
+                window = the window in seconds, as specified with --window
             OUTPUT:
-                # with the sliding average performed
-                data = eg: [['4324', '1-12-2013 3:30pm'], ...]
+                data, unchanged
             CALLEES:
-               
-
-        """
-        if self._find_sliding_avg_error(data, window):
-            return self._convert_time_to_str(data)
-
-        average_time_delta = self.get_time_averages (data, window)
-        double_error = False
-        averaged_data = []
-        running_sum = 0
-        time_end = prev_end = 0.0
-        remainder_sum = 0.0
-        # First time_start should be one interval behind due to data being cumulative
-        prev_end = time_start = (datetime (*data[1][0]) - timedelta (seconds=average_time_delta)) - timedelta (seconds=average_time_delta)
-
-        for line_number, line in enumerate(data):
-            time_end = datetime (*line[0])
-            diff_since_last = time_end - prev_end
-
-            if diff_since_last < timedelta (seconds=0):
-                diff_since_last = (time_end + timedelta (hours=23)) - prev_end
-
-            if diff_since_last > timedelta (average_time_delta * 10) or diff_since_last < timedelta (seconds=0):
-                if (double_error):
-                    print time_end
-                    raise Exception("Fatal error")
-                print "Error bad time datapoint. Will attempt to repair based on average time"
-                print time_end
-                time_end = self.repair_time_datapoint (data, line_number, average_time_delta)
-                diff_since_last = time_end - prev_end
-                double_error = True
-            else:
-                double_error = False
-            diff = time_end - time_start
-            new_weighted_val = line[1] * (float (diff_since_last.seconds) / window)
-            running_sum += new_weighted_val
-            prev_end = time_end
-
-            if diff.seconds >= (window + 1):
-                diff_from_window = diff - timedelta (seconds=window)
-                remainder_sum = new_weighted_val * (float (diff_from_window.seconds) / (diff_since_last.seconds))
-                running_sum = running_sum - remainder_sum
-                time_end -= diff_from_window
-                time_end = time_end - (timedelta (microseconds=time_end.microsecond))
-
-                averaged_data.append ([str (time_end), round (running_sum, 1)])
-                # Set up for next iteration
-                running_sum = remainder_sum
-                time_start = time_end
-
-        return averaged_data
-
-    def _find_sliding_avg_error(self, data, window):
-        def error_msg():
-            print "Warning, not enough data to do make_sliding_average()"
-            return True
-
-        if not data:
-            return error_msg()
-
-        min_data_points = 3
-        time_start = datetime (*data[0][0])
-        time_end = datetime (*data[-1][0])
-        min_frame_size = time_end - time_start
-        
-        if len (data) < min_data_points or min_frame_size.seconds < window:
-            return error_msg()
-        return True
-
-    def _convert_time_to_str(self, data):
-        cleaned_time = []
-        for line in data:
-            cleaned_time.append([str(datetime(*line[0])), line[1]])
-        return cleaned_time
+        """
+        return data
 
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
@@ -1404,26 +3744,28 @@ class ColumnOfStatistics ():
                 columns in this data. 
             INPUT:
                 time_header = the starting time interval, pre-sliding average
-                data = [['data', 'time'], ...]
+                data = a TimeSeries
                 avg_interval = average time interval between data points
             OUTPUT:
-                data, but with the headers inserted
+                data, but with the headers filled in
             CALLEES:
         """
         if data is not None:
-            time_column = 'time in interval: ' + str (time_header) + 's'
-            data_column = 'average ' + self.data_type (core) + ' per ' + str (avg_interval) + 's'
-            data.insert (0, [time_column, data_column])
+            data.description = self.data_type (core)
+            data.time_title = 'time in interval: ' + str (time_header) + 's'
+            data.value_title = 'average ' + data.description + ' per ' + str (round (avg_interval, 3)) + 's'
         return data
 
-    def make_csv_from_data (self, data, type_of_metric):
+    def make_csv_from_data (self, data, type_of_metric, output_dir, output_file=None):
         """
-        PURPOSE: Wrapper around InputOutput.store_data_into_csv()
+        PURPOSE: Wrapper around InputOutput.store_series_into_csv()
             Writes the input data to a CSV file
         
         INPUTS:
-            data: the log data
+            data: the TimeSeries of the metric, one per step
             type_of_metric: eg: "iostat", see top of file REFERENCE: POSSIBLE_METRICS
+            output_dir: The folder the csv file will be created in
+            output_file: the name of the csv file, None for a new name
 
         There are two functions with same name in different classes
         CLASS: ColumnOfStatistics 
@@ -1432,8 +3774,9 @@ class ColumnOfStatistics ():
         
         CALLEES: SetOfColumns.make_csv_from_set()
         """
-        output_file = time.strftime("%Y-%m-%d_%H.%M.%S") + '_' + type_of_metric + '.csv'
-        self.io.store_data_into_csv (data, output_file)
+        if output_file is None:
+            output_file = self.io.reserve_output_file (output_dir, '_' + type_of_metric + '.csv')
+        self.io.store_series_into_csv (data, output_file, output_dir)
         return
 
     def get_datetime_given_regex (self, regex, current_date, data):
@@ -1445,36 +3788,23 @@ class ColumnOfStatistics ():
                 about PM - AM transitions.
             INPUT:
                 regex: the compiled regex used for finding timestamps
-                current_date: the first timestamp in the file? 
-                    TODO: why do we need this?
+                current_date: [Y, M, D] text of the log's date, the 
+                    timestamps only hold the time of day
                 data: the raw file data for the metric
             OUTPUT:
-                ['timestamp1', 'timestamp2', ...]
+                a datetime64 array, see decode_timestamps()
             CALLEES:
         """
-        date_data = []
-        previous_AM_PM = ''
-
+        clocks = []
+        am_pm = []
         for line in data:
             parsed_time = (re.search (regex, str (line)))
             if parsed_time is not None:
-                am_pm = str (parsed_time.group (4))
-                # Increase day if past midnight
-                if (am_pm == 'AM') and (previous_AM_PM == 'PM'):
-                    current_date = datetime.strptime ('-'.join (current_date), "%Y-%m-%d")
-                    current_date += timedelta (days=1)
-                    current_date = [date for date in current_date.strftime ("%Y %m %d").split (" ")]
-
-                standard_time = [int (num) for num in list (current_date) + list (parsed_time.group (1, 2, 3))]
-                if (am_pm == 'PM') and (standard_time[3] is not 12):
-                    standard_time[3] += 12
-                if (am_pm == 'AM') and (standard_time[3] is 12):
-                    standard_time[3] = 0
-
-                date_data.append (standard_time)
-                previous_AM_PM = am_pm
+                clocks.append (':'.join (parsed_time.group (1, 2, 3)))
+                am_pm.append (str (parsed_time.group (4)))
 
-        return date_data
+        log_date = parse_log_date ('/'.join ([current_date[1], current_date[2], current_date[0]]))
+        return decode_timestamps (log_date, [''] * len (clocks), clocks, am_pm)
 
 
 class SetOfColumns ():
@@ -1484,11 +3814,15 @@ class SetOfColumns ():
 
         For instance, this class makes all the columns for 1 step. 
     """
-    def __init__ (self, logger):
+    CORES_REGEX = re.compile (r'\((\d+) CPU\)')
+
+    def __init__ (self, logger, sar_reader='auto', metrics=None, jobs=1, output_dir=None, cache=None, tail=None, workflow=None, stamp=None):
         self.logger = logger
-        self.io = InputOutput(logger)
+        self.io = InputOutput(logger, sar_reader, metrics, output_dir, cache, tail, workflow, stamp)
         self.column_type = None
         self.average_time = [0]
+        # Number of worker processes that parse the steps of a metric
+        self.jobs = jobs
 
     def compute_stats (self, data, metric="", step=''):
         """
@@ -1498,20 +3832,14 @@ class SetOfColumns ():
             OUTPUT:
             CALLEES:
         """
-        values = []
-        for x in data[1:]:
-            values.append(float(x[1]))
-        if not values:
+        stats = series_stats (data)
+        if stats is None:
             return 
-        meanval = numpy.mean(values)
-        medianval = numpy.median(values)
-        maxval = max(values)
-        stdev = numpy.std(values)
+        meanval, medianval, stdev, maxval = stats
         self.logger.info("Metric\t %s \tStep\t %s \tMean\t %f \tMedian\t %f \tStdev\t %f \tMax\t %f" % (metric, step, round(meanval,2), round(medianval,2), round(stdev, 2), round(maxval,2)))
 
 
     #def make_columns_for_step (self, root_dir='dir-to-data', type_of_metric="iostat", core=0, steps=ORDERED_WORKFLOW_STEPS, time_data=[], time_holder=[], window=100):
-    ## Pass in the PL dict name
     def make_columns_for_step (self, root_dir='dir-to-data', type_of_metric="iostat", core=0, steps=[], time_data=[], time_holder=[], window=100):
         """
         PURPOSE: 
@@ -1532,55 +3860,111 @@ class SetOfColumns ():
             window: sampling interval as given by user with default interval or --interval option
         
         OUTPUTS:
-            Returns a list of datapoints ready to be written to a CSV file
-            Format: [data, time, data, time, ...], ...] 
+            Returns a list of TimeSeries, one per step, ready to be written 
+            to a CSV file
         CALLEES: 
             SetOfColumns.make_sets_for_cores()
             UserInput.post_process() via instance of SetOfColumns
         """
-        data = [[]]
+        data = []
         self.column_type = self.get_class_type (type_of_metric)
+        if self.jobs > 1 and type_of_metric in METRIC_SPECS:
+            return self.make_columns_in_parallel (root_dir, type_of_metric, core, steps, window)
         log_data = self.io.get_data_for_each_step (root_dir, type_of_metric)
 
         for raw, step, a_time in izip_longest (log_data, steps, time_data):
+            if self.io.tail and not raw:
+                # live mode: the workflow has not got to this step yet
+                continue
             temp_data = self.column_type.make_column_from_metrics (raw, core, a_time, time_holder, window, self.average_time)
-            # Compute stats
-            self.compute_stats (temp_data,type_of_metric,step)
             if temp_data is None:
                 print "No data in " + step
                 return data
-            temp_data.insert (0, [step])
-            data = self.append_column (data, temp_data)
-        data.insert (0, [type_of_metric.upper () + ': ' + self.column_type.data_type (core)])
+            temp_data.metric = type_of_metric
+            temp_data.stage = step
+            # Compute stats
+            self.compute_stats (temp_data,type_of_metric,step)
+            data.append (temp_data)
+        return data
+
+    def make_columns_in_parallel (self, root_dir, type_of_metric, core, steps, window):
+        """
+        PURPOSE: 
+            make_columns_for_step() for the metrics in METRIC_SPECS, with 
+            the steps parsed by a pool of self.jobs worker processes
+        
+        INPUTS: as make_columns_for_step()
+        
+        OUTPUTS:
+            Returns a list of TimeSeries, one per step, identical to what
+            make_columns_for_step() returns without workers
+        
+        ALGORITHM:
+            Each worker scans one step's log and makes its column, see
+            parse_stage(). The steps whose log was already scanned for an
+            earlier metric are handed their samples. The columns are taken
+            back in workflow order, which is where the average sampling time
+            and the statistics are computed, so the results do not depend on
+            which worker finishes first. The samples a worker scanned for
+            the other metrics of the same log are kept for them.
+        
+        CALLEES: SetOfColumns.make_columns_for_step()
+        """
+        tasks = []
+        step_dirs = self.io.get_step_dirs (root_dir)
+        for step_path, step in izip_longest (step_dirs, steps):
+            raw = None
+            if step_path is not None:
+                target_file = self.io.get_log_file (step_path, type_of_metric)
+                if target_file in self.io.scan_sessions:
+                    raw = self.io.get_metric_samples (target_file, type_of_metric)
+            tasks.append ((step_path, type_of_metric, core, window, list (self.average_time), raw))
+
+        pool = multiprocessing.Pool (min (self.jobs, len (tasks)), parse_stage_init, (self,))
+        try:
+            results = pool.map (parse_stage, tasks, chunksize=1)
+            pool.close ()
+        except:
+            pool.terminate ()
+            raise
+        finally:
+            pool.join ()
+
+        data = []
+        for (column, average_time, scans), step in izip_longest (results, steps):
+            self.io.import_scans (scans)
+            if column is None:
+                # live mode: the workflow has not got to this step yet
+                continue
+            if average_time > 0 and not self.average_time[0]:
+                self.average_time[:] = [average_time] #we need to store this for the plot files
+            column.metric = type_of_metric
+            column.stage = step
+            # Compute stats
+            self.compute_stats (column, type_of_metric, step)
+            data.append (column)
         return data
 
-    def make_sets_for_cores (self, root_dir, type_of_metric, core=0):
+    def make_sets_for_cores (self, root_dir, type_of_metric, steps=[], window=100):
         """
             PURPOSE: 
                 This will make all the data for all cores 
-                for 1 metric, across all the workflow steps. 
-                it only does this for all workflow steps b/c it calls 
-                  make_columns_for_step which runs over all the steps
+                for 1 metric, across all the workflow steps, in a single
+                pass over each step's log
             INPUT:
                 root_dir: input directory
-                type_of_metric: the metric being processed
-                core:
+                type_of_metric: the metric being processed, 'mpstat'
+                steps: the workflow steps
+                window: sliding average window as specified with --window
             OUTPUT:
-                The core data will be encapsulated into the data list.
-                Each core data is all the columns for each step in the 
-                workflow for 1 different core. 
+                A list of TimeSeries, one per step, whose values are a
+                matrix: a row per interval, a column per core (see 
+                CpuSpecificsColumn)
             CALLEES:
-                UserInput.post_process() via instance of SetOfColumns
+                SetOfColumns.make_csvs_for_metrics()
         """
-        data = []
-
-        if type_of_metric == 'mpstat':
-            core = self.get_number_of_cores (root_dir)
-
-        for core_num in range (core):
-            steps = (eval(PL)).keys() 
-            data.append (self.make_columns_for_step (root_dir, type_of_metric, core_num, steps))
-        return data
+        cores = self.get_number_of_cores (root_dir, type_of_metric)
+        return self.make_columns_for_step (root_dir, type_of_metric, cores, steps, window=window)
 
     def get_number_of_cores (self, root_dir, type_of_metric="mpstat"):
         """
@@ -1595,39 +3979,23 @@ class SetOfColumns ():
 
         
         OUTPUTS: Returns the number of cores found
-            e.g. 16
+            e.g. 16, or 0 when the log does not say
+        
+        ALGORITHM: Read from the banner of the first step's log:
+            Linux 3.10.0 (host)   04/15/2014   _x86_64_   (256 CPU)
         
         CALLEES:
-            CompleteDataFiles.make_plots()
             SetOfColumns.make_sets_for_cores()
         """
-        dir_list = os.walk (root_dir).next ()[1]
-        dir_list = self.io.folder_workflow_sort (dir_list)
-        dir_list = [os.path.join (root_dir, dir) for dir in dir_list]
-
-        log_data = self.io.get_data_for_one_step(dir_list[0], type_of_metric)
-        in_core_data = False
-        log_data = iter (log_data)
-        found_core_len = False
-        core_count = ''
-        total_cores = 0
-
-        # walk the lines of data,
-        # regex for the starting core
-        # count
-        # regex for ending, end
-        while found_core_len is False:
-            # Using the date to signal the start of core data
-            core_start = re.compile (r"^\d+:\d+:\d+\s\w\w\s\s\s")
-            core_count = re.search (core_start, log_data.next ())
-
-            if in_core_data is True and core_count is None:
-                found_core_len = True
-            if core_count is not None:
-                in_core_data = True
-                total_cores += 1
-
-        return total_cores
+        step_dirs = self.io.get_step_dirs (root_dir)
+        if not step_dirs:
+            return 0
+        with open (self.io.get_log_file (step_dirs[0], type_of_metric), 'r') as log:
+            for line in islice (log, 5):
+                banner = self.CORES_REGEX.search (line)
+                if banner:
+                    return int (banner.group (1))
+        return 0
 
     def make_csv_from_set (self, data, type_of_metric):
         """
@@ -1642,9 +4010,83 @@ class SetOfColumns ():
         """
         # Pass data to single data class, which will call io class
         column_type = self.get_class_type (type_of_metric)
-        column_type.make_csv_from_data (data, type_of_metric)
+        # The column reserves a new name in the folder it writes to, which
+        # for mpstat is MULTITHREAD_PARSER_OUTPUT_DIR. Each refresh of the
+        # live mode writes the same file
+        output_file = self.io.tail.csv_name (type_of_metric) if self.io.tail else None
+        column_type.make_csv_from_data (data, type_of_metric, self.io.output_dir, output_file=output_file)
         return
 
+    def make_csvs_for_metrics (self, root_dir, metrics, steps, window, renderer=None, store=None):
+        """
+            PURPOSE: 
+                Makes the columns and the csv file of each metric, for all
+                the steps in the workflow, and draws their plots when a
+                renderer is given
+            INPUT:
+                root_dir: the input dir as given by user
+                metrics: the metric names, in order
+                steps: the workflow steps
+                window: sliding average window as specified with --window
+                renderer: a MatplotlibRenderer, or None
+                store: a SeriesStore the columns are also written to, or None
+            OUTPUT:
+                Returns (the average sampling time, 0 if none was found;
+                a PlotResult per plot drawn)
+            CALLEES:
+                UserInput.make_metric_families()
+        """
+        plot_results = []
+        for metric in metrics:
+            if metric == 'mpstat':
+                metric_columns = self.make_sets_for_cores (root_dir, metric, steps, window)
+            else:
+                metric_columns = self.make_columns_for_step (root_dir, metric, 
+                                 steps=steps, window=window)
+            self.make_csv_from_set (metric_columns, metric)
+            if store is not None:
+                store.write_metric (metric, metric_columns)
+            if renderer is not None:
+                plot_results.append (self.plot_metric (renderer, metric, metric_columns))
+
+        if plot_results:
+            self.io.report_plots (plot_results, sum (result.seconds for result in plot_results))
+        return self.average_time[0], plot_results
+
+    def plot_metric (self, renderer, metric, data):
+        """
+            PURPOSE: 
+                Draws the plot of a metric from its columns
+            INPUT:
+                renderer: a MatplotlibRenderer
+                metric: the metric name
+                data: the TimeSeries of the metric, one per step
+            OUTPUT:
+                Returns a PlotResult. A plot that fails does not stop the 
+                others; its error is in the PlotResult.
+            CALLEES:
+                SetOfColumns.make_csvs_for_metrics()
+        """
+        template_dir = os.path.join (self.io.get_root_path (), TEMPLATE_DIR)
+        templates = [name for name in self.io.get_files_in_dir (template_dir) 
+                     if re.search (METRIC_PLOTS[metric][0], name)]
+        start = time.time ()
+        try:
+            if not templates:
+                raise Exception("No plot template for {0} in {1}".format(metric, template_dir))
+            if metric in INTERFACE_METRICS:
+                # a matrix of the interfaces, a line each
+                output_file = renderer.columns (templates[0], data)
+            elif any (series.values.ndim > 1 for series in data):
+                # a matrix of the cores
+                output_file = renderer.heatmap (templates[0], data)
+            else:
+                output_file = renderer.plot (templates[0], data)
+            print output_file
+        except Exception:
+            return PlotResult (metric, 1, time.time () - start, traceback.format_exc ().strip ())
+        return PlotResult (output_file, 0, time.time () - start, '')
+
     # Helpers -------
     # Get class from classname (for workflow)
     def get_class_type (self, metric=''):
@@ -1655,69 +4097,64 @@ class SetOfColumns ():
             INPUT:
                 metric name.
             OUTPUT:
-                metric class.
+                metric class, None for an unknown metric
             CALLEES:
         """
-        #iostat
-        if metric == 'iostat':
-            return IostatColumn (self.logger)
-        #sar
-        elif metric == 'sar':
-            return CpuTotalsColumn (self.logger)
-
-        elif metric == 'sar_reads':
-            return IoReadsFromSar (self.logger)
-
-        elif metric == 'sar_writes':
-            return IoWritesFromSar (self.logger)
-
-        elif metric == 'active_mem':
-            return ActiveMemoryColumn (self.logger)
-        """
-        #not used
-        elif metric == 'mpstat':
-            return CpuSpecificsColumn (self.logger)
+        column_class = METRIC_CLASSES.get (metric)
+        if column_class is None:
+            return
+        return column_class (self.logger)
 
-        elif metric == 'mpstat_active_core':
-            return ActiveCoreColumn (self.logger)
 
-        elif metric == 'mpstat_total_core':
-            return TotalCoreColumn (self.logger)
+def make_metric_family (index, task, results):
+    """
+    PURPOSE: Makes the csv files of one metric family in a process of its
+        own, see UserInput.make_metric_families()
+    
+    INPUTS: 
+        index: the family's position
+        task: (SetOfColumns, arguments of SetOfColumns.make_csvs_for_metrics())
+        results: the queue that gets (index, what make_csvs_for_metrics()
+            returned, error)
+    
+    OUTPUTS: None
+    """
+    columns = task[0]
+    try:
+        results.put ((index, columns.make_csvs_for_metrics (*task[1:]), None))
+    except Exception:
+        results.put ((index, (0, []), traceback.format_exc ()))
 
-        elif metric == 'free':
-            return MemoryColumn (self.logger)
 
-        """
-        return
+# The SetOfColumns of a worker process, see SetOfColumns.make_columns_in_parallel()
+STAGE_COLUMNS = None
 
-    def append_column (self, data, new_column):
-        """
-            PURPOSE: 
-                This will combine columns, and if one is longer it'll
-                pad the other one with spaces. 
+def parse_stage_init (columns):
+    global STAGE_COLUMNS
+    STAGE_COLUMNS = columns
 
-                TODO: I think the izip_longest function does this already.
-            INPUT:
-            OUTPUT:
-            CALLEES:
-        """
-        longest = 0
-        data_len = len (data)
-        for line in data:
-            if len (line) > longest:
-                longest = len (line)
-        for count in range (len (new_column)):
-            # Adding blanks
-            if count >= data_len:
-                data.append ([])
-            if len (data[count]) < longest:
-                for x in range (longest - len (data[count])):
-                    data[count] += ['']
-            data[count] += new_column[count]
-        # get rid of trailing []
-        if not data[-1]:
-            data.pop ()
-        return data
+def parse_stage (task):
+    """
+    PURPOSE: Makes the column of one step in a worker process
+    
+    INPUTS: task: (step_path, metric, core, window, average_time_holder, raw)
+        raw is the step's TimeSeries when it was scanned already, else None
+    
+    OUTPUTS: Returns (the step's TimeSeries, None in the live mode for a
+        step without samples yet; its average sampling time; the samples
+        scanned for the other metrics, see InputOutput.export_scans())
+    
+    CALLEES: SetOfColumns.make_columns_in_parallel() via multiprocessing.Pool
+    """
+    step_path, metric, core, window, average_time_holder, raw = task
+    io = STAGE_COLUMNS.io
+    if raw is None and step_path is not None:
+        raw = io.get_data_for_one_step (step_path, metric)
+    if io.tail and not raw:
+        return None, average_time_holder[0], io.export_scans ()
+    column_type = STAGE_COLUMNS.get_class_type (metric)
+    column = column_type.make_column_from_metrics (raw, core, None, [], window, average_time_holder)
+    return column, average_time_holder[0], io.export_scans ()
 
 
 
@@ -1725,18 +4162,16 @@ class CompleteDataFiles ():
     """
         Post processing for preparing data for gnuplot or others.
     """
-    def __init__ (self, logger):
+    def __init__ (self, logger, workflow=None):
         self.logger = logger
-        self.io = InputOutput (logger)
+        self.io = InputOutput (logger, workflow=workflow)
         self.column_type = None
-        self.set_of_columns = SetOfColumns (logger)
+        self.set_of_columns = SetOfColumns (logger, workflow=workflow)
         self.repair_process_needed = False
         self.gnuplot_formatted = ''
-        self.max_number_of_cores = 5000 # max reasonable core amount
 
-    #list_of_multicore_plot_regexes used only with mpstat
-    def make_plots (self, root_dir, output_root, tag, cores=0, core_data='', 
-                    list_of_multicore_plot_regexes='', 
+    #list_of_multicore_plot_regexes used only with MATRIX_METRICS
+    def make_plots (self, root_dir, output_root, tag, list_of_multicore_plot_regexes='', 
                     list_of_file_regexes='', list_of_plot_regexes='', 
                     average_time=0):
         """
@@ -1748,107 +4183,35 @@ class CompleteDataFiles ():
             INPUT:
                 root_dir = string path to workflow output
                 output_root = string path of output, where the plot files are
-                cores = number of cores workflow ran with 
-                core_data = the full dataset for multicore
                 list_of_multicore_plot_regexes = the regexes to locate the 
-                    multicore plot files
+                    multicore plot files, those of MATRIX_METRICS
                 list_of_file_regexes = the regeses to find the files (csvs) 
                     that hold the data
                 list_of_plot_regexes = the regexes to find the plot files (.plt)
                 average_time = sampling interval
             OUTPUT:
+                a PlotResult for each plot file, see InputOutput.make_plots()
             CLASS: CompleteDataFiles -- two functions of same name defined in different classes
             CALLEES:
         """
         self._check_for_single_step(list_of_file_regexes)
     
         plotted_files = []
-
-        #this next if statement is confusing. It uses the core count
-        #  of the current machine if passed in cores is 0 or > max. We  
-        #  call this statement everytime we run the parser AND we
-        #  always pass in 0 as the value for cores 
-        #  Only matters if mpstat, although cores is passed on to other 
-        #  functions.
-        if cores == 0 or cores > self.max_number_of_cores:
-            cores = multiprocessing.cpu_count()
-
-        with self.io.make_temp_files (root_dir, cores) as temp_files:
-            # : can we check temp_files first for multi-core files? no need to do next step if not any
-            self.make_temp_data_for_gnuplot (root_dir, temp_files, cores, core_data) 
-            if (list_of_plot_regexes):  # make list of plot files from *.plt files
-                plotted_files = self.fix_filename_in_plotfiles (output_root, tag, 
-                                list_of_plot_regexes, list_of_file_regexes, 
-                                root_dir, average_time)
-            if (list_of_multicore_plot_regexes):# mpstat/mulitcore plot files
-                #only for mpstat
-                plotted_files += (self.fix_plotfile_for_multicore(
-                                  list_of_multicore_plot_regexes, temp_files))
-            self.io.make_plots (plotted_files)  # gnuplot images
-
-        return
+        if (list_of_plot_regexes):  # make list of plot files from *.plt files
+            plotted_files = self.fix_filename_in_plotfiles (output_root, tag, 
+                            list_of_plot_regexes, list_of_file_regexes, 
+                            root_dir, average_time)
+        if (list_of_multicore_plot_regexes):# mpstat/mulitcore plot files
+            #only for MATRIX_METRICS
+            plotted_files += self.fix_plotfile_for_multicore (
+                             list_of_multicore_plot_regexes, output_root, tag)
+        return self.io.make_plots (plotted_files)  # gnuplot images
 
     def _check_for_single_step(self, list_of_file_regexes):
         if len(list_of_file_regexes) < 2:
             self.repair_process_needed = True 
         self.repair_process_needed = False
 
-    #5. OUTPUT_DIR_NAME -- rk changed output dir list to output string
-    def make_temp_data_for_gnuplot (self, root_dir, temp_files, cores=0, core_data='', output_dir=OUTPUT_DIR_NAME, multi_dir=MULTITHREAD_PARSER_OUTPUT_DIR):
-        """
-            PURPOSE: 
-                Only used with mpstat; only applies to multicore plots.
-                It makes temp files by concactinating all the multicore plot 
-                files.  Otherwise gnuplot can't handle the data.
-            INPUT:
-                root_dir = string path to workflow output
-                temp_files = list of string paths to temps files which hold the
-                             multicore csv data
-                cores = number of cores workflow ran with 
-                core_data = the full dataset for multicore
-                output_root = string path of output, where the plot files are
-            OUTPUT:
-                the temp files will now contain the multicore data
-            CALLEES:
-                self.make_plots
-        """
-        if not core_data:
-            return
-
-        for old_file in core_data:
-            if not old_file:
-                continue
-
-            # transpose data
-            just_data = old_file[3:]
-            just_data = [list (data) for data in izip_longest (*just_data)]
-
-            # append each column to start
-            for column_count in range (int(len (old_file[3]) / 2)):
-                column_pos = column_count * 2
-
-                # get rid of trailing ''
-                while just_data[0][-1] == '':
-                    just_data[0].pop()
-                    just_data[1].pop()
-
-                just_data[0] += just_data[column_pos]
-                just_data[1] += just_data[column_pos + 1]
-
-            # untranspose and convert away unicode
-            just_data = list (izip_longest (*just_data))
-            old_file[3:] = [list (data) for data in just_data]
-            for line in old_file:
-                line[0] = str (line[0])
-
-        # write to temp files
-        for output_file, data in izip (temp_files, core_data):
-            with open(output_file[1], 'wb') as output:
-                writer = csv.writer (output)
-                for count in data:
-                    writer.writerow (count)
-        return
-
     def get_process_name (self, dir):
         '''
             Given a dir to the files or whatever, get process
@@ -1907,8 +4270,7 @@ class CompleteDataFiles ():
             CALLEES:
                CompleteDataFiles.make_plots
         """
-        #steps = sample_dict.keys()
-        steps = (eval(PL)).keys()
+        steps = self.io.workflow.keys()
 
         # Escape underscores in subtitle
         #tag_app = tag + ", " + "Sampling Interval: " + str(int(average_time)) + " seconds"
@@ -1930,7 +4292,7 @@ class CompleteDataFiles ():
         
         # Open and fix plot data
         for output_plot, template, new_csv_path in izip (output_plots, templates, list_of_csvs):
-            plot_text = self.io.read_lines(template)
+            plot_text = read_template(template)
 
             #repair process is True in the case of single stage workflow
             if self.repair_process_needed:
@@ -2068,68 +4430,62 @@ class CompleteDataFiles ():
     def add_plot_lines_from_to (self, format, text):
         return text + format
 
-    def fix_plotfile_for_multicore (self, plot_name, temp_cores):
+    def fix_plotfile_for_multicore (self, plot_names, output_dir, tag):
         """
             PURPOSE: 
-                For multicore plot files, this will take 
-                the csv names, and the 
-                starting time, and update that info in the plot
-                files.
-                Only used with mpstat
+                For the plot file of a matrix metric (see MATRIX_METRICS),
+                this will put in the csv file of the matrix, the number of
+                its columns, their names, the output dir and the subtitle.
+                The mpstat plot draws the matrix of the cores as a heatmap:
+                a row per core, the load as colour. The plot of an interface
+                metric draws a line per interface.
             INPUT:
-                plot_names = the regexes to find the plot files 
-                temp_cores = the temporary core data files (csv)
+                plot_names = the regexes to find the plot files, one per
+                    metric, see METRIC_PLOTS
+                output_dir = the output dir, where the plot files are
+                tag = the subtitle of the plot
             OUTPUT:
-                the filename of the plotfile repaired
+                a list with the filenames of the plotfiles repaired, without
+                those of the metrics whose csv file was not written
             CALLEES:
                 self.make_plots
         """
-        temp_cores = [self.double_backslashes (cores[1]) for cores in temp_cores]
         parser_root = self.io.get_root_path ()
         plot_template_files = self.io.get_files_in_dir (os.path.join(parser_root, TEMPLATE_DIR))
+        output_root_dir = os.path.realpath(output_dir)
+        subtitle = re.sub("_", r"\\\\\\\\_", tag)
+        output_plots = []
+        for metric in MATRIX_METRICS:
+            if METRIC_PLOTS[metric][0] not in plot_names:
+                continue
+            templates = self.order_files_by_regex ([METRIC_PLOTS[metric][0]], plot_template_files)
+            # the csv of the cores is in a folder of its own
+            csv_dir = os.path.join (parser_root, output_dir)
+            if metric == 'mpstat':
+                csv_dir = os.path.join (csv_dir, MULTITHREAD_PARSER_OUTPUT_DIR)
+            if not templates or not os.path.isdir (csv_dir):
+                continue
+            # The file names start with the time they were made: the newest is last
+            matrix_csvs = sorted (self.order_files_by_regex ([METRIC_PLOTS[metric][1]], self.io.get_files_in_dir (csv_dir)))
+            if not matrix_csvs:
+                continue
+            with open (matrix_csvs[-1], 'r') as matrix:
+                matrix.readline ()
+                names = matrix.readline ().strip ().split (',')[2:]
+
+            output_plot = self.get_output_plot_name(templates[0], output_root_dir)
+            plot_text = []
+            for line in read_template(templates[0]):
+                line = re.sub (r"(?<=set output \").+(?=\/[^\/]+\.png)", output_root_dir, line)
+                line = re.sub (r"<subtitle>", subtitle, line)
+                line = re.sub (r"(?<=^cores = )\d+", str (len (names)), line)
+                line = re.sub (r"(?<=^columns = )\d+", str (len (names)), line)
+                line = re.sub (r'(?<=^names = ")[^"]*', ' '.join (names), line)
+                line = re.sub (r'(?<=")[^"]+\.csv', self.double_backslashes (matrix_csvs[-1]), line)
+                plot_text.append (line)
 
-        templates = self.order_files_by_regex (plot_name, plot_template_files)
-        starting_time = self.get_starting_time (temp_cores[0])
-
-        output_root_dir = os.path.realpath(OUTPUT_DIR_NAME)
-
-        # The filepaths to the new .plt files
-        output_plots = [self.get_output_plot_name(template_file, output_root_dir) for template_file in templates]
-        plot_text = self.io.read_lines(templates[0])
-
-        new_plot_text = []
-
-        # Fix first csv line and remove the rest
-        for line in plot_text:
-            if re.search (r'^plot\s\"', line):
-                line = re.sub (r"(?<=\").+\w.+\.csv", temp_cores[0], line)
-                new_plot_text.append (line)
-
-                break
-
-            line = re.sub (r"(?<=set output \").+(?=\/[^\/]+\.png)", output_root_dir, line)
-
-            ##  - make sure graphs have the correct sampling interval reported in the title - replace the interval with what it should be
-            #constructed_interval = "at %d second intervals" % (MEASURE_INTERVAL)  ##  not necessary b/c only for mpstat
-            line = re.sub(r"at \d+ second intervals", constructed_interval, line)
-
-            if re.search (r'starting_time\ \=', line):
-                line = re.sub (r'(?<=starting_time\ \=\ )\S+', str (starting_time), line)
-
-            new_plot_text.append (line)
-
-        # Add each line with cores 1+
-        new_line_text = re.search (r'(?<=plot).+$', new_plot_text [-1]).group (0)
-        for index, core in enumerate (temp_cores[1:]):
-            new_line_text = (re.sub (r'(?<=^\s\").+\w.+\.csv', core, new_line_text))
-            new_line_text = (re.sub (r'(?<=::3\sls\s)\d+', str (index + 2), new_line_text))
-            new_plot_text.append (re.sub (r'(?<=core\s)\d+', str (index + 1), new_line_text) + '\n')
-        new_plot_text [-1] = new_plot_text [-1][:-4]
-
-        plot_text[:] = new_plot_text
-
-        self.io.write_lines(output_plots[0], plot_text)
-
+            self.io.write_lines(output_plot, plot_text)
+            output_plots.append (output_plot)
         return output_plots
 
     def get_starting_time (self, file_name):
@@ -2239,53 +4595,8 @@ class IostatColumn (ColumnOfStatistics):
     """
         Returns one column of data when given one unparsed iostat file.
         Iostat parses the reads and writes
+        The samples are extracted as described by METRIC_SPECS['iostat'].
     """
-    # Get the dates for one of Iostat's logs
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        date_data = []
-        for line in data:
-            parsed_time = (re.search(r"""
-                (\d+).(\d+).(\d+)\s   # date
-                (\d+):(\d+):(\d+)\s   # time
-                (\w+).*$              # AM/PM
-                """, str (line), re.VERBOSE))
-            if parsed_time is not None:
-                am_pm = parsed_time.group(7)
-                standard_time = [int (time) for time in parsed_time.group(3, 1, 2, 4, 5, 6)]
-                if (am_pm == 'PM') and (standard_time[3] is not 12):
-                    standard_time[3] += 12
-                if (am_pm == 'AM') and (standard_time[3] is 12):
-                    standard_time[3] = 0
-                date_data.append (standard_time)
-        return date_data
-
-    # Get the await data for one of Iostat's logs
-    def get_data_from_log (self, log_data, core=0):
-        await_data = []
-
-        in_hdd_area = False  # For summing only the HDDs in one block
-        prev_await = 0
-        await_sum = 0
-
-        # filter only sdb lines and filter only the number we want
-        for line in log_data:
-            # result = (re.search(r'^(sdb).+$', str(line), re.M))
-            io_data = re.search (r'^\S+\s+(?:\d+\.\d+\s+){8}(\d+)', str (line), re.M)
-            if io_data != None:
-                in_hdd_area = True
-                await_data_single = int (io_data.group (1))
-                if await_data_single > 1000000000:
-                    await_data_single = prev_await
-                await_sum += await_data_single
-                prev_await = await_data_single
-
-            elif in_hdd_area:
-                in_hdd_area = False
-                await_data.append (await_sum)
-                await_sum = 0
-
-        return await_data
-
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
         return 'time waiting on io'
@@ -2295,104 +4606,30 @@ class CpuTotalsColumn (ColumnOfStatistics):
     """
         Gives the total cpu% averaged for all cores given one unparsed
         sar file.
+        The samples are extracted as described by METRIC_SPECS['sar'].
     """
-    # Helpers -------
-    # Get dates from sar logs
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        date_list = []
-        previous_AM_PM = ''
-        current_date = re.search (r"(\d+)/(\d+)/(\d+)", str (data[0])).group (3, 1, 2)
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'cpu load (all cores)'
 
-        for line in data:
-            parsed_time = (re.search (r"""
-                ^(\d+):(\d+):(\d+)\s   # time
-                (\w+).*                # AM/PM
-                """, str (line), re.VERBOSE))
-            if parsed_time is not None:
-                am_pm = parsed_time.group(4)
-                # Increase day if past midnight
-                if (am_pm == 'AM') and (previous_AM_PM == 'PM'):
-                    current_date = datetime.strptime ('-'.join (current_date), "%Y-%m-%d")
-                    current_date += timedelta (days=1)
-                    current_date = [date for date in current_date.strftime ("%Y %m %d").split(" ")]
-
-                standard_time = [int (num) for num in list (current_date) + list (parsed_time.group (1, 2, 3))]
-                if (am_pm == 'PM') and (standard_time[3] is not 12):
-                    standard_time[3] += 12
-                if (am_pm == 'AM') and (standard_time[3] is 12):
-                    standard_time[3] = 0
-
-                date_list.append (standard_time)
-                previous_AM_PM = am_pm
-        # to delete the header line from the date_list
-        self.remove_bad_first_elem(date_list)
-        return date_list
-
-    # Get the cpu useage for averaged, or each core
-    def get_data_from_log (self, log_data, core=0):
-        cpu_usage = []
-        for line in log_data:
-            result = re.search (r'^\d+:\d+.+all\s+(\d+.\d+).*$', str (line))
-            if result is not None:
-                cpu_usage.append (float (result.group (1)))
-        return cpu_usage
 
+class CpuIowaitColumn (ColumnOfStatistics):
+    """
+        Gives the cpu% spent waiting on io, averaged for all cores, given
+        one unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['iowait'].
+    """
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
-        return 'cpu load (all cores)'
+        return 'cpu iowait (all cores)'
 
 
 class IoReadsFromSar (ColumnOfStatistics):
     """
         Parses the IO read bandwidth given one unparsed
         sar file.
+        The samples are extracted as described by METRIC_SPECS['sar_reads'].
     """
-    # Helpers -------
-
-    # Get dates from sar logs
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        date_list = []
-        previous_AM_PM = ''
-        current_date = re.search (r"(\d+)/(\d+)/(\d+)", str (data[0])).group (3, 1, 2)
-
-        for line in data:
-            parsed_time = (re.search (r"""
-                ^(\d+):(\d+):(\d+)\s   #time
-                (\w+).*                #AM/PM
-                """, str (line), re.VERBOSE))
-            if parsed_time is not None:
-                am_pm = parsed_time.group(4)
-                # Increase day if past midnight
-                if (am_pm == 'AM') and (previous_AM_PM == 'PM'):
-                    current_date = datetime.strptime ('-'.join (current_date), "%Y-%m-%d")
-                    current_date += timedelta (days=1)
-                    current_date = [date for date in current_date.strftime ("%Y %m %d").split(" ")]
-
-                standard_time = [int (num) for num in list (current_date) + list (parsed_time.group (1, 2, 3))]
-                if (am_pm == 'PM') and (standard_time[3] is not 12):
-                    standard_time[3] += 12
-                if (am_pm == 'AM') and (standard_time[3] is 12):
-                    standard_time[3] = 0
-
-                date_list.append (standard_time)
-                previous_AM_PM = am_pm
-        self.remove_bad_first_elem(date_list)
-        return date_list
-
-    # Get the cpu useage for averaged, or each core
-    def get_data_from_log (self, dirty_data, core=0):
-        MB_multiplier = 2048  # convert results to MB
-        #1,048,576 bytes per megabyte, 512 bytes per data block
-        #1,048,576 / 512 = 2,048
-        #so divide each data block by 2048 to get size in MB
-        io_reads = []
-
-        for line in dirty_data:
-            result = re.search (r'^\d+:\d+.+?\wM\s+(\S+\s+){3}(\d+.\d+)', str (line))
-            if result is not None:
-                io_reads.append (round((float (result.group (2)) / MB_multiplier),2))
-        return io_reads
-
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
         return 'io reads in mb/sec'
@@ -2402,99 +4639,268 @@ class IoWritesFromSar (ColumnOfStatistics):
     """
         Parses the IO write bandwidth given one unparsed
         sar file.
+        The samples are extracted as described by METRIC_SPECS['sar_writes'].
     """
-    # Helpers -------
-    # Get dates from sar logs
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        date_list = []
-        previous_AM_PM = ''
-        current_date = re.search (r"(\d+)/(\d+)/(\d+)", str (data[0])).group (3, 1, 2)
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'io writes in mb/sec'
 
-        for line in data:
-            parsed_time = (re.search (r"""
-                ^(\d+):(\d+):(\d+)\s   #time
-                (\w+).*                #AM/PM
-                """, str (line), re.VERBOSE))
-            if parsed_time is not None:
-                am_pm = parsed_time.group(4)
-                # Increase day if past midnight
-                if (am_pm == 'AM') and (previous_AM_PM == 'PM'):
-                    current_date = datetime.strptime ('-'.join (current_date), "%Y-%m-%d")
-                    current_date += timedelta (days=1)
-                    current_date = [date for date in current_date.strftime ("%Y %m %d").split(" ")]
-
-                standard_time = [int (num) for num in list (current_date) + list (parsed_time.group (1, 2, 3))]
-                if (am_pm == 'PM') and (standard_time[3] is not 12):
-                    standard_time[3] += 12
-                if (am_pm == 'AM') and (standard_time[3] is 12):
-                    standard_time[3] = 0
-
-                date_list.append (standard_time)
-                previous_AM_PM = am_pm
-        self.remove_bad_first_elem(date_list)
-        return date_list
-
-    # Get the cpu useage for averaged, or each core
-    def get_data_from_log (self, dirty_data, core=0):
-        MB_multiplier = 2048  # convert results to MB
-        #1,048,576 bytes per megabyte, 512 bytes per data block
-        #1,048,576 / 512 = 2,048
-        #so divide each data block by 2048 to get size in MB
-        io_writes = []
-
-        for line in dirty_data:
-            result = re.search (r'^\d+:\d+.+?\wM\s+(\S+\s+){4}(\d+.\d+)', str (line))
-            if result is not None:
-                io_writes.append (round((float (result.group (2)) / MB_multiplier),2))
-        return io_writes
 
+class NetworkReceiveColumn (ColumnOfStatistics):
+    """
+        Gives the bandwidth received by the network interfaces given one
+        unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['net_rx'].
+    """
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
-        return 'io writes in mb/sec'
+        return 'network received in mb/sec'
 
 
-class CpuSpecificsColumn (ColumnOfStatistics):
+class NetworkTransmitColumn (ColumnOfStatistics):
     """
-        Returns a column for each core given an mpstat file.
+        Gives the bandwidth sent by the network interfaces given one
+        unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['net_tx'].
     """
-    def __init__ (self, logger):
-        self.logger = logger
-        self.io = InputOutput (logger)
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'network sent in mb/sec'
+
+
+class NetworkReceivePacketsColumn (ColumnOfStatistics):
+    """
+        Gives the packets received by the network interfaces given one
+        unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['net_rx_packets'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'network packets received/sec'
+
+
+class NetworkTransmitPacketsColumn (ColumnOfStatistics):
+    """
+        Gives the packets sent by the network interfaces given one
+        unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['net_tx_packets'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'network packets sent/sec'
+
+
+class TcpRetransmitsColumn (ColumnOfStatistics):
+    """
+        Gives the tcp segments retransmitted given one unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['tcp_retrans'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'tcp segments retransmitted/sec'
+
+
+class TcpActiveOpensColumn (ColumnOfStatistics):
+    """
+        Gives the tcp connections opened by the machine (active opens)
+        given one unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['tcp_active'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'tcp connections opened/sec'
 
-    # Helpers -------
-    # Get dates from MPSTAT logs
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        current_date = list (re.search (r"(\d+)/(\d+)/(\d+)", str (data[0])).group (3, 1, 2))
-        parse_time = re.compile (r"""
-            ^(\d+):(\d+):(\d+)\s   # time
-            (\w+)                  # AM/PM
-            \s\s\s\s0              # core 0 time (we only need one)
-            """, re.X)
-        date_data = self.get_datetime_given_regex (parse_time, current_date, data)
-        return date_data
-
-    # Get the cpu useage for averaged, or each core
-    def get_data_from_log (self, log_data, core):
-        cpu_usage = []
-        num = 0
-        for line in log_data:
-            result = re.search (r'^\d+:\d+:\d+.\w+\s{3}(.\S+).+(...\.\d+)$', line)
-            if result is not None:
-                num = int (result.group (1))
-                if num is core:
-                    cpu_usage.append (round (100.0 - float (result.group (2)), 1))
-        return cpu_usage
 
+class TcpConnectionsColumn (ColumnOfStatistics):
+    """
+        Gives the tcp sockets in use (sar's tcpsck) given one unparsed sar
+        file; from a procfs stream, the connections established.
+        The samples are extracted as described by METRIC_SPECS['tcp_connections'].
+    """
     # Returns the type of data which we're looking at
-    #6. OUTPUT_DIR_NAME
-    def make_csv_from_data (self, data, type_of_metric, output_root=None, multi_dir=MULTITHREAD_PARSER_OUTPUT_DIR):
+    def data_type (self, core=0):
+        return 'tcp connections'
+
+
+class NetworkInterfacesColumn (ColumnOfStatistics):
+    """
+        Base class of the metrics of each network interface given one
+        unparsed sar file: a TimeSeries whose values are a matrix, a row
+        per interval and a column per physical interface (see
+        NET_INTERFACES), the names of the interfaces in its columns.
+        The sum of a row is the sample of the metric summed up, e.g.
+        net_rx for net_rx_iface.
+    """
+    def get_useful_metrics (self, log_data, core=0, times=[], date_holder=['skip']):
+        """
+        PURPOSE: Lays the samples of the interfaces' rows out as a matrix
+
+        INPUTS:
+            log_data: the step's TimeSeries, a sample per interface and
+                interval, with the interface of each in its labels
+            core: not used
+
+        OUTPUTS: Returns a TimeSeries with a timestamp and a row of values
+            per interval, a column per interface
+
+        ALGORITHM: The rows of an interval share its timestamp; the runs of
+            equal timestamps are found at once with numpy, as in
+            CpuSpecificsColumn. Unlike a core, an interface may come up or
+            go away part way through a stage: it has a column from the
+            first interval it is in, in the order they are first seen, and
+            counts 0 in an interval it is not in.
+
+        CALLEE(S): ColumnOfStatistics.make_column_from_metrics()
+        """
+        times = log_data.times
+        starts = numpy.concatenate (([True], numpy.diff (times) != 0))[:len (times)]
+        interval = numpy.cumsum (starts) - 1
+        names, first, column = numpy.unique (numpy.asarray (log_data.labels), return_index=True, return_inverse=True)
+        # the columns in the order the interfaces are first seen
+        order = numpy.argsort (first, kind='mergesort')
+        rank = numpy.empty_like (order)
+        rank[order] = numpy.arange (len (order))
+        values = numpy.zeros ((interval[-1] + 1 if len (interval) else 0, len (names)), dtype=log_data.values.dtype)
+        values[interval, rank[column]] = log_data.values
+        matrix = TimeSeries (log_data.metric, times[starts], values, log_data.stage)
+        matrix.columns = [str (name) for name in names[order]]
+        return matrix
+
+    def make_csv_from_data (self, data, type_of_metric, output_dir, output_file=None):
         """
         PURPOSE: Wrapper around InputOutput.store_data_into_csv()
-            Writes the input data to a CSV file
+            Writes the matrix of every step into one csv file: a row per
+            interval with the step, the time and the value of each
+            interface
+
+        INPUTS:
+            data: the TimeSeries of the metric, one per step
+            type_of_metric: eg: "net_rx_iface", see top of file REFERENCE: POSSIBLE_METRICS
+            output_dir: The folder the csv file will be created in
+            output_file: the name of the csv file, None for a new name
+
+        OUTPUTS: Creates a csv file
+
+        CALLEES: SetOfColumns.make_csv_from_set()
+        """
+        if output_file is None:
+            output_file = self.io.reserve_output_file (output_dir, '_' + type_of_metric + '.csv')
+        self.io.store_data_into_csv (self.get_matrix_rows (data), output_file, output_dir)
+        return
+
+    def get_matrix_rows (self, data):
+        # a title row, the column titles, then the intervals of each step.
+        # A step that did not see an interface counts 0 for it
+        if not data:
+            return
+        names = []
+        for series in data:
+            names += [name for name in series.columns or [] if name not in names]
+        yield [data[0].metric.upper () + ': ' + data[0].description]
+        yield ['stage', data[0].time_title] + names
+        for series in data:
+            unit = series.time_unit ()
+            place = [names.index (name) for name in series.columns or []]
+            for start in xrange (0, len (series), SPOOL_CHUNK_SIZE):
+                stop = start + SPOOL_CHUNK_SIZE
+                rows = numpy.zeros ((len (series.values[start:stop]), len (names)))
+                rows[:, place] = series.values[start:stop]
+                for stamp, row in izip (series.time_strings (start, stop, unit), rows.tolist ()):
+                    yield [series.stage, stamp] + row
+
+
+class NetworkReceiveInterfacesColumn (NetworkInterfacesColumn):
+    """
+        Gives the bandwidth received by each network interface.
+        The samples are extracted as described by METRIC_SPECS['net_rx_iface'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'network received by each interface in mb/sec'
+
+
+class NetworkTransmitInterfacesColumn (NetworkInterfacesColumn):
+    """
+        Gives the bandwidth sent by each network interface.
+        The samples are extracted as described by METRIC_SPECS['net_tx_iface'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'network sent by each interface in mb/sec'
+
+
+class NetworkReceivePacketsInterfacesColumn (NetworkInterfacesColumn):
+    """
+        Gives the packets received by each network interface.
+        The samples are extracted as described by METRIC_SPECS['net_rx_packets_iface'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'network packets received by each interface/sec'
+
+
+class NetworkTransmitPacketsInterfacesColumn (NetworkInterfacesColumn):
+    """
+        Gives the packets sent by each network interface.
+        The samples are extracted as described by METRIC_SPECS['net_tx_packets_iface'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'network packets sent by each interface/sec'
+
+
+class CpuSpecificsColumn (ColumnOfStatistics):
+    """
+        Returns the load of each core given an mpstat file: a TimeSeries
+        whose values are a matrix, a row per interval and a column per core.
+        The samples are extracted as described by METRIC_SPECS['mpstat'],
+        100 - %idle of each core's row.
+    """
+    def get_useful_metrics (self, log_data, core=0, times=[], date_holder=['skip']):
+        """
+        PURPOSE: Lays the samples of mpstat's core rows out as a matrix
+
+        INPUTS:
+            log_data: the step's TimeSeries, a sample per core and 
+                interval, core after core
+            core: the number of cores, 0 to take the most common number
+                of rows per interval
+
+        OUTPUTS: Returns a TimeSeries with a timestamp and a row of values
+            per interval, a column per core
+
+        ALGORITHM: The rows of an interval share its timestamp. The runs of
+            equal timestamps are found at once with numpy and the matrix is
+            gathered with one index array. An interval that does not have a
+            row for every core (the log stops part way through it, or a 
+            core went offline) is dropped.
+
+        CALLEE(S): ColumnOfStatistics.make_column_from_metrics()
+        """
+        times = log_data.times
+        starts = numpy.flatnonzero (numpy.concatenate (([True], numpy.diff (times) != 0)))[:len (times)]
+        sizes = numpy.diff (numpy.append (starts, len (times)))
+        if not core and len (sizes):
+            core = int (numpy.bincount (sizes).argmax ())
+        whole = starts[sizes == core]
+        if len (whole) < len (starts):
+            self.logger.warning("{0} of {1} mpstat intervals do not have {2} cores, they are dropped".format(
+                len (starts) - len (whole), len (starts), core))
+        values = log_data.values[whole[:, None] + numpy.arange (core)]
+        return TimeSeries (log_data.metric, times[whole], values, log_data.stage)
+
+    def make_csv_from_data (self, data, type_of_metric, output_dir, output_file=None):
+        """
+        PURPOSE: Wrapper around InputOutput.store_data_into_csv()
+            Writes the matrix of every step into one csv file: a row per
+            interval with the step, the time and the load of each core
         
         INPUTS:
-            data: the log data
-            type_of_metric: eg: "iostat", see top of file REFERENCE: POSSIBLE_METRICS
+            data: the TimeSeries of the metric, one per step
+            type_of_metric: eg: "mpstat", see top of file REFERENCE: POSSIBLE_METRICS
+            output_dir: The output folder, the csv file goes in its 
+                MULTITHREAD_PARSER_OUTPUT_DIR folder
+            output_file: the name of the csv file, None for a new name
 
         There are two functions with same name in different classes
         CLASS: ColumnOfStatistics 
@@ -2503,54 +4909,37 @@ class CpuSpecificsColumn (ColumnOfStatistics):
         
         CALLEES: SetOfColumns.make_csv_from_set()
         """
-        if output_root is None:
-            output_root = OUTPUT_DIR_NAME
-
-        for data_set, count in izip (data, range (len (data))):
-            output_file = time.strftime("%Y-%m-%d_%H.%M.%S") + '_' + type_of_metric + '_cpu_core_{num:02d}.csv'.format (num=count)
-
-            output_dir = os.path.join (output_root, "multithreading_stats")
-            output_dir = self.io.make_output_dir (output_dir) 
-            
-            self.io.store_data_into_csv (data_set, output_file, output_dir)
+        output_dir = self.io.make_output_dir (os.path.join (output_dir, MULTITHREAD_PARSER_OUTPUT_DIR))
+        if output_file is None:
+            output_file = self.io.reserve_output_file (output_dir, '_' + type_of_metric + '.csv')
+        self.io.store_data_into_csv (self.get_matrix_rows (data), output_file, output_dir)
         return
 
+    def get_matrix_rows (self, data):
+        # a title row, the column titles, then the intervals of each step
+        if not data:
+            return
+        cores = max (series.values.shape[1] for series in data)
+        yield [data[0].metric.upper () + ': ' + data[0].description]
+        yield ['stage', data[0].time_title] + ['core {0}'.format (core) for core in range (cores)]
+        for series in data:
+            unit = series.time_unit ()
+            for start in xrange (0, len (series), SPOOL_CHUNK_SIZE):
+                stop = start + SPOOL_CHUNK_SIZE
+                for stamp, row in izip (series.time_strings (start, stop, unit), series.values[start:stop].tolist ()):
+                    yield [series.stage, stamp] + row
+
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
-        return 'cpu load core {0}'.format (core)
+        return 'cpu load of each core (%)'
 
 
 class ActiveCoreColumn (ColumnOfStatistics):
     """
         This takes mpstat data, finds the biggest core, and gives that
         data.
+        The samples are extracted as described by METRIC_SPECS['mpstat_active_core'].
     """
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        current_date = list (re.search (r"(\d+)/(\d+)/(\d+)", str (data[0])).group (3, 1, 2))
-        parse_time = re.compile (r"""
-            ^(\d+):(\d+):(\d+)\s   # time
-            (\w+)                  # AM/PM
-            \s\s\s\s0              # core 0 time (we only need one)
-            """, re.X)
-        date_data = self.get_datetime_given_regex (parse_time, current_date, data)
-        return date_data
-
-    def get_data_from_log (self, log_data, core):
-        # walk data
-        active_core_usage = []
-        biggest_usage = 0
-        for line in log_data:
-            result = re.search (r'^\d+:\d+:\d+\s.M\s+(\d+)\s+(\d+.\d+)', line)
-            if result:
-                usage = float (result.group (2))
-                if usage > biggest_usage:
-                    biggest_usage = usage
-            elif biggest_usage > 0:
-                active_core_usage.append (biggest_usage)
-                biggest_usage = 0
-
-        return active_core_usage
-
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
         return 'cpu load on most active core (%)'
@@ -2560,36 +4949,8 @@ class TotalCoreColumn (ColumnOfStatistics):
     """
         This takes mpstat data, sums all the cores' usage, and gives that
         data.
+        The samples are extracted as described by METRIC_SPECS['mpstat_total_core'].
     """
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        current_date = list (re.search (r"(\d+)/(\d+)/(\d+)", str (data[0])).group (3, 1, 2))
-        parse_time = re.compile (r"""
-            ^(\d+):(\d+):(\d+)\s   # time
-            (\w+)                  # AM/PM
-            \s\s\s\s0              # core 0 time (we only need one)
-            """, re.X)
-        date_data = self.get_datetime_given_regex (parse_time, current_date, data)
-        return date_data
-
-    def get_data_from_log (self, log_data, core):
-        # walk data
-        total_core_usage = []
-        total_usage = 0
-        inside_data = False
-        for line in log_data:
-            result = re.search (r'^\d+:\d+:\d+\s.M\s+(\d+)\s+(\d+.\d+)', line)
-            if result:
-                inside_data = True
-                usage = float (result.group (2))
-                if usage > 0:
-                    total_usage += usage
-            elif inside_data:
-                inside_data = False
-                total_core_usage.append (total_usage)
-                total_usage = 0
-
-        return total_core_usage
-
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
         return 'cpu load on all cores summed up'
@@ -2605,91 +4966,132 @@ class TotalCoreColumn (ColumnOfStatistics):
 #        return
 class MemoryColumn (ColumnOfStatistics):
     """
-        Entire class is for free - not used currently
-        Returns a column of total memory in use (MBs) given a .free file
+        Gives the memory in use, without the page cache, given one
+        timestamped free log.
+        The samples are extracted as described by METRIC_SPECS['free_used'].
     """
-    def __init__ (self, logger):
-        self.logger = logger
-        self.total_memory = 0
-        self.io = InputOutput (logger)
-        self.column_type = None
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'memory used (gb)'
+
+
+class CachedMemoryColumn (ColumnOfStatistics):
+    """
+        Gives the memory held by the buffers and the page cache given one
+        timestamped free log.
+        The samples are extracted as described by METRIC_SPECS['free_cache'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'memory cached (gb)'
 
-    # Helpers -------
-    # Gets dates from 'free' logs and from sar (for starting point)
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        if not date_data:
-            print "error, please make sure to parse iostat since free doesn't timestamp"
-        return date_data
-
-    # Gets the total memory usage at each point
-    def get_data_from_log (self, log_data, core=0):
-        memory_usage = []
-        for line in log_data:
-            result = re.search (r'Mem:\s+\d+\s+(\d+)', line)
-            if result:
-                memory_usage.append (int (result.group (1)))
-        # get total memory size
-        for line in log_data:
-            result = re.search (r'Mem:\s+(\d+)', line)
-            if result:
-                self.total_memory = int (result.group (1))
-                break
-        return memory_usage
 
+class AvailableMemoryColumn (ColumnOfStatistics):
+    """
+        Gives the memory available to new processes without swapping given
+        one timestamped free log.
+        The samples are extracted as described by METRIC_SPECS['free_available'].
+    """
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
-        return 'total memory used out of {0}mb'.format (self.total_memory)
+        return 'memory available (gb)'
 
 
 class ActiveMemoryColumn (ColumnOfStatistics):
     """
         Gives the total active 'committed' memory averaged for all drives given
         one unparsed sar file.
+        The samples are extracted as described by METRIC_SPECS['active_mem'].
     """
-    # Helpers -------
-    # Get dates from sar logs
-    def get_datetime_from_log (self, data, core=0, date_data=[]):
-        date_list = []
-        previous_AM_PM = ''
-        current_date = re.search (r"(\d+)/(\d+)/(\d+)", str (data[0])).group (3, 1, 2)
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'committed memory (gb)'
+
+class WorkflowCpuColumn (ColumnOfStatistics):
+    """
+        Gives the cpu load of the workflow's own processes, as a share of
+        all the cores, given one process_tree_collector.py stream.
+        The samples are extracted as described by METRIC_SPECS['workflow_cpu'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'cpu load (workflow)'
 
-        for line in data:
-            parsed_time = (re.search (r"""
-                ^(\d+):(\d+):(\d+)\s   # time
-                (\w+).*                # AM/PM
-                """, str (line), re.VERBOSE))
-            if parsed_time is not None:
-                am_pm = parsed_time.group(4)
-                # Increase day if past midnight
-                if (am_pm == 'AM') and (previous_AM_PM == 'PM'):
-                    current_date = datetime.strptime ('-'.join (current_date), "%Y-%m-%d")
-                    current_date += timedelta (days=1)
-                    current_date = [date for date in current_date.strftime ("%Y %m %d").split(" ")]
-
-                standard_time = [int (num) for num in list (current_date) + list (parsed_time.group (1, 2, 3))]
-                if (am_pm == 'PM') and (standard_time[3] is not 12):
-                    standard_time[3] += 12
-                if (am_pm == 'AM') and (standard_time[3] is 12):
-                    standard_time[3] = 0
-
-                date_list.append (standard_time)
-                previous_AM_PM = am_pm
-        self.remove_bad_first_elem(date_list)
-        return date_list
-
-    # Get the cpu useage for averaged, or each core
-    def get_data_from_log (self, log_data, core=0):
-        cpu_usage = []
-        for line in log_data:
-            result = re.search (r'^\d+:\d+.+M\s+(?:\S+\s+){5}(\d+).*$', str (line))
-            if result is not None:
-                result = int (result.group (1)) / 1048576
-                cpu_usage.append (round(result, 2))
-        return cpu_usage
 
+class WorkflowMemoryColumn (ColumnOfStatistics):
+    """
+        Gives the resident memory of the workflow's own processes given one
+        process_tree_collector.py stream.
+        The samples are extracted as described by METRIC_SPECS['workflow_rss'].
+    """
     # Returns the type of data which we're looking at
     def data_type (self, core=0):
-        return 'committed memory (gb)'
+        return 'workflow resident memory (gb)'
+
+
+class WorkflowReadsColumn (ColumnOfStatistics):
+    """
+        Gives the storage read bandwidth of the workflow's own processes
+        given one process_tree_collector.py stream.
+        The samples are extracted as described by METRIC_SPECS['workflow_reads'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'workflow io reads in mb/sec'
+
+
+class WorkflowWritesColumn (ColumnOfStatistics):
+    """
+        Gives the storage write bandwidth of the workflow's own processes
+        given one process_tree_collector.py stream.
+        The samples are extracted as described by METRIC_SPECS['workflow_writes'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'workflow io writes in mb/sec'
+
+
+class WorkflowFaultsColumn (ColumnOfStatistics):
+    """
+        Gives the major page faults of the workflow's own processes given
+        one process_tree_collector.py stream.
+        The samples are extracted as described by METRIC_SPECS['workflow_faults'].
+    """
+    # Returns the type of data which we're looking at
+    def data_type (self, core=0):
+        return 'workflow major page faults/sec'
+
+# Maps each metric name to the column class that parses it
+METRIC_CLASSES = {
+    'iostat': IostatColumn,
+    'sar': CpuTotalsColumn,
+    'iowait': CpuIowaitColumn,
+    'sar_reads': IoReadsFromSar,
+    'sar_writes': IoWritesFromSar,
+    'active_mem': ActiveMemoryColumn,
+    'workflow_cpu': WorkflowCpuColumn,
+    'workflow_rss': WorkflowMemoryColumn,
+    'workflow_reads': WorkflowReadsColumn,
+    'workflow_writes': WorkflowWritesColumn,
+    'workflow_faults': WorkflowFaultsColumn,
+    'mpstat_active_core': ActiveCoreColumn,
+    'mpstat_total_core': TotalCoreColumn,
+    'mpstat': CpuSpecificsColumn,
+    'free_used': MemoryColumn,
+    'free_cache': CachedMemoryColumn,
+    'free_available': AvailableMemoryColumn,
+    'net_rx': NetworkReceiveColumn,
+    'net_tx': NetworkTransmitColumn,
+    'net_rx_packets': NetworkReceivePacketsColumn,
+    'net_tx_packets': NetworkTransmitPacketsColumn,
+    'tcp_retrans': TcpRetransmitsColumn,
+    'tcp_active': TcpActiveOpensColumn,
+    'tcp_connections': TcpConnectionsColumn,
+    'net_rx_iface': NetworkReceiveInterfacesColumn,
+    'net_tx_iface': NetworkTransmitInterfacesColumn,
+    'net_rx_packets_iface': NetworkReceivePacketsInterfacesColumn,
+    'net_tx_packets_iface': NetworkTransmitPacketsInterfacesColumn,
+}
 
 #------------------------------
 # Main